@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from common.helpers import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin defaults for tables of millions of rows: no COUNT(*) of the whole table (show_full_result_count)
+    and an estimated count of the filtered rows (EstimatedCountPaginator). Subclasses list in sortable_by the
+    columns an index can sort on, and in list_select_related every FK that list_display or __str__ follows.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    sortable_by = ("id",)
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+
+class CommonConfig(AppConfig):
+    name = 'common'
+
+    def ready(self):
+        # Drop users cached by common.authentication.CachedJWTAuthentication when they change, in every process
+        from common.authentication import user_changed
+
+        post_save.connect(user_changed, sender=settings.AUTH_USER_MODEL, dispatch_uid="jwt_user_cache_save")
+        post_delete.connect(user_changed, sender=settings.AUTH_USER_MODEL, dispatch_uid="jwt_user_cache_delete")
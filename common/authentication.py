@@ -0,0 +1,121 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CACHE_SIZE = 10000  # users kept per process (least recently used are evicted first)
+USER_CACHE_TTL = 300     # seconds a resolved user is trusted without asking the database again
+
+
+class UserCache:
+    """
+    Bounded LRU of {user id: user} with a TTL, shared by the threads of one process.
+
+    Each entry remembers the user's version from the shared cache (CACHES["default"]) as it was before the
+    user was read from the database; invalidate_user() replaces that version after every user write, so an
+    entry is dropped in every process that shares the cache. With the per process default (locmem) cache,
+    other processes only notice the write when the TTL expires.
+    """
+
+    def __init__(self, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # {user id: (user, version, expires at)}
+
+    @staticmethod
+    def version_key(user_id):
+        return f"auth:user:{user_id}"
+
+    def version(self, user_id):
+        return cache.get(self.version_key(user_id))
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            user, version, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+        if self.version(user_id) != version:
+            self.discard(user_id)
+            return None
+        return user
+
+    def put(self, user_id, user, version):
+        with self.lock:
+            self.entries[user_id] = (user, version, time.monotonic() + self.ttl)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache()
+
+
+def invalidate_user(user_id):
+    """Forget a user everywhere: call after any write to it that bypasses save()/delete() (e.g. QuerySet.update)."""
+    user_id = str(user_id)
+
+    def bump():
+        cache.set(UserCache.version_key(user_id), uuid.uuid4().hex, None)
+        user_cache.discard(user_id)
+
+    user_cache.discard(user_id)
+    # After commit as well, so a concurrent request cannot re-cache the user as it was before the write
+    transaction.on_commit(bump)
+
+
+def user_changed(sender, instance, **kwargs):
+    # post_save / post_delete of the user model: password changes and deactivations are saves too
+    invalidate_user(instance.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the user lookup for hot users: the user resolved from a token's subject is
+    kept in user_cache, so authenticating costs no query until the user is written or the entry expires.
+    The is_active and revoked token (CHECK_REVOKE_TOKEN) checks still run on every request.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(jwt_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)  # raises InvalidToken
+        user_id = str(user_id)
+
+        user = user_cache.get(user_id)
+        if user is None:
+            version = user_cache.version(user_id)  # read before the user, so a write in between drops the entry
+            user = super().get_user(validated_token)
+            user_cache.put(user_id, user, version)
+        else:
+            self.check_user(user, validated_token)
+        return copy.copy(user)  # requests must not share (and mutate) one instance
+
+    def check_user(self, user, validated_token):
+        """The checks JWTAuthentication.get_user() runs on the user it loaded."""
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
@@ -0,0 +1,46 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+from common.instrumentation import forward_queries
+
+# Concurrent execution of independent read queries from async views.
+#
+# Django's async ORM (aget, acount, aaggregate, async for ...) runs every query through
+# sync_to_async(thread_sensitive=True), i.e. on one shared thread and one connection, so awaiting several
+# of them with asyncio.gather() still executes them one after the other. gather_queries() runs each
+# callable in its own executor thread, with that thread's own database connection, so the wall time is
+# the slowest query instead of the sum. That connection is closed after the callable: executor threads
+# are not request threads, so nothing else would ever close it (whatever CONN_MAX_AGE says).
+
+
+def _in_atomic_block():
+    return connection.in_atomic_block
+
+
+def _on_own_connection(func):
+    def run():
+        try:
+            with forward_queries():  # still counted by the request instrumentation
+                return func()
+        finally:
+            connection.close()
+    return run
+
+
+async def gather_queries(*funcs):
+    """
+    Run sync, read-only ORM callables concurrently and return their results in order, e.g.
+
+        departments, employees = await gather_queries(
+            lambda: Department.objects.count(),
+            lambda: Employee.objects.count(),
+        )
+
+    Inside a transaction (ATOMIC_REQUESTS, tests) other connections could not see its uncommitted rows,
+    so the callables then run one by one on the request's connection instead.
+    """
+    if await sync_to_async(_in_atomic_block)():
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(*(sync_to_async(_on_own_connection(func), thread_sensitive=False)() for func in funcs))
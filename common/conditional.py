@@ -0,0 +1,91 @@
+import hashlib
+
+from django.db.models import F
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Conditional requests (ETag / Last-Modified) based on the models' updated_at column.
+#   GET/HEAD:           If-None-Match / If-Modified-Since -> 304 Not Modified without loading or serializing
+#   PUT/PATCH/DELETE:   If-Match / If-Unmodified-Since    -> 412 Precondition Failed, checked against the loaded
+#                       row, and the write only goes ahead while the row still has that version (claim_version)
+# Django's get_conditional_response() implements the RFC 9110 evaluation order.
+# Requests without any of these headers cost nothing extra: the validators come from the row the view loads.
+
+CONDITIONAL_HEADERS = ("If-Match", "If-None-Match", "If-Modified-Since", "If-Unmodified-Since")
+
+
+def make_etag(*parts):
+    return '"' + hashlib.md5(repr(parts).encode("utf-8")).hexdigest() + '"'
+
+
+def object_validators(model, pk):
+    """(etag, last_modified timestamp) of one row, from an index lookup of its updated_at only. 404 if missing."""
+    updated_at = model._default_manager.filter(pk=pk).values_list("updated_at", flat=True).first()
+    if updated_at is None:
+        raise Http404(f"No {model._meta.object_name} matches the given query.")
+    return instance_validators(model, pk, updated_at)
+
+
+def instance_validators(model, pk, updated_at):
+    return make_etag(model._meta.label_lower, pk, updated_at.isoformat()), int(updated_at.timestamp())
+
+
+def is_conditional(request):
+    return any(name in request.headers for name in CONDITIONAL_HEADERS)
+
+
+def read_precondition(request, model, pk):
+    """
+    For a conditional GET/HEAD of one row: the 304/412 response to return as is, or None to load the row.
+    Cheap version check (updated_at only) before loading the row; other requests skip it.
+    """
+    if request.method not in ("GET", "HEAD") or not is_conditional(request):
+        return None
+    return check_preconditions(request, *object_validators(model, pk))
+
+
+def claim_version(request, instance):
+    """
+    For a conditional write of a loaded row, run in the write's transaction: UPDATE ... WHERE pk AND updated_at
+    = the version its preconditions were checked against. False if that updated 0 rows (another write got there
+    first: 412); otherwise the row stays locked until the write commits. True at once for other requests.
+    The models' querysets stamp updated_at with timezone.now() like auto_now, never the database's NOW(),
+    so the loaded value compares equal to the stored one on every backend.
+    """
+    if not is_conditional(request):
+        return True
+    rows = type(instance)._base_manager.filter(pk=instance.pk, updated_at=instance.updated_at)
+    return rows.update(updated_at=F("updated_at")) == 1
+
+
+def check_preconditions(request, etag, last_modified):
+    """The 304/412 response to return as is, or None to carry on with the request."""
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def with_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def paginated_response(request, paginator, encoder, rows):
+    """
+    Paginated list response for a page of RowEncoder rows fetched with the extra "updated_at" column.
+
+    The ETag covers everything the body is built from (row ids and versions, count, links), so it is
+    computed before encoding; a matching If-None-Match returns 304 without serializing the page.
+    Lists validate on the ETag only: a page's newest updated_at does not change when rows are deleted.
+    """
+    page = getattr(paginator, "page", None)
+    count = page.paginator.count if page is not None else getattr(paginator, "count", None)
+    next_link, previous_link = paginator.get_next_link(), paginator.get_previous_link()
+    etag = make_etag(count, next_link, previous_link, [(row["id"], row["updated_at"].isoformat()) for row in rows])
+    last_modified = int(max(row["updated_at"] for row in rows).timestamp()) if rows else None
+
+    not_modified = check_preconditions(request, etag, None)
+    if not_modified is not None:
+        return not_modified
+    return with_validators(paginator.get_paginated_response(encoder.encode(rows)), etag, last_modified)
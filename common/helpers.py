@@ -1,7 +1,382 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.parsers import BaseParser
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_CACHE_TIMEOUT = 60  # seconds a cached COUNT(*) is reused by the "estimate" count mode
+
+
+def positive_int(value, strict=False, cutoff=None):
+    """int(value), ValueError if negative (or zero when strict), capped at cutoff; as DRF's pagination does."""
+    value = int(value)
+    if value < 0 or (strict and value == 0):
+        raise ValueError()
+    return min(value, cutoff) if cutoff else value
+
+
+def estimate_count(queryset):
+    """
+    Row count of a queryset without COUNT(*) on PostgreSQL: pg_class.reltuples for a whole table, the planner's
+    row estimate otherwise. Elsewhere a COUNT(*) cached for COUNT_CACHE_TIMEOUT seconds.
+    """
+    if not hasattr(queryset, "query"):  # a list or sequence (in-process search results, AttendanceHistory)
+        return len(queryset)
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= 0:  # -1 until the table has been analyzed
+                return row[0]
+        else:
+            plan = json.loads(queryset.explain(format="json"))
+            return int(plan[0]["Plan"]["Plan Rows"])
+
+    sql, params = queryset.query.sql_with_params()
+    key = "count:" + hashlib.md5(f"{queryset.db}:{sql}:{params!r}".encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django Paginator (e.g. ModelAdmin.paginator) whose count is estimate_count() instead of COUNT(*).
+    Results estimated below exact_count_below rows are counted exactly: that is cheap, and the admin lists
+    every row as one unpaginated page when the count fits a page, so an underestimate must not get there.
+    """
+    exact_count_below = 1000
+
+    @cached_property
+    def count(self):
+        count = estimate_count(self.object_list)
+        if count < self.exact_count_below and hasattr(self.object_list, "query"):
+            count = self.object_list.count()
+        return count
+
+
+class SkipScanDatesQuerySet(models.QuerySet):
+    """
+    dates() by skip scan on PostgreSQL: each distinct year/month/day is found by one probe of the date index
+    (the first value past the previous period) instead of DISTINCT DATE_TRUNC over every matching row.
+    Serves the admin's date_hierarchy on tables of millions of rows; needs an index on the DateField.
+    """
+
+    def dates(self, field_name, kind, order="ASC"):
+        connection = connections[self.db]
+        field = self.model._meta.get_field(field_name)
+        if (connection.vendor != "postgresql" or kind not in ("year", "month", "day")
+                or field.get_internal_type() != "DateField"):
+            return super().dates(field_name, kind, order)
+
+        matching, params = self.order_by().values(skip_scan_value=F(field_name)).query.sql_with_params()
+        sql = f"""
+            WITH RECURSIVE found(value) AS (
+                SELECT MIN(m.skip_scan_value) FROM ({matching}) m
+                UNION ALL
+                SELECT (SELECT MIN(m.skip_scan_value) FROM ({matching}) m
+                        WHERE m.skip_scan_value >= DATE_TRUNC('{kind}', found.value) + INTERVAL '1 {kind}')
+                FROM found WHERE found.value IS NOT NULL
+            )
+            SELECT DATE_TRUNC('{kind}', value)::date FROM found WHERE value IS NOT NULL
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (*params, *params))
+            values = [row[0] for row in cursor.fetchall()]
+        return values[::-1] if order == "DESC" else values
+
 
 class SmallResultsSetPagination(PageNumberPagination):
     page_size = 10                 # default page size
     page_size_query_param = "page_size"  # allow client query override (?page_size=50) e.g. "http://.../employees/?page=3&page_size=20"
     max_page_size = 100            # safety cap
 
+    # ?count=exact|estimate|none e.g. "http://.../attendance/?page=3&count=none"
+    #   exact:    COUNT(*) over the filtered queryset (Django Paginator)
+    #   estimate: planner estimate on Postgres, otherwise a COUNT(*) cached for COUNT_CACHE_TIMEOUT seconds
+    #   none:     no count at all
+    # estimate/none fetch page_size + 1 rows to know whether there is a next page.
+    count_query_param = "count"
+    count_modes = ("exact", "estimate", "none")
+    default_count_mode = "exact"
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(self.count_query_param, self.default_count_mode)
+        return mode if mode in self.count_modes else self.default_count_mode
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = self.get_count_mode(request)
+        if self.count_mode == "exact":
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        try:
+            self.page_number = positive_int(request.query_params.get(self.page_query_param, 1), strict=True)
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params.get(self.page_query_param), message="Invalid page.",
+            ))
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and self.page_number != 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=self.page_number, message="That page contains no results",
+            ))
+        self.has_next = len(rows) > page_size
+        self.count = self.estimate_count(queryset) if self.count_mode == "estimate" else None
+        return rows[:page_size]
+
+    def estimate_count(self, queryset):
+        return estimate_count(queryset)
+
+    def get_next_link(self):
+        if self.count_mode == "exact":
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.count_mode == "exact":
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.count_mode == "exact":
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ("count", self.count),
+            ("count_mode", self.count_mode),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+
+class LargeResultsSetPagination(SmallResultsSetPagination):
+    """For big tables (attendance, performance): no exact COUNT(*) unless the client sends ?count=exact."""
+    default_count_mode = "estimate"
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek (keyset) pagination over a fixed, unique column ordering.
+
+    Instead of OFFSET, each page filters on the last seen key, e.g. for ("employee_id", "date"):
+        WHERE employee_id >= x AND (employee_id > x OR date > y) ORDER BY employee_id, date LIMIT n+1
+    so page 1000 costs the same index range scan as page 1.
+
+    The ordering must be unique (add "id" as the last column if needed) and backed by an index.
+    Cursors are opaque to clients; they only follow the next/previous links.
+    e.g. "http://.../attendance/?cursor=&page_size=20" for the first page
+    """
+    page_size = SmallResultsSetPagination.page_size
+    page_size_query_param = SmallResultsSetPagination.page_size_query_param
+    max_page_size = SmallResultsSetPagination.max_page_size
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+
+    @classmethod
+    def requested(cls, request):
+        # Presence of ?cursor= (even empty, for the first page) switches a list view to keyset mode.
+        return cls.cursor_query_param in request.query_params
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, getattr(queryset, "model", None))
+
+        if hasattr(queryset, "seek"):
+            # Sequences that are not a single queryset (operations.models.AttendanceHistory) seek themselves
+            try:
+                results = queryset.seek(position, reverse, self.page_size + 1)
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            return self._page(results, position, reverse)
+
+        if reverse:
+            queryset = queryset.order_by(*[f"-{f}" for f in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(self.ordering, position, reverse))
+
+        # One extra row tells us whether there is anything beyond this page, without a COUNT.
+        return self._page(list(queryset[:self.page_size + 1]), position, reverse)
+
+    def _page(self, results, position, reverse):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.first_key = self._key_of(results[0]) if results else None
+        self.last_key = self._key_of(results[-1]) if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.last_key is None:
+            return self.get_first_link()
+        return self.encode_cursor(self.last_key, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_key is None:
+            # Empty page (rows were deleted under the cursor); restart from the beginning.
+            return self.get_first_link()
+        return self.encode_cursor(self.first_key, reverse=True)
+
+    def get_first_link(self):
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, "")
+
+    # -------------------- cursor helpers --------------------
+    def _key_of(self, obj):
+        if isinstance(obj, dict):  # values() rows (see common.serialization.RowEncoder)
+            return [obj[f] for f in self.ordering]
+        return [getattr(obj, f) for f in self.ordering]
+
+    @staticmethod
+    def _seek_filter(fields, values, reverse):
+        # Expanded row comparison (a, b, c) > (x, y, z), written so the leading column is a plain range predicate.
+        op = "lt" if reverse else "gt"
+        first, value = fields[0], values[0]
+        if len(fields) == 1:
+            return Q(**{f"{first}__{op}": value})
+        rest = KeysetPagination._seek_filter(fields[1:], values[1:], reverse)
+        return Q(**{f"{first}__{op}e": value}) & (Q(**{f"{first}__{op}": value}) | rest)
+
+    def decode_cursor(self, request, model=None):
+        """(key values, reverse) of the ?cursor= param, each value converted by its model field; 404 if invalid."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            position = payload["k"]
+            reverse = bool(payload.get("r", False))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if model is not None:
+            try:
+                position = [self._cursor_value(model, name, value) for name, value in zip(self.ordering, position)]
+            except (ValidationError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def _cursor_value(model, name, value):
+        # The ordering columns are NOT NULL: a key value is the JSON form of one (e.g. an ISO date string)
+        if value is None or isinstance(value, (list, dict)):
+            raise TypeError(value)
+        return model._meta.get_field(name).to_python(value)
+
+    def encode_cursor(self, key, reverse):
+        payload = {"k": key}
+        if reverse:
+            payload["r"] = 1
+        raw = json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":"))
+        encoded = base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+
+class NDJSONParser(BaseParser):
+    """
+    Newline delimited JSON (one object per line), parsed into a list.
+    e.g. curl -X POST ".../attendance/bulk/" -H "Content-Type: application/x-ndjson" --data-binary @rows.ndjson
+    """
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", "utf-8")
+        rows = []
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line.decode(encoding)))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error on line {line_no} - {exc}")
+        return rows
+
+
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+    def write(self, value):
+        return value
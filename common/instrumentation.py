@@ -0,0 +1,226 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+logger = logging.getLogger("ems.requests")
+
+METRICS_WINDOW = 1000  # most recent requests kept per URL name for the percentiles
+
+# The QueryStats of the enclosing collect_queries() block; copied into worker threads by asgiref/asyncio,
+# so queries a request runs on other connections (see common.concurrency) are counted too.
+_current_stats = contextvars.ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    """
+    Database execute wrapper counting and timing every query run while it is installed.
+    See https://docs.djangoproject.com/en/5.2/topics/db/instrumentation/
+    """
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = ""
+        self.queries = []  # (ms, sql)
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self.lock:
+                self.count += 1
+                self.total_ms += elapsed
+                self.queries.append((elapsed, sql))
+                if elapsed >= self.slowest_ms:
+                    self.slowest_ms = elapsed
+                    self.slowest_sql = sql
+
+
+@contextmanager
+def collect_queries():
+    """Install a QueryStats on every configured database for the duration of the block."""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        with _installed(stats):
+            yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def forward_queries():
+    """
+    Count the queries of this (worker) thread's connections into the enclosing collect_queries() block,
+    whose QueryStats reaches here through the copied context. No-op outside such a block.
+    """
+    stats = _current_stats.get()
+    if stats is None:
+        yield
+        return
+    with _installed(stats):
+        yield
+
+
+@contextmanager
+def _installed(stats):
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+        yield
+
+
+@contextmanager
+def query_budget(max_queries):
+    """
+    Test helper: fail if the block runs more than max_queries queries, e.g.
+
+        with query_budget(3):
+            self.client.get(url)
+    """
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        listing = "\n".join(f"  {ms:.2f}ms {sql}" for ms, sql in stats.queries)
+        raise AssertionError(f"{stats.count} queries executed, budget is {max_queries}:\n{listing}")
+
+
+class RequestMetrics:
+    """In-process, per URL name aggregate of request latency and query counts."""
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.count = defaultdict(int)
+            self.durations = defaultdict(lambda: deque(maxlen=self.window))
+            self.queries = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, name, duration_ms, query_count):
+        with self.lock:
+            self.count[name] += 1
+            self.durations[name].append(duration_ms)
+            self.queries[name].append(query_count)
+
+    @staticmethod
+    def _percentile(ordered, pct):
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return round(ordered[index], 2)
+
+    def snapshot(self):
+        with self.lock:
+            items = [(name, self.count[name], sorted(self.durations[name]), list(self.queries[name]))
+                     for name in self.count]
+        return {
+            name: {
+                "count": count,
+                "p50_ms": self._percentile(durations, 50),
+                "p95_ms": self._percentile(durations, 95),
+                "p99_ms": self._percentile(durations, 99),
+                "max_ms": round(durations[-1], 2),
+                "avg_queries": round(sum(queries) / len(queries), 2),
+                "max_queries": max(queries),
+            }
+            for name, count, durations, queries in sorted(items)
+        }
+
+
+request_metrics = RequestMetrics()
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Per request query count, DB time, slowest query and response render time.
+    Exposed as Server-Timing headers, one structured DEBUG log line on "ems.requests" (REQUEST_LOG_LEVEL=DEBUG),
+    and the request_metrics aggregate (served at /api-metrics/requests/ to admins).
+    Sync and async: under ASGI, async views are awaited directly instead of being run in a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request._render_ms = 0.0
+        start = time.perf_counter()
+        with collect_queries() as stats:
+            response = self.get_response(request)
+        return self._instrument(request, response, stats, start)
+
+    async def __acall__(self, request):
+        request._render_ms = 0.0
+        start = time.perf_counter()
+        # Connections are per thread and the ORM calls of an async view run on the request's thread-sensitive
+        # sync_to_async thread (one per request under ASGIHandler): install the wrapper there.
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        installed = ExitStack()
+        await sync_to_async(installed.enter_context)(_installed(stats))
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(installed.close)()
+            _current_stats.reset(token)
+        return self._instrument(request, response, stats, start)
+
+    def _instrument(self, request, response, stats, start):
+        total_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        name = (match.view_name if match else None) or "unresolved"
+        request_metrics.record(name, total_ms, stats.count)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries"',
+            f"db-slowest;dur={stats.slowest_ms:.2f}",
+            f"render;dur={request._render_ms:.2f}",
+            f"total;dur={total_ms:.2f}",
+        ])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({
+                "event": "request",
+                "method": request.method,
+                "path": request.path,
+                "view": name,
+                "status": response.status_code,
+                "duration_ms": round(total_ms, 2),
+                "queries": stats.count,
+                "db_ms": round(stats.total_ms, 2),
+                "slowest_query_ms": round(stats.slowest_ms, 2),
+                "slowest_query": stats.slowest_sql[:500],
+                "render_ms": round(request._render_ms, 2),
+            }))
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF Responses are rendered (serialized to JSON) after the view returns; time that step.
+        render = response.render
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request._render_ms += (time.perf_counter() - start) * 1000
+
+        response.render = timed_render
+        return response
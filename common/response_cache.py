@@ -0,0 +1,199 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db import models, transaction
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from common.conditional import check_preconditions
+
+# Versioned response cache for repetitive list and detail GETs.
+#
+# An entry is keyed by route, user scope, normalized query params and the current generation of every model
+# the view reads. Writes never delete entries: they bump their model's generation (GenerationQuerySet and
+# GenerationModel), which changes the key of every response built from that model. Old
+# entries are never read again and expire with their timeout; responses of other models stay cached.
+#
+# CACHES["responses"] holds the entries and the generations: per process (locmem) by default, or a shared
+# backend (RESPONSE_CACHE_URL) so that every server process sees the same generations.
+
+RESPONSE_CACHE_ALIAS = "responses"
+RESPONSE_CACHE_TIMEOUT = 300      # seconds; bounds the staleness across processes with the locmem backend
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+
+def response_cache():
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+def generation_key(label):
+    return f"gen:{label}"
+
+
+def current_generations(labels):
+    """[generation of each model label], one cache round trip."""
+    cache = response_cache()
+    keys = [generation_key(label) for label in labels]
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        # A lost (evicted) counter restarts from the clock, never at a value older entries may be keyed with
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, None)
+        values.update(cache.get_many(missing))
+    return [values.get(key) for key in keys]
+
+
+def bump_generation(*labels, using=None):
+    """Move the given model labels (e.g. "structures.department") to a new generation, now and after commit."""
+    def bump():
+        cache = response_cache()
+        for label in labels:
+            try:
+                cache.incr(generation_key(label))
+            except ValueError:  # not set yet, or evicted
+                cache.add(generation_key(label), time.time_ns(), None)
+
+    if labels:
+        bump()  # the writer's own reads in this transaction
+        # and again after commit, so a concurrent request cannot cache the pre-write rows under the new generation
+        transaction.on_commit(bump, using=using)
+
+
+def _deleted_labels(result):
+    # delete() returns (total, {"app.Model": count}), cascades included
+    return [apps.get_model(label)._meta.label_lower for label, count in result[1].items() if count]
+
+
+class GenerationQuerySet(models.QuerySet):
+    """Bumps the model's response cache generation on the bulk write paths, which bypass save()/delete()."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        bump_generation(self.model._meta.label_lower, using=self.db)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        bump_generation(self.model._meta.label_lower, using=self.db)
+        return rows
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        bump_generation(self.model._meta.label_lower, using=self.db)
+        return rows
+
+    def delete(self):
+        result = super().delete()
+        bump_generation(*_deleted_labels(result), using=self.db)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class GenerationModel(models.Model):
+    """Bumps the model's response cache generation on save() and delete() (and of the cascaded models)."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_generation(self._meta.concrete_model._meta.label_lower, using=kwargs.get("using"))
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_generation(*_deleted_labels(result), using=kwargs.get("using"))
+        return result
+
+
+class ResponseCacheMetrics:
+    """Hit/miss counters per route of this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def record(self, route, hit):
+        with self.lock:
+            self.counts[route]["hits" if hit else "misses"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                route: {**counts, "hit_ratio": round(counts["hits"] / (counts["hits"] + counts["misses"]), 4)}
+                for route, counts in sorted(self.counts.items())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+
+
+response_cache_metrics = ResponseCacheMetrics()
+
+
+def response_cache_key(request, route, view_kwargs, generations):
+    user = request.user
+    scope = f"user:{user.pk}" if user.is_authenticated else "anon"
+    params = sorted((key, request.query_params.getlist(key)) for key in request.query_params)
+    # The absolute base URL too: pagination links are absolute
+    raw = repr((request.build_absolute_uri("/"), sorted(view_kwargs.items()), scope, params, generations))
+    return f"response:{route}:{hashlib.md5(raw.encode('utf-8')).hexdigest()}"
+
+
+def cached_response(*depends_on, timeout=RESPONSE_CACHE_TIMEOUT, validate_last_modified=False):
+    """
+    Cache the 200 GET responses of a DRF function view (put it below @api_view, so authentication and
+    permissions still run), e.g.
+
+        @api_view(["GET", "POST"])
+        @cached_response(Department)
+        def department_list_and_create(request): ...
+
+    depends_on: the models the GET response is built from; their generations are part of the key.
+    The response data is cached (rendering still follows the request's Accept header), with its ETag and
+    Last-Modified: a hit whose ETag matches If-None-Match returns 304, and with validate_last_modified (detail
+    views; lists validate on the ETag only) so does a hit that is not newer than If-Modified-Since.
+    """
+    labels = [model._meta.label_lower for model in depends_on]
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return view(request, *args, **kwargs)
+            route = request.resolver_match.view_name
+            key = response_cache_key(request, route, kwargs, current_generations(labels))
+            cache = response_cache()
+
+            entry = cache.get(key)
+            response_cache_metrics.record(route, hit=entry is not None)
+            if entry is not None:
+                data, status_code, headers = entry
+                if "ETag" in headers:
+                    last_modified = None
+                    if validate_last_modified and "Last-Modified" in headers:
+                        last_modified = parse_http_date_safe(headers["Last-Modified"])
+                    not_modified = check_preconditions(request, headers["ETag"], last_modified)
+                    if not_modified is not None:
+                        return not_modified
+                response = Response(data, status=status_code, headers=headers)
+                response["X-Cache"] = "hit"
+                return response
+
+            response = view(request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                headers = {name: response[name] for name in CACHED_HEADERS if name in response}
+                cache.set(key, (response.data, response.status_code, headers), timeout)
+                response["X-Cache"] = "miss"
+            return response
+        return wrapper
+    return decorator
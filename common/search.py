@@ -0,0 +1,146 @@
+import threading
+from array import array
+from collections import defaultdict
+
+from django.db.models import Lookup
+
+# Substring search support.
+#   PostgreSQL: pg_trgm GIN indexes (create_trigram_indexes) serve `column ILIKE '%q%'` (ILikeContains)
+#   elsewhere:  NgramIndex, the same trigram idea kept in process memory
+
+SEPARATOR = "\x1f"  # joins the indexed values of one row; never part of a query
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _score(needle, text):
+    """Relevance of the best matching value: exact > prefix > word start > inside a word, shorter values first."""
+    best = 0.0
+    position = text.find(needle)
+    while position >= 0:
+        start = text.rfind(SEPARATOR, 0, position) + 1
+        end = text.find(SEPARATOR, position)
+        end = len(text) if end < 0 else end
+        if position == start:
+            score = 1.0 if end - start == len(needle) else 0.75
+        elif not text[position - 1].isalnum():
+            score = 0.5
+        else:
+            score = 0.25
+        best = max(best, score + 0.25 * len(needle) / (end - start))
+        position = text.find(needle, position + 1)
+    return best
+
+
+class NgramIndex:
+    """
+    In-process trigram index for case-insensitive substring search where the database has no trigram index.
+
+    Every row's values are lowercased and cut into their 3-character substrings; each trigram maps to the
+    ids containing it (compact array postings). A query reads the posting list of its rarest trigram and
+    verifies those candidates against the stored text, so it never scans every row.
+
+    Built lazily by loader() (an iterable of (id, value, value, ...)) on the first search. Single-row writes
+    update it in place (upsert/remove), bulk writes invalidate() it for a rebuild. The index is per process.
+    """
+    min_length = 3
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.postings = None  # {trigram: array of ids}
+        self.texts = None     # {id: lowercased values joined by SEPARATOR}
+
+    @property
+    def built(self):
+        return self.postings is not None
+
+    def invalidate(self):
+        with self.lock:
+            self.postings = self.texts = None
+
+    def build(self):
+        postings = defaultdict(lambda: array("q"))
+        texts = {}
+        for pk, *values in self.loader():
+            text = SEPARATOR.join((value or "").lower() for value in values)
+            texts[pk] = text
+            for gram in _trigrams(text):
+                postings[gram].append(pk)
+        with self.lock:
+            self.postings, self.texts = dict(postings), texts
+
+    def upsert(self, pk, values):
+        # Postings of the previous text stay behind; search() verifies every candidate against texts.
+        with self.lock:
+            if self.postings is None:
+                return
+            text = SEPARATOR.join((value or "").lower() for value in values)
+            self.texts[pk] = text
+            for gram in _trigrams(text):
+                self.postings.setdefault(gram, array("q")).append(pk)
+
+    def remove(self, pk):
+        with self.lock:
+            if self.texts is not None:
+                self.texts.pop(pk, None)
+
+    def search(self, query):
+        """[(id, score)] of the rows with a value containing query, best first (ties by id)."""
+        needle = query.lower().replace(SEPARATOR, "")
+        if len(needle) < self.min_length:
+            raise ValueError(f"Queries need at least {self.min_length} characters.")
+        if not self.built:
+            with self.build_lock:
+                if not self.built:
+                    self.build()
+        postings, texts = self.postings, self.texts
+
+        lists = [postings.get(gram) for gram in _trigrams(needle)]
+        if not all(lists):
+            return []
+        results = {}
+        for pk in min(lists, key=len):
+            if pk in results:
+                continue
+            text = texts.get(pk)
+            score = _score(needle, text) if text is not None else 0.0
+            if score:
+                results[pk] = score
+        return sorted(results.items(), key=lambda item: (-item[1], item[0]))
+
+
+class ILikeContains(Lookup):
+    """
+    `column ILIKE '%value%'` on PostgreSQL. Django's icontains compiles to UPPER(column) LIKE UPPER(...),
+    which a gin_trgm_ops index on the plain column cannot serve.
+    Use as an expression: qs.filter(ILikeContains(F("name"), q)).
+    """
+    lookup_name = "ilike_contains"
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        rhs_params = [f"%{connection.ops.prep_for_like_query(param)}%" for param in rhs_params]
+        return f"{lhs} ILIKE {rhs}", (*lhs_params, *rhs_params)
+
+
+def create_trigram_indexes(connection, table, indexes):
+    """
+    CREATE EXTENSION pg_trgm and a GIN (column gin_trgm_ops) index per {column: index name}, if missing.
+    Run from post_migrate: the indexes are PostgreSQL only, so they cannot live in Meta.indexes.
+    """
+    if connection.vendor != "postgresql":
+        return
+    if table not in connection.introspection.table_names():
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column, name in indexes.items():
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} USING gin ({quote(column)} gin_trgm_ops)"
+            )
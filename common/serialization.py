@@ -0,0 +1,202 @@
+from functools import lru_cache
+
+from django.core import exceptions as django_exceptions
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+
+# Fields whose to_representation() returns database values unchanged (str/int/valid choice)
+IDENTITY_FIELDS = {
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.ChoiceField,
+}
+
+
+class RowEncoder:
+    """
+    Read-only fast path for list endpoints of a flat ModelSerializer.
+
+    Instead of building model instances and walking the serializer fields per row,
+    the queryset is fetched with values() for exactly the declared columns and every row is turned
+    into the representation by one generated function, e.g. for AttendanceSerializer:
+
+        def encode_row(row):
+            return {"id": row["id"], "employee": row["employee_id"], "date": ...c2(row["date"]), "status": row["status"]}
+
+    The output is the same as Serializer(instances, many=True).data (see the parity tests).
+    Supported fields: model fields and PrimaryKeyRelatedField, without dotted sources.
+    """
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        model = serializer_class.Meta.model
+        self.columns = []
+        items = []
+        namespace = {}
+
+        for index, field in enumerate(f for f in serializer.fields.values() if not f.write_only):
+            if "." in field.source or field.source == "*":
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{field.field_name}: unsupported source.")
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{field.field_name}: not a model field.")
+
+            column = model_field.attname  # "employee_id" for the FK, the field name otherwise
+            self.columns.append(column)
+            value = f"row[{column!r}]"
+            if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                expression = value  # to_representation(PKOnlyObject) returns the pk itself
+            elif type(field) in IDENTITY_FIELDS:
+                expression = value
+            else:
+                namespace[f"c{index}"] = field.to_representation
+                expression = f"(None if (v{index} := {value}) is None else c{index}(v{index}))"
+            items.append(f"{field.field_name!r}: {expression}")
+
+        source = "def encode_row(row):\n    return {" + ", ".join(items) + "}\n"
+        exec(compile(source, f"<RowEncoder {serializer_class.__name__}>", "exec"), namespace)
+        self.encode_row = namespace["encode_row"]
+
+    def values(self, queryset, *extra):
+        """The queryset restricted to the serializer's columns (plus extra ones, e.g. "updated_at"), yielding dict rows."""
+        return queryset.values(*self.columns, *extra)
+
+    def encode(self, rows):
+        encode_row = self.encode_row
+        return [encode_row(row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def row_encoder(serializer_class):
+    """
+    The RowEncoder of a serializer, compiled once per process. List views page values() rows through it and
+    return the same JSON as Serializer(page, many=True).data, e.g.
+
+        encoder = row_encoder(EmployeeSerializer)
+        page = paginator.paginate_queryset(encoder.values(qs, "updated_at"), request)
+        return paginated_response(request, paginator, encoder, page)
+    """
+    return RowEncoder(serializer_class)
+
+
+class BatchPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that resolves from objects prefetched by BatchedListSerializer (one IN query
+    for the whole list) instead of one SELECT per row. Behaves like the parent when used on its own.
+    """
+    prefetched = None  # {pk: instance} while a batch is being validated
+
+    def to_internal_value(self, data):
+        if self.prefetched is None or self.pk_field is not None:
+            return super().to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, django_exceptions.ValidationError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        instance = self.prefetched.get(pk)
+        if instance is None:
+            self.fail("does_not_exist", pk_value=data)
+        return instance
+
+
+class BatchedListSerializer(serializers.ListSerializer):
+    """
+    many=True validation and creation with a constant number of queries:
+      - BatchPrimaryKeyRelatedField values of all rows are fetched with one IN query per relation,
+      - UniqueValidator / UniqueTogetherValidator run as one IN query each for the whole list
+        (plus duplicate detection inside the list) instead of one SELECT per row,
+      - create() is a single bulk_create.
+    Use with `list_serializer_class = BatchedListSerializer` in the child's Meta.
+    """
+
+    def to_internal_value(self, data):
+        if self.instance is not None or not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        child = self.child
+        related = {name: f for name, f in child.fields.items() if isinstance(f, BatchPrimaryKeyRelatedField)}
+        unique_fields = {
+            name: [v for v in f.validators if isinstance(v, UniqueValidator) and v.lookup == "exact"]
+            for name, f in child.fields.items()
+        }
+        unique_fields = {name: vs for name, vs in unique_fields.items() if vs}
+        together = [v for v in child.validators if isinstance(v, UniqueTogetherValidator)]
+
+        saved_validators = child.validators
+        saved_field_validators = {name: child.fields[name].validators for name in unique_fields}
+        try:
+            for name, field in related.items():
+                pks = {self._clean(field, item.get(name)) for item in data if isinstance(item, dict)}
+                pks.discard(None)
+                field.prefetched = field.get_queryset().in_bulk(pks)
+            self._unique_checks = self._prepare_unique_checks(data, unique_fields, together)
+
+            # The batched checks replace the per row ones
+            child.validators = [v for v in saved_validators if v not in together]
+            for name, validators in unique_fields.items():
+                child.fields[name].validators = [v for v in saved_field_validators[name] if v not in validators]
+            return super().to_internal_value(data)
+        finally:
+            child.validators = saved_validators
+            for name, validators in saved_field_validators.items():
+                child.fields[name].validators = validators
+            for field in related.values():
+                field.prefetched = None
+
+    @staticmethod
+    def _clean(field, value):
+        """Value as the database sees it, or None if it would not validate anyway."""
+        try:
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                return field.get_queryset().model._meta.pk.to_python(value)
+            return field.to_internal_value(value)
+        except (TypeError, ValueError, ValidationError, django_exceptions.ValidationError):
+            return None
+
+    def _prepare_unique_checks(self, data, unique_fields, together):
+        """[(field names, message, {existing keys}, {seen keys})] with one query per validator."""
+        checks = []
+        rows = [item for item in data if isinstance(item, dict)]
+        for name, validators in unique_fields.items():
+            field = self.child.fields[name]
+            values = {self._clean(field, item.get(name)) for item in rows} - {None}
+            column = field.source_attrs[-1]
+            for validator in validators:
+                existing = validator.queryset.filter(**{f"{column}__in": values}).values_list(column, flat=True)
+                checks.append(((name,), {name: [validator.message]}, {(v,) for v in existing}, set()))
+        for validator in together:
+            fields = list(validator.fields)
+            columns = [self.child.fields[f].source for f in fields]
+            candidates = [tuple(self._clean(self.child.fields[f], item.get(f)) for f in fields) for item in rows]
+            candidates = [key for key in candidates if None not in key]
+            existing = set()
+            if candidates:
+                filters = {f"{column}__in": {key[i] for key in candidates} for i, column in enumerate(columns)}
+                model = validator.queryset.model
+                attnames = [model._meta.get_field(column).attname for column in columns]
+                # Superset query (IN per column), narrowed to the exact pairs in Python
+                existing = set(validator.queryset.filter(**filters).values_list(*attnames)) & set(candidates)
+            message = validator.message.format(field_names=", ".join(fields))
+            checks.append((tuple(fields), {api_settings.NON_FIELD_ERRORS_KEY: [message]}, existing, set()))
+        return checks
+
+    def run_child_validation(self, data):
+        validated = super().run_child_validation(data)
+        for fields, errors, existing, seen in self._unique_checks:
+            key = tuple(getattr(validated[f], "pk", validated[f]) for f in fields)
+            if key in existing or key in seen:
+                raise ValidationError(errors, code="unique")
+            seen.add(key)
+        return validated
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        with transaction.atomic():
+            return model.objects.bulk_create([model(**attrs) for attrs in validated_data])
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from common.conditional import check_preconditions
+from common.warmup import process_local_caches
+
+# Precomputed report snapshots (manage.py build_report_snapshots).
+#
+# A snapshot is one report page (HTML) and its chart dataset (JSON), gzip compressed and named by a hash of
+# their content: <REPORT_SNAPSHOT_ROOT>/<report>/<key>.<hash>.html.gz. manifest.json maps every report and
+# key to its hashes, so the directory can also be served as immutable static files.
+#
+# A view serves its snapshot only while it is fresh: built less than REPORT_SNAPSHOT_MAX_AGE seconds ago,
+# and no write to its source rows committed since the build started. Writes record their time in the
+# default cache (mark_stale), which every process writing those rows must see: with a per-process (local
+# memory) default cache no snapshot is ever fresh, and the views compute their reports live.
+
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 16  # hex digits of sha256 in file names and ETags
+ALL_KEYS = "*"    # mark_stale() of a whole report
+
+
+def snapshot_root():
+    return settings.REPORT_SNAPSHOT_ROOT
+
+
+def snapshot_path(report, key, digest, extension):
+    """Path of a snapshot file, relative to the snapshot root."""
+    return os.path.join(report, f"{key}.{digest}.{extension}.gz")
+
+
+def _write_file(root, path, content):
+    target = os.path.join(root, path)
+    if os.path.exists(target):
+        return  # named by its content: already there
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    with os.fdopen(fd, "wb") as file:
+        file.write(gzip.compress(content, compresslevel=9, mtime=0))
+    os.chmod(temporary, 0o644)  # mkstemp creates it owner-only; a static file server must read it
+    os.replace(temporary, target)  # readers never see a partial file
+
+
+def write_snapshot(root, report, key, html, data):
+    """Write the page and dataset of one report key; returns their hashes, the key's manifest entry."""
+    entry = {}
+    for extension, content in (("html", html.encode("utf-8")),
+                               ("json", json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8"))):
+        digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+        _write_file(root, snapshot_path(report, key, digest, extension), content)
+        entry[extension] = digest
+    return entry
+
+
+def write_manifest(root, manifest):
+    """Replace the manifest atomically, then delete the snapshot files it no longer refers to."""
+    os.makedirs(root, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=root, suffix=".tmp")
+    with os.fdopen(fd, "w") as file:
+        json.dump(manifest, file, separators=(",", ":"))
+    os.chmod(temporary, 0o644)
+    os.replace(temporary, os.path.join(root, MANIFEST_NAME))
+
+    for report, built in manifest["reports"].items():
+        current = {
+            snapshot_path(report, key, digest, extension)
+            for key, entry in built["items"].items() for extension, digest in entry.items()
+        }
+        directory = os.path.join(root, report)
+        for name in os.listdir(directory) if os.path.isdir(directory) else ():
+            if os.path.join(report, name) not in current:
+                os.remove(os.path.join(directory, name))
+
+
+class SnapshotManifest:
+    """The manifest of this process, read again when the file changes (one stat per lookup)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = (None, None, {"reports": {}})  # (root, (mtime_ns, size), manifest)
+
+    def load(self):
+        root = str(snapshot_root())
+        try:
+            stat = os.stat(os.path.join(root, MANIFEST_NAME))
+        except OSError:
+            return {"reports": {}}
+        version = (stat.st_mtime_ns, stat.st_size)
+        loaded_root, loaded_version, manifest = self.loaded
+        if (loaded_root, loaded_version) != (root, version):
+            with self.lock:
+                try:
+                    with open(os.path.join(root, MANIFEST_NAME)) as file:
+                        manifest = json.load(file)
+                except (OSError, ValueError):
+                    return {"reports": {}}
+                self.loaded = (root, version, manifest)
+        return manifest
+
+
+snapshot_manifest = SnapshotManifest()
+
+
+def _stale_key(report, key):
+    return f"report-snapshot:written:{report}:{key}"
+
+
+def mark_stale(report, keys=None):
+    """After commit, record that the source rows of these report keys (all keys: None) have changed."""
+    keys = [ALL_KEYS] if keys is None else {str(key) for key in keys}
+
+    def mark():
+        now = time.time()
+        # A snapshot is never served past REPORT_SNAPSHOT_MAX_AGE, so neither is a mark needed longer
+        cache.set_many({_stale_key(report, key): now for key in keys}, settings.REPORT_SNAPSHOT_MAX_AGE)
+
+    if keys:
+        transaction.on_commit(mark)
+
+
+def fresh_snapshot(report, key):
+    """(manifest entry, built_at) of the report key's snapshot if it is fresh, else None."""
+    if "default" in process_local_caches():
+        return None  # writes of the other processes would never make it stale
+    built = snapshot_manifest.load()["reports"].get(report)
+    if built is None or str(key) not in built["items"]:
+        return None
+    if time.time() - built["built_at"] >= settings.REPORT_SNAPSHOT_MAX_AGE:
+        return None
+    written = cache.get_many([_stale_key(report, ALL_KEYS), _stale_key(report, key)])
+    if any(at >= built["built_at"] for at in written.values()):
+        return None
+    return built["items"][str(key)], built["built_at"]
+
+
+def snapshot_response(request, report, key):
+    """
+    The report key's snapshot page as an HttpResponse (gzip encoded when the client accepts it), a 304 if
+    If-None-Match matches it, or None when there is no fresh snapshot to serve.
+    """
+    found = fresh_snapshot(report, key)
+    if found is None:
+        return None
+    entry, built_at = found
+    encoded = "gzip" in request.headers.get("Accept-Encoding", "")
+    # Each encoding is its own representation, with its own ETag (a cache must not mix them up)
+    etag = f'"{entry["html"]}-gzip"' if encoded else f'"{entry["html"]}"'
+    not_modified = check_preconditions(request, etag, None)
+    if not_modified is not None:
+        return not_modified
+    try:
+        with open(os.path.join(snapshot_root(), snapshot_path(report, key, entry["html"], "html")), "rb") as file:
+            body = file.read()
+    except OSError:  # replaced by a newer build since the manifest was read
+        return None
+
+    response = HttpResponse(content_type="text/html; charset=utf-8")
+    if encoded:
+        response["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    response.content = body
+    response["ETag"] = etag
+    response["X-Snapshot"] = f"built {int(time.time() - built_at)}s ago"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
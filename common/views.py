@@ -0,0 +1,30 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from common.instrumentation import request_metrics
+from common.response_cache import response_cache_metrics
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def request_metrics_report(request):
+    """
+    Per URL name request count, latency p50/p95/p99 and query counts of this server process.
+    DELETE resets the counters.
+    """
+    if request.method == "DELETE":
+        request_metrics.reset()
+    return Response(request_metrics.snapshot())
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def response_cache_report(request):
+    """
+    Per URL name hits, misses and hit ratio of the response cache in this server process.
+    DELETE resets the counters.
+    """
+    if request.method == "DELETE":
+        response_cache_metrics.reset()
+    return Response(response_cache_metrics.snapshot())
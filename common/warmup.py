@@ -0,0 +1,67 @@
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+# Start-up warm-up for the production server (gunicorn.conf.py).
+#   prepare():           imports and compiles what the first requests would otherwise pay for; no database access,
+#                        so it can run in the gunicorn master before fork (preload_app) and be shared by the workers
+#   open_connections():  opens the persistent database connection of every request thread of a worker
+#   process_local_caches(): the caches that several worker processes cannot share (checked before starting them)
+
+
+def prepare():
+    """URL patterns (and with them every view module), templates and DRF's lazily imported classes."""
+    get_resolver().reverse_dict  # populates the resolver
+    for directory in settings.TEMPLATES[0]["DIRS"]:
+        for path in Path(directory).rglob("*.html"):
+            get_template(path.relative_to(directory).as_posix())
+
+    from rest_framework.settings import api_settings
+
+    for name in ("DEFAULT_RENDERER_CLASSES", "DEFAULT_PARSER_CLASSES", "DEFAULT_AUTHENTICATION_CLASSES",
+                 "DEFAULT_PERMISSION_CLASSES"):
+        getattr(api_settings, name)
+
+
+def process_local_caches():
+    """Aliases of the CACHES kept in each process's memory: another worker's writes never invalidate them."""
+    return [alias for alias, config in settings.CACHES.items()
+            if config["BACKEND"] == "django.core.cache.backends.locmem.LocMemCache"]
+
+
+def check_database():
+    """Connect to every database once (fails the worker early when one is unreachable), then hang up."""
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        connection.close()
+
+
+def _connect():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def open_connections(executor, threads, timeout=10):
+    """
+    Open the database connections of the executor's threads (one per thread and database) before the first
+    request. Only useful with persistent connections (CONN_MAX_AGE > 0): otherwise every request reconnects.
+    Returns the number of threads warmed.
+    """
+    if not any(connection.settings_dict["CONN_MAX_AGE"] != 0 for connection in connections.all()):
+        return 0
+    # The barrier holds every task until all of them run, so each lands on a different thread of the pool
+    barrier = threading.Barrier(threads)
+
+    def warm():
+        barrier.wait(timeout)
+        _connect()
+
+    futures = [executor.submit(warm) for _ in range(threads)]
+    for future in futures:
+        future.result(timeout)
+    return threads
@@ -12,5 +12,22 @@ echo "Creating Superuser"
 python manage.py createsuperuser --no-input
 echo "=================================="
 
-echo "Starting Server"
-python manage.py runserver 0.0.0.0:8000
+# SERVER_MODE: dev (runserver, default) | wsgi (gunicorn, threaded workers) | asgi (gunicorn + uvicorn workers)
+# Worker and thread counts etc. come from WEB_* variables, see gunicorn.conf.py
+case "${SERVER_MODE:-dev}" in
+    wsgi)
+        echo "Starting Server (gunicorn, WSGI)"
+        exec gunicorn employee_mgmt.wsgi:application
+        ;;
+    asgi)
+        # Django advises against persistent connections under ASGI (connections belong to executor threads):
+        # connect per request unless DB_CONN_MAX_AGE is set explicitly (e.g. behind PgBouncer)
+        export DB_CONN_MAX_AGE="${DB_CONN_MAX_AGE:-0}"
+        echo "Starting Server (gunicorn, ASGI)"
+        exec gunicorn employee_mgmt.asgi:application --worker-class uvicorn.workers.UvicornWorker
+        ;;
+    *)
+        echo "Starting Server"
+        python manage.py runserver 0.0.0.0:8000
+        ;;
+esac
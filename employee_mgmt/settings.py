@@ -39,7 +39,8 @@ SECRET_KEY = env('SECRET_KEY')
 DEBUG = env('DEBUG')
 
 # ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=["127.0.0.1", "localhost"])
-ALLOWED_HOSTS = []
+# Empty allows localhost while DEBUG is on; production (DEBUG=False) has to list its host names
+ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=[])
 
 
 # Application definition
@@ -56,6 +57,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'drf_yasg',
 
+    'common',
     'structures',
     'operations',
     # 'management',
@@ -63,6 +65,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common.instrumentation.QueryInstrumentationMiddleware',  # outermost, so it times the whole request
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -126,10 +129,28 @@ DATABASES = {
         "USER": os.environ["POSTGRES_USER"],
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
         "HOST": os.environ["DB_HOST"], # os.getenv("POSTGRES_HOST", "localhost"),  # or 127.0.0.1
-        "PORT": os.environ["DB_PORT"] # os.getenv("POSTGRES_PORT", "5432"),
+        "PORT": os.environ["DB_PORT"], # os.getenv("POSTGRES_PORT", "5432"),
+        # Persistent connections: each server thread keeps its connection for DB_CONN_MAX_AGE seconds
+        # (0 = one connection per request, None = unlimited) instead of reconnecting on every request,
+        # and checks it is still usable before reusing it after an idle period (restarts, failovers).
+        "CONN_MAX_AGE": env.int("DB_CONN_MAX_AGE", default=600),
+        "CONN_HEALTH_CHECKS": env.bool("DB_CONN_HEALTH_CHECKS", default=True),
+        "OPTIONS": {
+            "connect_timeout": env.int("DB_CONNECT_TIMEOUT", default=5),
+        },
     }
 }
 
+# Cache used for report payloads. The default local-memory cache is per process; with several
+# server processes use a shared backend so invalidations reach every worker, e.g.
+# CACHE_URL=rediscache://redis:6379/1  or  CACHE_URL=pymemcache://memcached:11211
+CACHES = {
+    "default": env.cache_url("CACHE_URL", default="locmemcache://"),
+    # Cached GET responses and their per model generations (common/response_cache.py). Per process by
+    # default; with several server processes use a shared backend, e.g. RESPONSE_CACHE_URL=rediscache://redis:6379/2
+    "responses": env.cache_url("RESPONSE_CACHE_URL", default="locmemcache://responses?max_entries=10000"),
+}
+
 '''
 # permission classes setup samples
 
@@ -150,7 +171,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication that caches the resolved users (see common/authentication.py)
+        'common.authentication.CachedJWTAuthentication',
     ],
 }
 
@@ -171,6 +193,22 @@ SWAGGER_SETTINGS = {
     },
 }
 
+# Request instrumentation (query count, DB time, latency) is logged as one JSON line per request.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "ems.requests": {
+            "handlers": ["console"],
+            "level": env("REQUEST_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -206,6 +244,12 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'  # collectstatic target, for the web server in front of gunicorn
+
+# Prebuilt report pages and datasets (manage.py build_report_snapshots, common/snapshots.py), served while
+# younger than REPORT_SNAPSHOT_MAX_AGE seconds and not marked stale by a write
+REPORT_SNAPSHOT_ROOT = Path(env("REPORT_SNAPSHOT_ROOT", default=str(BASE_DIR / "report_snapshots")))
+REPORT_SNAPSHOT_MAX_AGE = env.int("REPORT_SNAPSHOT_MAX_AGE", default=60 * 60)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
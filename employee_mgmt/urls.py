@@ -25,6 +25,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from common.views import request_metrics_report, response_cache_report
+
 schema_view = get_schema_view(
    openapi.Info(
       title="Employee Management System API",
@@ -42,6 +44,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api-structures/', include('structures.urls')),
     path('api-operations/', include('operations.urls')),
+    path('api-metrics/requests/', request_metrics_report, name='request-metrics'),
+    path('api-metrics/response-cache/', response_cache_report, name='response-cache-metrics'),
 
     path('api-auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api-auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
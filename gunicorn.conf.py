@@ -0,0 +1,72 @@
+"""
+Gunicorn settings of the production serving mode (django_entrypoint.sh with SERVER_MODE=wsgi or asgi).
+Loaded automatically when gunicorn starts from the project directory:
+
+    gunicorn employee_mgmt.wsgi:application                                             # threaded WSGI workers
+    gunicorn employee_mgmt.asgi:application --worker-class uvicorn.workers.UvicornWorker  # ASGI workers
+
+Every value can be overridden from the environment (WEB_*) or the command line.
+
+Several workers need shared caches (CACHE_URL, RESPONSE_CACHE_URL): gunicorn refuses to start them on the
+per-process local memory default, unless WEB_ALLOW_LOCAL_CACHES=1 (then it only logs a warning).
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("WEB_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("WEB_THREADS", 4))  # request threads per gthread worker
+worker_class = os.environ.get("WEB_WORKER_CLASS", "gthread")
+timeout = int(os.environ.get("WEB_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("WEB_KEEPALIVE", 5))
+# Recycle workers after this many requests (0 = never), jittered so they do not all restart together
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.environ.get("WEB_MAX_REQUESTS_JITTER", 0))
+
+# Import Django, the URL conf and every view once in the master; the forked workers share that memory
+# (copy-on-write) and start serving without paying for the imports again.
+preload_app = os.environ.get("WEB_PRELOAD", "1") != "0"
+
+
+def on_starting(server):
+    """Check the caches before forking: with per-process caches a write invalidates only its own worker's."""
+    if server.cfg.workers < 2:
+        return
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "employee_mgmt.settings")
+    from common.warmup import process_local_caches
+
+    local = process_local_caches()
+    if not local:
+        return
+    message = (
+        f"{server.cfg.workers} workers share no cache: CACHES {', '.join(local)} are local memory, so the other "
+        "workers keep serving cached responses, report payloads and users after a write. Set CACHE_URL and "
+        "RESPONSE_CACHE_URL to a shared backend (e.g. rediscache://redis:6379/1 and /2), or WEB_WORKERS=1."
+    )
+    if os.environ.get("WEB_ALLOW_LOCAL_CACHES") != "1":
+        server.log.error("%s WEB_ALLOW_LOCAL_CACHES=1 starts anyway.", message)
+        raise SystemExit(1)
+    server.log.warning("%s", message)
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from common.warmup import prepare
+
+        prepare()
+
+
+def post_worker_init(worker):
+    """Per worker warm-up: check the database and open the request threads' persistent connections."""
+    from common.warmup import check_database, open_connections, prepare
+
+    prepare()  # no-op after a preload, the imports are already there
+    check_database()
+    pool = getattr(worker, "tpool", None)  # gthread workers run requests on this thread pool
+    if pool is not None:
+        warmed = open_connections(pool, worker.cfg.threads)
+        worker.log.info("Worker %s warmed up (%s database connections opened)", worker.pid, warmed)
+    else:
+        worker.log.info("Worker %s warmed up", worker.pid)
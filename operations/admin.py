@@ -1,3 +1,24 @@
 from django.contrib import admin
 
-# Register your models here.
+from common.admin import LargeTableAdmin
+from operations.models import Attendance, Performance
+
+
+@admin.register(Attendance)
+class AttendanceAdmin(LargeTableAdmin):
+    list_display = ("id", "employee", "date", "status")
+    list_select_related = ("employee__department",)  # Employee.__str__ shows the department name
+    raw_id_fields = ("employee",)
+    date_hierarchy = "date"  # (date) index
+    sortable_by = ("id", "date")
+    ordering = ("-date", "-id")
+
+
+@admin.register(Performance)
+class PerformanceAdmin(LargeTableAdmin):
+    list_display = ("id", "employee", "rating", "review_date")
+    list_select_related = ("employee__department",)
+    raw_id_fields = ("employee",)
+    date_hierarchy = "review_date"  # (review_date, employee, rating) index
+    sortable_by = ("id", "review_date")
+    ordering = ("-review_date", "-id")
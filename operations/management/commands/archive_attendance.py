@@ -0,0 +1,83 @@
+'''
+# Move every attendance row before January 2024 into the packed archive (2 bits per employee-day)
+python manage.py archive_attendance --before 2024-01
+
+# Only count what would be moved
+python manage.py archive_attendance --before 2024-01 --dry-run
+'''
+
+from collections import defaultdict
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from operations.models import Attendance, AttendanceArchive
+from structures.models import Employee
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the Attendance rows of the months before --before into AttendanceArchive "
+        "(one packed row per employee-month). Monthly rollups are left as they are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--before", required=True, help="First month (YYYY-MM) that stays in the live table")
+        parser.add_argument("--batch-size", type=int, default=500, help="Employees archived per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Count the rows and months, change nothing")
+
+    def handle(self, *args, **opts):
+        try:
+            cutoff = datetime.strptime(opts["before"], "%Y-%m").date()
+        except ValueError:
+            raise CommandError("--before must be a month, YYYY-MM.")
+        if cutoff > timezone.localdate().replace(day=1):
+            raise CommandError("Only months before the current one can be archived.")
+
+        rows = months = 0
+        batch = []
+        for employee_id in Employee.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=5000):
+            batch.append(employee_id)
+            if len(batch) >= opts["batch_size"]:
+                moved = self.archive(batch, cutoff, opts["dry_run"])
+                rows, months, batch = rows + moved[0], months + moved[1], []
+        if batch:
+            moved = self.archive(batch, cutoff, opts["dry_run"])
+            rows, months = rows + moved[0], months + moved[1]
+
+        verb = "Would archive" if opts["dry_run"] else "Archived"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {rows} attendance rows into {months} employee-months."))
+
+    def archive(self, employee_ids, cutoff, dry_run):
+        """Pack, upsert and delete the live rows before cutoff of employee_ids. Returns (rows, months)."""
+        with transaction.atomic():
+            live = Attendance._base_manager.filter(employee_id__in=employee_ids, date__lt=cutoff)
+            packed = defaultdict(int)
+            rows = 0
+            for employee_id, day, status in live.values_list("employee_id", "date", "status").iterator(chunk_size=5000):
+                key = (employee_id, day.replace(day=1))
+                packed[key] = AttendanceArchive.set_day(packed[key], day.day, status)
+                rows += 1
+            if not packed or dry_run:
+                return rows, len(packed)
+
+            # Months archived by an earlier run: the rows recorded since then override the archived days
+            existing = AttendanceArchive.objects.filter(
+                employee_id__in={e for e, _ in packed}, month__in={m for _, m in packed},
+            ).select_for_update()
+            for employee_id, month, days in existing.values_list("employee_id", "month", "days"):
+                if (employee_id, month) in packed:
+                    packed[employee_id, month] = AttendanceArchive.merge(days, packed[employee_id, month])
+
+            AttendanceArchive.objects.bulk_create(
+                [AttendanceArchive(employee_id=e, month=m, days=days) for (e, m), days in packed.items()],
+                update_conflicts=True,
+                unique_fields=["employee", "month"],
+                update_fields=["days", "updated_at"],
+                batch_size=5000,
+            )
+            # The base manager's plain delete: the rows move with their statuses, so the rollups stay as they are
+            live.delete()
+        return rows, len(packed)
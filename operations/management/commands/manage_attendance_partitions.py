@@ -0,0 +1,235 @@
+'''
+# One-off: turn operations_attendance into a table partitioned by month (locks the table while it copies)
+python manage.py manage_attendance_partitions --convert
+
+# Pre-create the partitions of the current and next 3 months (schedule it, e.g. daily from cron)
+python manage.py manage_attendance_partitions --ahead 3
+
+# Detach the partitions older than 24 months, and drop them
+python manage.py manage_attendance_partitions --retain-months 24 --drop
+
+# Show the partitions and their estimated row counts
+python manage.py manage_attendance_partitions --list
+'''
+
+import re
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from operations.models import Attendance
+
+TABLE = Attendance._meta.db_table
+PARTITION_KEY = "date"
+DEFAULT_PARTITION = f"{TABLE}_default"
+BOUND_RE = re.compile(r"FOR VALUES FROM \('([0-9-]+)'\) TO \('([0-9-]+)'\)")
+
+
+def shift_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Monthly range partitioning of the Attendance table (PostgreSQL): convert the table, "
+        "pre-create future partitions, detach or drop expired ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--convert", action="store_true",
+                            help="Convert the existing table into a partitioned one (copies every row)")
+        parser.add_argument("--ahead", type=int, default=3,
+                            help="Months after the current one to create partitions for")
+        parser.add_argument("--retain-months", type=int,
+                            help="Detach partitions whose rows are all older than this many months")
+        parser.add_argument("--drop", action="store_true", help="With --retain-months: drop the detached partitions")
+        parser.add_argument("--list", action="store_true", help="List the partitions and exit")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("Table partitioning requires PostgreSQL.")
+        if opts["drop"] and opts["retain_months"] is None:
+            raise CommandError("--drop needs --retain-months.")
+        q = connection.ops.quote_name
+
+        if opts["list"]:
+            return self.list_partitions()
+
+        current = timezone.localdate().replace(day=1)
+        if opts["convert"]:
+            self.convert(current, opts["ahead"])
+        elif not self.is_partitioned():
+            raise CommandError(f"{TABLE} is not partitioned yet; run with --convert first.")
+
+        with transaction.atomic():
+            created = [m for m in (shift_months(current, i) for i in range(opts["ahead"] + 1)) if self.ensure(m)]
+        self.stdout.write(f"Partitions created: {len(created)}")
+
+        if opts["retain_months"] is not None:
+            cutoff = shift_months(current, -opts["retain_months"])
+            with transaction.atomic(), connection.cursor() as cursor:
+                for name, lower, upper in self.partitions():
+                    if upper is None or upper > cutoff:
+                        continue
+                    cursor.execute(f"ALTER TABLE {q(TABLE)} DETACH PARTITION {q(name)}")
+                    if opts["drop"]:
+                        cursor.execute(f"DROP TABLE {q(name)}")
+                    self.stdout.write(f"{'Dropped' if opts['drop'] else 'Detached'} {name} ({lower} .. {upper})")
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    # -------------------- introspection --------------------
+    def is_partitioned(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+            row = cursor.fetchone()
+        return row is not None and row[0] == "p"
+
+    def partitions(self):
+        """[(name, lower, upper)] ordered by lower bound; (name, None, None) for the default partition."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass",
+                [TABLE],
+            )
+            rows = cursor.fetchall()
+        result = []
+        for name, bound in rows:
+            match = BOUND_RE.search(bound)
+            if match:
+                result.append((name, date.fromisoformat(match[1]), date.fromisoformat(match[2])))
+            else:
+                result.append((name, None, None))
+        return sorted(result, key=lambda p: (p[1] is None, p[1] or date.min))
+
+    def list_partitions(self):
+        if not self.is_partitioned():
+            self.stdout.write(f"{TABLE} is not partitioned.")
+            return
+        with connection.cursor() as cursor:
+            for name, lower, upper in self.partitions():
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [name])
+                rows = max(cursor.fetchone()[0], 0)
+                bounds = f"{lower} .. {upper}" if lower else "DEFAULT"
+                self.stdout.write(f"{name:<40}{bounds:<26}~{rows} rows")
+
+    # -------------------- partitions --------------------
+    def ensure(self, month):
+        """Create the partition of month if missing; returns True if it was created."""
+        q = connection.ops.quote_name
+        name, upper = partition_name(month), shift_months(month, 1)
+        existing = self.partitions()
+        if any(lower == month for _, lower, _ in existing):
+            return False
+        with connection.cursor() as cursor:
+            in_default = False
+            if any(lower is None for _, lower, _ in existing):
+                cursor.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {q(DEFAULT_PARTITION)} WHERE {q(PARTITION_KEY)} >= %s "
+                    f"AND {q(PARTITION_KEY)} < %s)",
+                    [month, upper],
+                )
+                in_default = cursor.fetchone()[0]
+            if not in_default:
+                cursor.execute(
+                    f"CREATE TABLE {q(name)} PARTITION OF {q(TABLE)} FOR VALUES FROM (%s) TO (%s)", [month, upper]
+                )
+            else:
+                # Rows of that month already went to the default partition: move them, then attach.
+                cursor.execute(f"CREATE TABLE {q(name)} (LIKE {q(TABLE)} INCLUDING DEFAULTS)")
+                cursor.execute(
+                    f"WITH moved AS (DELETE FROM {q(DEFAULT_PARTITION)} WHERE {q(PARTITION_KEY)} >= %s "
+                    f"AND {q(PARTITION_KEY)} < %s RETURNING *) INSERT INTO {q(name)} SELECT * FROM moved",
+                    [month, upper],
+                )
+                cursor.execute(
+                    f"ALTER TABLE {q(TABLE)} ATTACH PARTITION {q(name)} FOR VALUES FROM (%s) TO (%s)", [month, upper]
+                )
+        return True
+
+    # -------------------- conversion --------------------
+    def convert(self, current, ahead):
+        """
+        Rebuild the table as PARTITION BY RANGE (date) under the same name, with the same columns, defaults,
+        constraints and index names (so Django's migrations keep matching), and copy the rows over.
+        A partitioned table's primary key and unique constraints must contain the partition key: the primary
+        key becomes (id, date); id stays unique through its sequence, and Django keeps using it as the pk.
+        """
+        if self.is_partitioned():
+            self.stdout.write(f"{TABLE} is already partitioned.")
+            return
+        q = connection.ops.quote_name
+        legacy = f"{TABLE}_unpartitioned"
+        sequence = f"{TABLE}_id_seq"
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")  # no pending deferred FK checks may block the ALTERs
+            cursor.execute(f"LOCK TABLE {q(TABLE)} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute("SELECT conname FROM pg_constraint WHERE confrelid = %s::regclass", [TABLE])
+            if cursor.fetchall():
+                raise CommandError(f"Other tables reference {TABLE}; a partitioned table cannot be referenced here.")
+            cursor.execute(
+                "SELECT c.conname, c.contype, pg_get_constraintdef(c.oid), "
+                "  EXISTS (SELECT 1 FROM pg_attribute a WHERE a.attrelid = c.conrelid AND a.attname = %s "
+                "          AND a.attnum = ANY (c.conkey)) "
+                "FROM pg_constraint c WHERE c.conrelid = %s::regclass",
+                [PARTITION_KEY, TABLE],
+            )
+            constraints = cursor.fetchall()
+            for name, kind, definition, has_key in constraints:
+                if kind == "u" and not has_key:
+                    raise CommandError(f"Unique constraint {name} does not include {PARTITION_KEY}; cannot partition.")
+            cursor.execute(
+                "SELECT pg_get_indexdef(x.indexrelid), x.indexrelid::regclass::text FROM pg_index x "
+                "WHERE x.indrelid = %s::regclass "
+                "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)",
+                [TABLE],
+            )
+            indexes = cursor.fetchall()  # definitions still read "ON public.operations_attendance", reused below
+            cursor.execute(f"SELECT MIN({q(PARTITION_KEY)}), COUNT(*) FROM {q(TABLE)}")
+            first_day, total = cursor.fetchone()
+
+            # Free every name (constraints, indexes, id sequence) on the old table
+            cursor.execute(f"ALTER TABLE {q(TABLE)} RENAME TO {q(legacy)}")
+            for name, kind, definition, has_key in constraints:
+                cursor.execute(f"ALTER TABLE {q(legacy)} DROP CONSTRAINT {q(name)}")
+            for definition, name in indexes:
+                cursor.execute(f"DROP INDEX {name}")
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [legacy])
+            old_sequence = cursor.fetchone()[0]
+            cursor.execute(f"ALTER TABLE {q(legacy)} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+            cursor.execute(f"ALTER TABLE {q(legacy)} ALTER COLUMN id DROP DEFAULT")
+            if old_sequence:
+                cursor.execute(f"DROP SEQUENCE IF EXISTS {old_sequence}")
+
+            # Identity columns on partitioned tables need PostgreSQL 17; a sequence default works everywhere
+            cursor.execute(
+                f"CREATE TABLE {q(TABLE)} (LIKE {q(legacy)} INCLUDING DEFAULTS) PARTITION BY RANGE ({q(PARTITION_KEY)})"
+            )
+            cursor.execute(f"CREATE SEQUENCE {q(sequence)} OWNED BY {q(TABLE)}.id")
+            cursor.execute(f"ALTER TABLE {q(TABLE)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+            cursor.execute(f"CREATE TABLE {q(DEFAULT_PARTITION)} PARTITION OF {q(TABLE)} DEFAULT")
+            month = (first_day or current).replace(day=1)
+            while month <= shift_months(current, ahead):
+                self.ensure(month)
+                month = shift_months(month, 1)
+
+            # Copy first, then build constraints and indexes in bulk (no per row index or deferred FK work)
+            cursor.execute(f"INSERT INTO {q(TABLE)} SELECT * FROM {q(legacy)}")
+            cursor.execute(f"DROP TABLE {q(legacy)}")
+            for name, kind, definition, has_key in constraints:
+                if kind == "p":
+                    definition = f"PRIMARY KEY (id, {q(PARTITION_KEY)})"
+                cursor.execute(f"ALTER TABLE {q(TABLE)} ADD CONSTRAINT {q(name)} {definition}")
+            for definition, name in indexes:
+                cursor.execute(definition)
+            cursor.execute(f"SELECT setval('{sequence}', COALESCE((SELECT MAX(id) FROM {q(TABLE)}), 0) + 1, false)")
+            cursor.execute(f"ANALYZE {q(TABLE)}")
+        self.stdout.write(f"Converted {TABLE} into monthly partitions ({total} rows copied).")
@@ -0,0 +1,28 @@
+'''
+# Backfill / repair every employee's monthly attendance rollup
+python manage.py rebuild_attendance_summary
+
+# Only some employees
+python manage.py rebuild_attendance_summary --employee 12 --employee 40
+'''
+
+from django.core.management.base import BaseCommand
+
+from operations.models import AttendanceMonthlySummary
+
+
+class Command(BaseCommand):
+    help = "Recompute AttendanceMonthlySummary rows from the Attendance table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employee", type=int, action="append", dest="employees",
+                            help="Employee id to rebuild (repeatable). Default: all employees")
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Summary rows inserted per statement")
+
+    def handle(self, *args, **opts):
+        employees = opts["employees"]
+        scope = f"{len(employees)} employee(s)" if employees else "all employees"
+        self.stdout.write(f"Rebuilding monthly attendance summaries for {scope}...")
+        written = AttendanceMonthlySummary.rebuild(employee_ids=employees, batch_size=opts["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Done. Summary rows written: {written}"))
@@ -1,7 +1,100 @@
-from django.db import models
+import operator
+from datetime import timedelta
+from functools import reduce
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Now, TruncMonth
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from common.helpers import SkipScanDatesQuerySet
+from common.snapshots import mark_stale
+from structures.models import MONTHLY_ATTENDANCE_SNAPSHOT, Employee, touch_for_bulk_update
+
+ROLLUP_KEY_FIELDS = ("employee_id", "date", "status")
+
+
+def _month_start(value):
+    if isinstance(value, str):
+        value = parse_date(value)
+    return value.replace(day=1)
+
+
+def _next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _affected_months(queryset):
+    return set(
+        queryset.order_by().annotate(rollup_month=TruncMonth("date"))
+        .values_list("employee_id", "rollup_month").distinct()
+    )
+
+
+def _in_archived_month(*keys):
+    """Whether any (employee_id, date, ...) key falls in a month of AttendanceArchive."""
+    # archive_attendance only archives months before the current one: today's writes skip the lookup.
+    current = timezone.localdate().replace(day=1)
+    keys = [(key[0], _month_start(key[1])) for key in keys if key is not None]
+    keys = [(employee_id, month) for employee_id, month in keys if month < current]
+    if not keys:
+        return False
+    return AttendanceArchive.objects.filter(
+        reduce(operator.or_, (Q(employee_id=employee_id, month=month) for employee_id, month in keys))
+    ).exists()
+
+
+class AttendanceQuerySet(SkipScanDatesQuerySet):
+    """
+    Keeps AttendanceMonthlySummary in step on the bulk paths, which bypass Attendance.save()/delete().
+    Each call refreshes only the affected (employee, month) rollups with a constant number of queries.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            AttendanceMonthlySummary.refresh((obj.employee_id, obj.date) for obj in objs)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = touch_for_bulk_update(objs, fields)
+        with transaction.atomic(using=self.db):
+            affected = {(obj.employee_id, obj.date) for obj in objs}
+            if {"employee", "employee_id", "date"} & set(fields):
+                stored = self.model._base_manager.using(self.db).filter(pk__in=[obj.pk for obj in objs])
+                affected |= _affected_months(stored)
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            AttendanceMonthlySummary.refresh(affected)
+        return rows
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())  # QuerySet.update() skips auto_now
+        with transaction.atomic(using=self.db):
+            if {"employee", "employee_id", "date"} & set(kwargs):
+                pks = list(self.values_list("pk", flat=True))
+                affected = _affected_months(self)
+                rows = super().update(**kwargs)
+                affected |= _affected_months(self.model._base_manager.using(self.db).filter(pk__in=pks))
+            else:
+                affected = _affected_months(self)
+                rows = super().update(**kwargs)
+            AttendanceMonthlySummary.refresh(affected)
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            affected = _affected_months(self)
+            result = super().delete()
+            AttendanceMonthlySummary.refresh(affected)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
-from structures.models import Employee
 
 class Attendance(models.Model):
     STATUS_CHOICES = [
@@ -18,6 +111,9 @@ class Attendance(models.Model):
     )
     date = models.DateField()
     status = models.CharField(max_length=1, choices=STATUS_CHOICES, default="P")
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+    objects = AttendanceQuerySet.as_manager()
 
     class Meta:
         # ordering = ["-date", "employee__name"]
@@ -32,6 +128,357 @@ class Attendance(models.Model):
     def __str__(self):
         return f"id: {self.id}, employee: {self.employee}, date: {self.date}, status: {self.get_status_display()}"
 
+    # -------------------- monthly rollup maintenance --------------------
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _stored_rollup_key(self):
+        """(employee_id, date, status) as currently stored in the database, or None for a new row."""
+        if self._state.adding:
+            return None
+        loaded = getattr(self, "_loaded_values", {})
+        if all(f in loaded and loaded[f] is not models.DEFERRED for f in ROLLUP_KEY_FIELDS):
+            return tuple(loaded[f] for f in ROLLUP_KEY_FIELDS)
+        return Attendance._base_manager.filter(pk=self.pk).values_list(*ROLLUP_KEY_FIELDS).first()
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            previous = self._stored_rollup_key()
+            super().save(*args, **kwargs)
+            current = (self.employee_id, self.date, self.status)
+            if previous != current and _in_archived_month(previous, current):
+                # The live row overrides (or now stops overriding) an archived day: recount those months
+                AttendanceMonthlySummary.refresh(key[:2] for key in (previous, current) if key is not None)
+            elif previous != current:
+                if previous is not None:
+                    AttendanceMonthlySummary.apply_delta(*previous, delta=-1)
+                AttendanceMonthlySummary.apply_delta(*current, delta=1)
+        self._loaded_values = dict(zip(ROLLUP_KEY_FIELDS, current))
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            previous = self._stored_rollup_key()
+            result = super().delete(*args, **kwargs)
+            if previous is not None and _in_archived_month(previous):
+                AttendanceMonthlySummary.refresh([previous[:2]])  # the archived status of that day counts again
+            elif previous is not None:
+                AttendanceMonthlySummary.apply_delta(*previous, delta=-1)
+        return result
+
+
+class AttendanceMonthlySummary(models.Model):
+    """
+    Per employee, per month attendance counts (rollup of Attendance and AttendanceArchive).
+    Kept up to date by Attendance.save()/delete() and AttendanceQuerySet; repair with `manage.py rebuild_attendance_summary`.
+    archive_attendance moves rows without changing any count, so archived months keep their rollups.
+    """
+    STATUS_FIELDS = {"P": "present", "A": "absent", "L": "late"}
+
+    id = models.BigAutoField(primary_key=True)
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name="attendance_summaries",
+    )
+    month = models.DateField(help_text="First day of the month")
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # The unique constraint's index also serves the per employee report lookups ordered by month.
+        constraints = [
+            models.UniqueConstraint(fields=["employee", "month"], name="uniq_attendance_summary_per_employee_per_month"),
+        ]
+
+    def __str__(self) -> str:
+        return (f"id: {self.id}, employee: {self.employee_id}, month: {self.month:%b %Y}, "
+                f"present: {self.present}, absent: {self.absent}, late: {self.late}")
+
+    @classmethod
+    def aggregate_source(cls, attendance_qs):
+        """Group an Attendance queryset into summary rows (employee_id, month, present, absent, late)."""
+        return attendance_qs.order_by().annotate(month=TruncMonth("date")).values("employee_id", "month").annotate(
+            present=Count("id", filter=Q(status="P")),
+            absent=Count("id", filter=Q(status="A")),
+            late=Count("id", filter=Q(status="L")),
+        )
+
+    @classmethod
+    def apply_delta(cls, employee_id, date, status, delta):
+        """Incremental path for single row writes: one UPDATE ... SET <status> = <status> + delta."""
+        field = cls.STATUS_FIELDS[status]
+        month = _month_start(date)
+        mark_stale(MONTHLY_ATTENDANCE_SNAPSHOT, [employee_id])
+        updated = cls.objects.filter(employee_id=employee_id, month=month).update(**{field: F(field) + delta})
+        if not updated and delta > 0:
+            summary, created = cls.objects.get_or_create(employee_id=employee_id, month=month, defaults={field: delta})
+            if not created:
+                cls.objects.filter(pk=summary.pk).update(**{field: F(field) + delta})
+        elif delta < 0:
+            # A month with no attendance left has no summary row (same as refresh()/rebuild()).
+            cls.objects.filter(employee_id=employee_id, month=month, present=0, absent=0, late=0).delete()
+
+    @classmethod
+    def refresh(cls, keys):
+        """
+        Recompute the rollups for the given (employee_id, date within month) keys from Attendance and AttendanceArchive.
+        Constant query count: one grouped SELECT, one upsert and one cleanup DELETE, plus one archive lookup
+        (and one SELECT of the live days of archived months, if any is affected).
+        """
+        months = {(employee_id, _month_start(date)) for employee_id, date in keys}
+        if not months:
+            return
+        employee_ids = {employee_id for employee_id, _ in months}
+        month_values = {month for _, month in months}
+        mark_stale(MONTHLY_ATTENDANCE_SNAPSHOT, employee_ids)
+
+        counts = dict.fromkeys(months, (0, 0, 0))
+        source = Attendance._base_manager.filter(
+            employee_id__in=employee_ids, date__gte=min(month_values), date__lt=_next_month(max(month_values)),
+        )
+        for row in cls.aggregate_source(source):
+            key = (row["employee_id"], row["month"])
+            if key in counts:
+                counts[key] = (row["present"], row["absent"], row["late"])
+
+        archived = {
+            (employee_id, month): days
+            for employee_id, month, days in AttendanceArchive.objects.filter(
+                employee_id__in=employee_ids, month__in=month_values,
+            ).values_list("employee_id", "month", "days")
+            if (employee_id, month) in counts
+        }
+        if archived:
+            # Live rows on archived days override them (and are already counted above)
+            for employee_id, day in source.filter(employee_id__in={e for e, _ in archived}).values_list(
+                    "employee_id", "date"):
+                key = (employee_id, day.replace(day=1))
+                if key in archived:
+                    archived[key] = AttendanceArchive.clear_day(archived[key], day.day)
+            for key, days in archived.items():
+                extra = AttendanceArchive.count_statuses(days)
+                counts[key] = tuple(n + extra[status] for n, status in zip(counts[key], cls.STATUS_FIELDS))
+
+        cls.objects.bulk_create(
+            [cls(employee_id=e, month=m, present=p, absent=a, late=l) for (e, m), (p, a, l) in counts.items()],
+            update_conflicts=True,
+            unique_fields=["employee", "month"],
+            update_fields=["present", "absent", "late"],
+        )
+        cls.objects.filter(
+            employee_id__in=employee_ids, month__in=month_values, present=0, absent=0, late=0,
+        ).delete()
+
+    @classmethod
+    def rebuild(cls, employee_ids=None, batch_size=5000):
+        """
+        Drop and recompute the rollups (all employees, or only employee_ids) from Attendance, then recount the
+        archived months with refresh(). Returns the number of summary rows.
+        """
+        source = Attendance._base_manager.all()
+        target = cls.objects.all()
+        archives = AttendanceArchive.objects.order_by("employee_id", "month")
+        if employee_ids:
+            source = source.filter(employee_id__in=employee_ids)
+            target = target.filter(employee_id__in=employee_ids)
+            archives = archives.filter(employee_id__in=employee_ids)
+
+        written = 0
+        with transaction.atomic():
+            mark_stale(MONTHLY_ATTENDANCE_SNAPSHOT, employee_ids or None)
+            target.delete()
+            batch = []
+            for row in cls.aggregate_source(source).iterator(chunk_size=batch_size):
+                batch.append(cls(**row))
+                if len(batch) >= batch_size:
+                    cls.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                cls.objects.bulk_create(batch)
+                written += len(batch)
+            if archives.exists():
+                keys = []
+                for key in archives.values_list("employee_id", "month").iterator(chunk_size=batch_size):
+                    keys.append(key)
+                    if len(keys) >= batch_size:
+                        cls.refresh(keys)
+                        keys = []
+                cls.refresh(keys)
+                written = target.count()
+        return written
+
+
+class AttendanceArchive(models.Model):
+    """
+    Archived attendance of one employee-month, packed into a fixed-size bigint of 2 bits per day:
+    day d is bits 2(d-1) and 2(d-1)+1, holding 0 (no record) or the STATUS_CODES of its status.
+    One row (~60 bytes with its index entry) replaces up to 31 Attendance rows and their four index entries.
+
+    Written by `manage.py archive_attendance`. A live Attendance row on an archived day overrides it.
+    """
+    STATUS_CODES = {"P": 1, "A": 2, "L": 3}
+    STATUSES = {code: status for status, code in STATUS_CODES.items()}
+    LOW_BITS = int("01" * 31, 2)  # the low bit of every day
+
+    id = models.BigAutoField(primary_key=True)
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name="attendance_archives",
+    )
+    month = models.DateField(help_text="First day of the month")
+    days = models.BigIntegerField(default=0, help_text="2 bits per day of the month, see STATUS_CODES")
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["employee", "month"], name="uniq_attendance_archive_per_employee_per_month"),
+        ]
+
+    def __str__(self) -> str:
+        counts = self.count_statuses(self.days)
+        return (f"id: {self.id}, employee: {self.employee_id}, month: {self.month:%b %Y}, "
+                f"present: {counts['P']}, absent: {counts['A']}, late: {counts['L']}")
+
+    # -------------------- packing --------------------
+    @classmethod
+    def set_day(cls, days, day, status):
+        shift = 2 * (day - 1)
+        return (days & ~(3 << shift)) | (cls.STATUS_CODES[status] << shift)
+
+    @staticmethod
+    def clear_day(days, day):
+        return days & ~(3 << 2 * (day - 1))
+
+    @classmethod
+    def merge(cls, days, newer):
+        """days with every day recorded in newer replaced by newer's status."""
+        recorded = (newer | newer >> 1) & cls.LOW_BITS
+        return (days & ~(recorded | recorded << 1)) | newer
+
+    @classmethod
+    def unpack(cls, days):
+        """[(day of month, status)] in day order."""
+        result = []
+        day = 1
+        while days:
+            if days & 3:
+                result.append((day, cls.STATUSES[days & 3]))
+            days >>= 2
+            day += 1
+        return result
+
+    @classmethod
+    def count_statuses(cls, days):
+        """{status: number of days} straight from the bits, without unpacking."""
+        low, high = days & cls.LOW_BITS, (days >> 1) & cls.LOW_BITS
+        return {"P": (low & ~high).bit_count(), "A": (high & ~low).bit_count(), "L": (low & high).bit_count()}
+
+    def rows(self):
+        """The archived days as Attendance values() rows (no id: archived days are not addressable)."""
+        return [
+            {"id": None, "employee_id": self.employee_id, "date": self.month.replace(day=day), "status": status,
+             "updated_at": self.updated_at}
+            for day, status in self.unpack(self.days)
+        ]
+
+
+class AttendanceHistory:
+    """
+    One employee's attendance ordered by date, archived months included, as Attendance values() rows with
+    "updated_at": stands in for the live rows queryset of the attendance list filtered by employee.
+    Supports count()/len() and slicing (page number pagination) and seek() (keyset pagination).
+
+    Archived months all precede the live-only ones, so the sequence is the decoded archive (with the live
+    rows on archived days merged in, both small) followed by the later live rows, which stay a lazy queryset.
+    """
+
+    def __init__(self, live_rows, archives):
+        self.model = live_rows.model  # keyset cursors are converted by its fields
+        self.employee_id = archives[0].employee_id
+        self.boundary = _next_month(max(archive.month for archive in archives))
+        head = {}
+        for archive in archives:
+            for row in archive.rows():
+                head[row["date"]] = row
+        for row in live_rows.filter(date__lt=self.boundary):
+            head[row["date"]] = row
+        self.head = [head[day] for day in sorted(head)]
+        self.tail = live_rows.filter(date__gte=self.boundary).order_by("date")
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = len(self.head) + self.tail.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None:
+            raise TypeError("AttendanceHistory only supports [start:stop] slicing.")
+        start, stop, split = item.start or 0, item.stop, len(self.head)
+        rows = self.head[start:stop]
+        if stop is None or stop > split:
+            rows += list(self.tail[max(start - split, 0):None if stop is None else stop - split])
+        return rows
+
+    def seek(self, position, reverse, limit):
+        """
+        Up to limit rows after (before, if reverse) the (employee_id, date) position, in scan order.
+        Raises ValueError for a malformed position.
+        """
+        if position is not None:
+            day = parse_date(str(position[1]))
+            if day is None:
+                raise ValueError(f"Invalid date {position[1]!r}.")
+            position = (int(position[0]), day)
+
+        def key(row):
+            return row["employee_id"], row["date"]
+
+        if reverse:
+            tail = self.tail.order_by("-date")
+            if position is not None:
+                tail = tail.filter(Q(employee_id__lt=position[0]) | Q(employee_id=position[0], date__lt=position[1]))
+            rows = list(tail[:limit])
+            head = [row for row in reversed(self.head) if position is None or key(row) < position]
+            return rows + head[:limit - len(rows)]
+
+        head = [row for row in self.head if position is None or key(row) > position][:limit]
+        if len(head) == limit:
+            return head
+        tail = self.tail
+        if position is not None:
+            tail = tail.filter(Q(employee_id__gt=position[0]) | Q(employee_id=position[0], date__gt=position[1]))
+        return head + list(tail[:limit - len(head)])
+
+class PerformanceQuerySet(SkipScanDatesQuerySet):
+    def department_rating_counts(self, start, end):
+        """
+        One GROUP BY (department, month, rating) over the reviews in [start, end): every statistic of the
+        department performance report (distribution, percentiles, monthly and rolling trend) derives from it.
+        Served by perf_date_emp_rating_idx (index-only range scan on review_date).
+        """
+        return (
+            self.filter(review_date__gte=start, review_date__lt=end)
+            .values(
+                "rating",
+                department_id=F("employee__department_id"),
+                department_name=F("employee__department__name"),
+                month=TruncMonth("review_date"),
+            )
+            .annotate(reviews=Count("*"))  # not COUNT(id): keeps the scan index-only
+            .order_by()
+        )
+
+
 class Performance(models.Model):
     id = models.BigAutoField(primary_key=True)
     employee = models.ForeignKey(
@@ -43,6 +490,9 @@ class Performance(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
     review_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+    objects = PerformanceQuerySet.as_manager()
 
     class Meta:
         '''
@@ -51,8 +501,13 @@ class Performance(models.Model):
             models.Index(fields=["employee", "-review_date"]),
         ]
         '''
-        # No need for indexes since Django already created the foreign-key index.
-        # And the sequence is not too important for performance. Can be indexed later if needed.
+        # Keyset (cursor) pagination of the list endpoint seeks on (employee, review_date, id);
+        # it also serves (employee, -review_date) lookups, scanned backwards.
+        # The department performance report scans a review_date window and only needs employee and rating.
+        indexes = [
+            models.Index(fields=["employee", "review_date", "id"], name="perf_emp_review_date_id_idx"),
+            models.Index(fields=["review_date", "employee", "rating"], name="perf_date_emp_rating_idx"),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(rating__gte=1, rating__lte=5),
@@ -1,15 +1,17 @@
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
+from common.serialization import BatchPrimaryKeyRelatedField, BatchedListSerializer
 from structures.models import Employee
 from operations.models import Attendance, Performance
 
 
 class AttendanceSerializer(serializers.ModelSerializer):
-    employee = serializers.PrimaryKeyRelatedField(queryset=Employee.objects.all())
+    employee = BatchPrimaryKeyRelatedField(queryset=Employee.objects.all())
 
     class Meta:
         model = Attendance
         fields = ["id", "employee", "date", "status"]
+        list_serializer_class = BatchedListSerializer  # many=True: one IN query per relation/unique check
         validators = [
             UniqueTogetherValidator(
                 queryset=Attendance.objects.all(),
@@ -20,8 +22,19 @@ class AttendanceSerializer(serializers.ModelSerializer):
 
 
 class PerformanceSerializer(serializers.ModelSerializer):
-    employee = serializers.PrimaryKeyRelatedField(queryset=Employee.objects.all())
+    employee = BatchPrimaryKeyRelatedField(queryset=Employee.objects.all())
 
     class Meta:
         model = Performance
-        fields = ["id", "employee", "rating", "review_date"]
\ No newline at end of file
+        fields = ["id", "employee", "rating", "review_date"]
+        list_serializer_class = BatchedListSerializer
+
+
+class AttendanceBulkRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk attendance upload.
+    Field checks only; the employee lookup and the (employee, date) conflict handling are done once for the whole batch.
+    """
+    employee = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+    status = serializers.ChoiceField(choices=Attendance.STATUS_CHOICES, default="P")
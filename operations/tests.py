@@ -1,3 +1,651 @@
-from django.test import TestCase
+import base64
+import io
+import json
+from datetime import date, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, models, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from common.instrumentation import collect_queries, query_budget
+from common.serialization import row_encoder
+from operations.models import Attendance, AttendanceArchive, AttendanceMonthlySummary, Performance
+from operations.serializers import AttendanceSerializer, PerformanceSerializer
+from structures.models import Department, Employee
+
+
+class OperationsQueryBudgetTests(TestCase):
+    """List and bulk views must run a fixed number of queries whatever the amount of rows (no N+1)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Engineering")
+        cls.employees = Employee.objects.bulk_create([
+            Employee(name=f"Employee {i}", email=f"employee{i}@example.com",
+                     date_of_joining=date(2024, 1, 1), department=department)
+            for i in range(5)
+        ])
+        start = date(2025, 1, 1)
+        Attendance.objects.bulk_create([
+            Attendance(employee=e, date=start + timedelta(days=d), status="P")
+            for e in cls.employees for d in range(20)
+        ])
+        Performance.objects.bulk_create([
+            Performance(employee=e, rating=1 + d % 5, review_date=start + timedelta(days=d))
+            for e in cls.employees for d in range(4)
+        ])
+
+    def test_list_views_query_budget(self):
+        for url in [reverse("attendance-list-and-create"), reverse("performance-list-and-create")]:
+            for page_size in (5, 100):
+                # page + estimate: COUNT (cached) elsewhere; on PostgreSQL pg_class.reltuples, plus the cached COUNT
+                # fallback while the table has never been analyzed
+                with self.subTest(url=url, page_size=page_size), query_budget(3):
+                    self.assertEqual(self.client.get(url, {"page_size": page_size}).status_code, 200)
+                with self.subTest(url=url, page_size=page_size, mode="cursor"), query_budget(1):  # page only
+                    self.assertEqual(self.client.get(url, {"page_size": page_size, "cursor": ""}).status_code, 200)
+
+    def test_countless_pagination_links(self):
+        url = reverse("attendance-list-and-create")
+        with query_budget(1):  # page_size + 1 rows, no COUNT
+            data = self.client.get(url, {"page_size": 30, "count": "none"}).json()
+        self.assertIsNone(data["count"])
+        self.assertEqual(len(data["results"]), 30)
+        self.assertIn("page=2", data["next"])
+        last = self.client.get(url, {"page_size": 30, "count": "none", "page": 4}).json()
+        self.assertIsNone(last["next"])
+        self.assertEqual(len(last["results"]), 10)
+        exact = self.client.get(url, {"page_size": 30, "count": "exact"}).json()
+        self.assertEqual(exact["count"], 100)
+        self.assertNotIn("count_mode", exact)
+
+    def test_cursor_pagination_walks_every_row_once(self):
+        url, seen = reverse("attendance-list-and-create") + "?cursor=&page_size=7", []
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(row["id"] for row in data["results"])
+            url = data["next"]
+        self.assertEqual(sorted(seen), sorted(Attendance.objects.values_list("id", flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_malformed_cursors_are_not_found(self):
+        for key in (["abc", "x"], [None, None], [1, "not-a-date"], [1, "2025-13-01"], [[1], {}], [1]):
+            cursor = base64.urlsafe_b64encode(json.dumps({"k": key}).encode()).decode()
+            for params in ({}, {"employee": self.employees[0].pk}):
+                with self.subTest(key=key, **params):
+                    response = self.client.get(reverse("attendance-list-and-create"), {"cursor": cursor, **params})
+                    self.assertEqual(response.status_code, 404)
+        cursor = base64.urlsafe_b64encode(json.dumps({"k": [1, "2025-01-01", "x"]}).encode()).decode()
+        self.assertEqual(self.client.get(reverse("performance-list-and-create"), {"cursor": cursor}).status_code, 404)
+
+    def test_bulk_upsert_query_count_does_not_grow_with_rows(self):
+        url, query_counts = reverse("attendance-bulk-upsert"), []
+        for month, days in ((3, 1), (4, 30)):
+            rows = [{"employee": e.id, "date": str(date(2026, month, 1) + timedelta(days=d)), "status": "L"}
+                    for e in self.employees for d in range(days)]
+            with collect_queries() as stats:
+                response = self.client.post(url, json.dumps(rows), content_type="application/json")
+            self.assertEqual(response.json()["created"], len(rows))
+            query_counts.append(stats.count)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_bulk_upsert_labels_rows_created_or_updated(self):
+        url, employee = reverse("attendance-bulk-upsert"), self.employees[0].pk
+        rows = [{"employee": employee, "date": "2025-01-20", "status": "A"},   # existing (seeded "P")
+                {"employee": employee, "date": "2026-06-01", "status": "L"}]
+        with collect_queries() as stats:
+            body = self.client.post(url, json.dumps(rows), content_type="application/json").json()
+        self.assertEqual([row["result"] for row in body["results"]], ["updated", "created"])
+        self.assertEqual((body["created"], body["updated"]), (1, 1))
+        if connection.vendor == "postgresql":  # the existing pairs are locked with the write
+            self.assertTrue(any("FOR UPDATE" in sql for _, sql in stats.queries))
+        self.assertEqual(Attendance.objects.get(employee=employee, date=date(2025, 1, 20)).status, "A")
+
+    def test_bulk_upsert_counts_superseded_rows_apart_from_failures(self):
+        employee = self.employees[0].pk
+        rows = [{"employee": employee, "date": "2026-06-02", "status": "L"},
+                {"employee": employee, "date": "2026-06-02", "status": "A"},   # supersedes the first row
+                {"employee": employee, "date": "June", "status": "P"}]
+        body = self.client.post(reverse("attendance-bulk-upsert"), json.dumps(rows),
+                                content_type="application/json").json()
+        self.assertEqual([row["result"] for row in body["results"]], ["skipped", "created", "error"])
+        self.assertEqual((body["created"], body["skipped"], body["failed"]), (1, 1, 1))
+
+    def test_row_encoder_parity(self):
+        for serializer_class, queryset in [(AttendanceSerializer, Attendance.objects.order_by("employee", "date")),
+                                           (PerformanceSerializer, Performance.objects.order_by("id"))]:
+            with self.subTest(serializer=serializer_class.__name__):
+                encoder = row_encoder(serializer_class)
+                self.assertEqual(
+                    JSONRenderer().render(encoder.encode(encoder.values(queryset))),
+                    JSONRenderer().render(serializer_class(queryset, many=True).data),
+                )
+
+    def test_list_create_validates_in_batch(self):
+        url = reverse("attendance-list-and-create")
+        query_counts = []
+        for month, days in ((5, 2), (6, 25)):
+            rows = [{"employee": e.id, "date": str(date(2026, month, 1) + timedelta(days=d)), "status": "A"}
+                    for e in self.employees for d in range(days)]
+            with collect_queries() as stats:
+                response = self.client.post(url, json.dumps(rows), content_type="application/json")
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.json()), len(rows))
+            query_counts.append(stats.count)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_list_create_reports_per_row_errors(self):
+        existing = Attendance.objects.first()
+        rows = [
+            {"employee": existing.employee_id, "date": str(existing.date), "status": "P"},  # exists
+            {"employee": 999999, "date": "2026-07-01", "status": "P"},                      # unknown employee
+            {"employee": self.employees[0].id, "date": "2026-07-01", "status": "P"},
+            {"employee": self.employees[0].id, "date": "2026-07-01", "status": "L"},        # duplicate in batch
+        ]
+        response = self.client.post(reverse("attendance-list-and-create"), json.dumps(rows),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertIn("non_field_errors", errors[0])
+        self.assertIn("employee", errors[1])
+        self.assertEqual(errors[2], {})
+        self.assertIn("non_field_errors", errors[3])
+
+
+class DepartmentPerformanceReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.engineering = Department.objects.create(name="Engineering")
+        sales = Department.objects.create(name="Sales")
+        cls.employees = Employee.objects.bulk_create([
+            Employee(name=f"E{i}", email=f"e{i}@example.com", date_of_joining=date(2020, 1, 1),
+                     department=cls.engineering if i < 4 else sales)
+            for i in range(6)
+        ])
+        engineers, sellers = cls.employees[:4], cls.employees[4:]
+        Performance.objects.bulk_create(
+            # Engineering, Jun 2025: ratings 1, 2, 4, 5 (+ a 5 in Jan 2025); Sales: 3, 3 in May 2025
+            [Performance(employee=e, rating=r, review_date=date(2025, 6, 10)) for e, r in zip(engineers, [1, 2, 4, 5])]
+            + [Performance(employee=engineers[0], rating=5, review_date=date(2025, 1, 15))]
+            + [Performance(employee=e, rating=3, review_date=date(2025, 5, 1)) for e in sellers]
+            # Outside the report window, inside the rolling window of its first month
+            + [Performance(employee=engineers[1], rating=1, review_date=date(2024, 12, 31))]
+        )
+
+    def test_report_is_one_query(self):
+        for months in (1, 12, 36):
+            with query_budget(1):
+                response = self.client.get(reverse("department-performance"), {"month": "2025-06", "months": months})
+            self.assertEqual(response.status_code, 200)
+
+    def test_statistics(self):
+        report = self.client.get(reverse("department-performance"), {"month": "2025-06", "months": 6}).json()
+        self.assertEqual((report["from"], report["to"]), ("2025-01-01", "2025-06-30"))
+        engineering, sales = report["departments"]
+        self.assertEqual(engineering["name"], "Engineering")
+        self.assertEqual(engineering["reviews"], 5)
+        self.assertEqual(engineering["average"], 3.4)
+        self.assertEqual(engineering["median"], 4)  # 1, 2, 4, 5, 5
+        self.assertEqual(engineering["percentiles"], {"p25": 2, "p50": 4, "p75": 5, "p90": 5})
+        self.assertEqual(engineering["histogram"], {"1": 1, "2": 1, "3": 0, "4": 1, "5": 2})
+        self.assertEqual((sales["median"], sales["percentiles"]["p90"]), (3, 3))
+
+        trend = {t["month"]: t for t in engineering["trend"]}
+        self.assertEqual(len(trend), 6)
+        self.assertEqual((trend["2025-01"]["average"], trend["2025-01"]["rolling_average"]), (5, 3))  # 5 and Dec's 1
+        self.assertEqual(trend["2025-03"]["average"], None)
+        self.assertEqual(trend["2025-06"]["rolling_average"], 3.0)  # 1, 5, 1, 2, 4, 5
+
+    def test_interpolated_percentiles_and_filters(self):
+        report = self.client.get(reverse("department-performance"),
+                                 {"month": "2025-06", "months": 1, "department": self.engineering.pk}).json()
+        [engineering] = report["departments"]
+        self.assertEqual(engineering["median"], 3)  # 1, 2, 4, 5 -> (2 + 4) / 2
+        self.assertEqual(engineering["percentiles"]["p90"], 4.7)
+        self.assertEqual(self.client.get(reverse("department-performance"), {"month": "June"}).status_code, 400)
+
+    def test_months_outside_the_date_range(self):
+        for name in ("department-performance", "department_performance_chart"):
+            for month in ("0001-01", "9999-12"):
+                with self.subTest(name, month=month):
+                    response = self.client.get(reverse(name), {"month": month})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn("out of range", response.json()["detail"])
+
+    def test_chart(self):
+        response = self.client.get(reverse("department_performance_chart"), {"month": "2025-06", "months": 6})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["labels"], ["Engineering", "Sales"])
+        self.assertEqual(len(response.context["months"]), 6)
+
+
+@skipUnless(connection.vendor == "postgresql", "declarative partitioning is PostgreSQL only")
+class AttendancePartitioningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Engineering")
+        cls.employee = Employee.objects.create(name="Alice", email="alice@example.com",
+                                               date_of_joining=date(2024, 1, 1), department=department)
+        Attendance.objects.bulk_create([
+            Attendance(employee=cls.employee, date=date(2025, 1, 1) + timedelta(days=d), status="P")
+            for d in range(70)
+        ])
+
+    def manage(self, **options):
+        call_command("manage_attendance_partitions", stdout=io.StringIO(), **options)
+
+    def test_convert_keeps_rows_constraints_and_queries(self):
+        ids = sorted(Attendance.objects.values_list("id", flat=True))
+        self.manage(convert=True, ahead=1)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'operations_attendance'::regclass")
+            self.assertEqual(cursor.fetchone()[0], "p")
+        self.assertEqual(sorted(Attendance.objects.values_list("id", flat=True)), ids)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Attendance.objects.create(employee=self.employee, date=date(2025, 1, 1))
+        self.assertGreater(Attendance.objects.create(employee=self.employee, date=date(2030, 1, 1)).pk, ids[-1])
+
+        response = self.client.post(reverse("attendance-bulk-upsert"), json.dumps([
+            {"employee": self.employee.pk, "date": "2025-02-01", "status": "L"},
+        ]), content_type="application/json")
+        self.assertEqual(response.json()["updated"], 1)
+        self.assertEqual(self.client.get(reverse("attendance-list-and-create"), {"cursor": ""}).status_code, 200)
+
+        plan = Attendance.objects.filter(date__gte=date(2025, 2, 1), date__lt=date(2025, 3, 1)).explain()
+        self.assertIn("operations_attendance_p2025_02", plan)
+        self.assertNotIn("operations_attendance_p2025_01", plan)  # pruned
+
+    def test_rows_in_default_partition_move_when_month_is_created(self):
+        self.manage(convert=True, ahead=0)
+        Attendance.objects.create(employee=self.employee, date=date(2040, 5, 5))
+        from operations.management.commands.manage_attendance_partitions import Command
+
+        Command().ensure(date(2040, 5, 1))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM operations_attendance_p2040_05")
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertTrue(Attendance.objects.filter(date=date(2040, 5, 5)).exists())
+
+    def test_retention_detaches_old_partitions(self):
+        self.manage(convert=True, ahead=0)
+        self.manage(retain_months=0, drop=True)
+        self.assertFalse(Attendance.objects.filter(date__lt=date(2025, 4, 1)).exists())
+
+
+class AttendanceArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Archive")
+        cls.employee = Employee.objects.create(name="Ada", email="ada@example.com", date_of_joining=date(2024, 1, 1),
+                                               department=department)
+        start = date(2025, 1, 1)
+        Attendance.objects.bulk_create([
+            Attendance(employee=cls.employee, date=start + timedelta(days=d), status="PALP"[d % 4])
+            for d in range(0, 75) if d % 9  # Jan to mid March, with gaps
+        ])
+
+    def list_all(self, **params):
+        url, rows = reverse("attendance-list-and-create"), []
+        params = {"employee": self.employee.pk, "page_size": 7, **params}
+        while url:
+            data = self.client.get(url, params).json()
+            rows.extend(data["results"])
+            url, params = data["next"], {}
+        return rows
+
+    def summaries(self):
+        return list(AttendanceMonthlySummary.objects.filter(employee=self.employee)
+                    .order_by("month").values_list("month", "present", "absent", "late"))
+
+    def archive(self, before="2025-03"):
+        call_command("archive_attendance", before=before, stdout=io.StringIO())
+
+    def test_packing(self):
+        days = 0
+        for day, status in ((1, "P"), (2, "A"), (31, "L"), (2, "L")):
+            days = AttendanceArchive.set_day(days, day, status)
+        self.assertLess(days, 2 ** 63)
+        self.assertEqual(AttendanceArchive.unpack(days), [(1, "P"), (2, "L"), (31, "L")])
+        self.assertEqual(AttendanceArchive.count_statuses(days), {"P": 1, "A": 0, "L": 2})
+        self.assertEqual(AttendanceArchive.unpack(AttendanceArchive.clear_day(days, 2)), [(1, "P"), (31, "L")])
+        newer = AttendanceArchive.set_day(0, 1, "A")
+        self.assertEqual(AttendanceArchive.unpack(AttendanceArchive.merge(days, newer)), [(1, "A"), (2, "L"), (31, "L")])
+
+    def test_archive_moves_months_and_keeps_rollups(self):
+        before, summaries = self.list_all(), self.summaries()
+        self.archive()
+
+        self.assertFalse(Attendance.objects.filter(date__lt=date(2025, 3, 1)).exists())
+        self.assertEqual(AttendanceArchive.objects.count(), 2)
+        self.assertEqual(self.summaries(), summaries)
+        AttendanceMonthlySummary.rebuild()
+        self.assertEqual(self.summaries(), summaries)
+
+        after = self.list_all()
+        self.assertEqual([(r["date"], r["status"]) for r in after], [(r["date"], r["status"]) for r in before])
+        self.assertTrue(all(r["id"] is None for r in after if r["date"] < "2025-03-01"))
+        self.assertTrue(all(r["id"] is not None for r in after if r["date"] >= "2025-03-01"))
+        self.assertEqual(self.list_all(cursor=""), after)
+        exact = self.client.get(reverse("attendance-list-and-create"),
+                                {"employee": self.employee.pk, "count": "exact", "page": 2, "page_size": 7}).json()
+        self.assertEqual((exact["count"], exact["results"]), (len(after), after[7:14]))
+
+        last = self.client.get(reverse("attendance-list-and-create"),
+                               {"employee": self.employee.pk, "cursor": "", "page_size": 60}).json()
+        previous = self.client.get(self.client.get(last["next"]).json()["previous"]).json()
+        self.assertEqual(previous["results"], after[:60])
+
+    def test_malformed_cursor_over_archived_months(self):
+        self.archive()
+        for key in (["abc", "x"], [None, None], [self.employee.pk, "not-a-date"]):
+            cursor = base64.urlsafe_b64encode(json.dumps({"k": key}).encode()).decode()
+            with self.subTest(key=key):
+                response = self.client.get(reverse("attendance-list-and-create"),
+                                           {"employee": self.employee.pk, "cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_live_rows_override_archived_days(self):
+        self.archive()
+        summaries = self.summaries()
+        url = reverse("attendance-list-and-create")
+        response = self.client.post(url, json.dumps({"employee": self.employee.pk, "date": "2025-01-02", "status": "P"}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        january = self.summaries()[0]
+        self.assertEqual(january[1:], (summaries[0][1] + 1, summaries[0][2] - 1, summaries[0][3]))  # was absent
+
+        rows = [r for r in self.list_all() if r["date"] == "2025-01-02"]
+        self.assertEqual([(r["id"], r["status"]) for r in rows], [(response.json()["id"], "P")])
+        AttendanceMonthlySummary.rebuild()
+        self.assertEqual(self.summaries()[0], january)
+
+        self.archive()  # archiving again folds the correction into the archive
+        self.assertEqual(self.summaries()[0], january)
+        Attendance.objects.create(employee=self.employee, date=date(2025, 1, 2), status="L").delete()
+        self.assertEqual(self.summaries()[0], january)
+
+    def test_dry_run_and_validation(self):
+        out = io.StringIO()
+        call_command("archive_attendance", before="2025-02", dry_run=True, stdout=out)
+        self.assertIn("Would archive", out.getvalue())
+        self.assertFalse(AttendanceArchive.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command("archive_attendance", before="2025-13")
+        with self.assertRaises(CommandError):
+            call_command("archive_attendance", before="2999-01")
+
+
+class AttendanceMatrixTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Support")
+        other = Department.objects.create(name="Other")
+        cls.bob, cls.ann, cls.cid = Employee.objects.bulk_create([
+            Employee(name=name, email=f"{name.lower()}@example.com", date_of_joining=date(2024, 1, 1),
+                     department=cls.department)
+            for name in ("Bob", "Ann", "Cid")
+        ])
+        outsider = Employee.objects.create(name="Out", email="out@example.com", date_of_joining=date(2024, 1, 1),
+                                           department=other)
+        Attendance.objects.bulk_create([
+            Attendance(employee=cls.ann, date=date(2025, 2, 1), status="P"),
+            Attendance(employee=cls.ann, date=date(2025, 2, 28), status="L"),
+            Attendance(employee=cls.ann, date=date(2025, 3, 1), status="A"),  # next month
+            Attendance(employee=cls.bob, date=date(2025, 2, 2), status="A"),
+            Attendance(employee=outsider, date=date(2025, 2, 1), status="A"),
+        ])
+
+    def get(self, **params):
+        return self.client.get(reverse("attendance-matrix"), {"department": self.department.pk, **params})
+
+    def test_matrix_is_one_query(self):
+        with query_budget(2):  # the department, the matrix
+            response = self.get(month="2025-02")
+            body = json.loads(b"".join(response.streaming_content))
+        self.assertEqual((body["month"], body["days"], body["department"]["name"]), ("2025-02", 28, "Support"))
+        self.assertEqual(body["employees"], [
+            {"id": self.ann.pk, "name": "Ann", "days": "P" + "-" * 26 + "L"},
+            {"id": self.bob.pk, "name": "Bob", "days": "-A" + "-" * 26},
+            {"id": self.cid.pk, "name": "Cid", "days": "-" * 28},
+        ])
+
+    def test_archived_days_and_csv(self):
+        AttendanceArchive.objects.create(employee=self.bob, month=date(2025, 2, 1),
+                                         days=AttendanceArchive.set_day(AttendanceArchive.set_day(0, 1, "L"), 2, "P"))
+        lines = b"".join(self.get(month="2025-02", export="csv").streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,name," + ",".join(str(day) for day in range(1, 29)))
+        self.assertEqual(lines[2], f"{self.bob.pk},Bob,L,A," + ",".join("-" * 26))  # live row beats the archive
+
+    def test_validation(self):
+        self.assertEqual(self.get(month="2025-13").status_code, 400)
+        self.assertEqual(self.get(month="9999-12").status_code, 400)  # its end month does not exist
+        self.assertEqual(self.client.get(reverse("attendance-matrix")).status_code, 400)
+        self.assertEqual(self.get(export="xml").status_code, 400)
+        self.assertEqual(self.client.get(reverse("attendance-matrix"), {"department": 999999}).status_code, 404)
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        departments = Department.objects.bulk_create([Department(name=f"Dept {i}") for i in range(3)])
+        employees = Employee.objects.bulk_create([
+            Employee(name=f"E{i}", email=f"e{i}@example.com", date_of_joining=date(2024, 1, 1),
+                     department=departments[i % 3])
+            for i in range(60)
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(employee=employee, date=date(2025, 1, 1) + timedelta(days=d), status="P")
+            for employee in employees for d in range(2)
+        ])
+        Performance.objects.bulk_create([
+            Performance(employee=employee, rating=3, review_date=date(2025, 1, 1)) for employee in employees
+        ])
+        cls.admin_user = get_user_model().objects.create_superuser("root", password="secret")
+
+    def setUp(self):
+        cache.clear()  # estimated counts are cached
+        self.client.force_login(self.admin_user)
+
+    def changelist_queries(self, model, per_page, **params):
+        cache.clear()
+        with mock.patch.object(admin.site._registry[model], "list_per_page", per_page), collect_queries() as stats:
+            response = self.client.get(reverse(f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist"),
+                                       params)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.context["cl"].result_list), per_page)
+        return stats.count
+
+    def test_changelist_queries_do_not_grow_with_page_size(self):
+        for model, params in [(Department, {}), (Employee, {}), (Employee, {"q": "E1"}), (Attendance, {}),
+                              (Attendance, {"date__year": 2025, "date__month": 1}), (Performance, {})]:
+            with self.subTest(model=model.__name__, params=params):
+                self.assertEqual(self.changelist_queries(model, 2, **params),
+                                 self.changelist_queries(model, 50, **params))
+
+    def test_no_full_table_count(self):
+        with mock.patch.object(admin.site._registry[Attendance], "list_per_page", 10), collect_queries() as stats:
+            response = self.client.get(reverse("admin:operations_attendance_changelist"), {"date__day": 1,
+                                       "date__month": 1, "date__year": 2025})
+        self.assertEqual(response.context["cl"].result_count, 60)
+        self.assertIsNone(response.context["cl"].full_result_count)
+        counts = [sql for _, sql in stats.queries if "COUNT(" in sql]
+        self.assertTrue(all("WHERE" in sql for sql in counts), counts)  # at most the filtered rows' count
+
+    def test_dates_match_distinct_dates(self):
+        Attendance.objects.create(employee=Employee.objects.first(), date=date(2026, 3, 9), status="A")
+        qs = Attendance.objects.filter(status__in=["P", "A"])
+        for kind in ("year", "month", "day"):
+            for order in ("ASC", "DESC"):
+                with self.subTest(kind=kind, order=order):
+                    self.assertEqual(list(qs.dates("date", kind, order)),
+                                     list(models.QuerySet.dates(qs, "date", kind, order)))
+        self.assertEqual(list(qs.filter(date__year=2024).dates("date", "month")), [])
+
+
+@skipUnless(connection.vendor == "postgresql", "the skip scan dates() is PostgreSQL only")
+class SkipScanDatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Dates")
+        cls.ann, cls.ben = Employee.objects.bulk_create([
+            Employee(name=name, email=f"{name.lower()}@example.com", date_of_joining=date(2024, 1, 1),
+                     department=department)
+            for name in ("Ann", "Ben")
+        ])
+        days = [date(2024, 2, 29), date(2024, 12, 31), date(2025, 1, 1), date(2025, 1, 31), date(2026, 6, 15)]
+        Attendance.objects.bulk_create([
+            Attendance(employee=employee, date=day, status="P")
+            for employee, employee_days in ((cls.ann, days), (cls.ben, days[::2])) for day in employee_days
+        ])
+        Performance.objects.bulk_create([
+            Performance(employee=cls.ann, rating=3, review_date=day) for day in days
+        ])
+
+    def test_one_recursive_query_with_the_distinct_dates_result(self):
+        for qs in (Attendance.objects.all(), Attendance.objects.filter(employee=self.ben),
+                   Attendance.objects.filter(date__gte=date(2025, 1, 1)), Performance.objects.all()):
+            field = "review_date" if qs.model is Performance else "date"
+            for kind in ("year", "month", "day"):
+                for order in ("ASC", "DESC"):
+                    with self.subTest(qs=str(qs.query), kind=kind, order=order):
+                        with collect_queries() as stats:
+                            found = qs.dates(field, kind, order)
+                        self.assertEqual(len(stats.queries), 1)
+                        self.assertIn("WITH RECURSIVE", stats.queries[0][1])
+                        self.assertEqual(found, list(models.QuerySet.dates(qs, field, kind, order)))
+
+    def test_no_matching_rows(self):
+        self.assertEqual(list(Attendance.objects.filter(date__year=2023).dates("date", "month")), [])
+
+
+class AttendanceRollupTests(TestCase):
+    """Every write path keeps AttendanceMonthlySummary equal to a rebuild from scratch."""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Rollup")
+        cls.ann, cls.ben = Employee.objects.bulk_create([
+            Employee(name=name, email=f"{name.lower()}@example.com", date_of_joining=date(2024, 1, 1),
+                     department=department)
+            for name in ("Ann", "Ben")
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(employee=employee, date=date(2025, 1, 30) + timedelta(days=d), status="PAL"[d % 3])
+            for employee in (cls.ann, cls.ben) for d in range(4)  # Jan 30 to Feb 2
+        ])
+
+    def summaries(self):
+        return sorted(AttendanceMonthlySummary.objects.values_list("employee_id", "month", "present", "absent", "late"))
+
+    def assertRollupMatchesRebuild(self):
+        maintained = self.summaries()
+        AttendanceMonthlySummary.rebuild()
+        self.assertEqual(maintained, self.summaries())
+
+    def test_initial_bulk_create(self):
+        self.assertEqual(len(self.summaries()), 4)
+        self.assertRollupMatchesRebuild()
+
+    def test_save_new_row(self):
+        Attendance.objects.create(employee=self.ann, date=date(2025, 3, 1), status="L")
+        self.assertRollupMatchesRebuild()
+
+    def test_save_changed_status_employee_and_date(self):
+        for change in ({"status": "A"}, {"employee": self.ben, "date": date(2025, 3, 5)},
+                       {"date": date(2025, 2, 20)}):
+            with self.subTest(change=change):
+                record = Attendance.objects.filter(employee=self.ann).order_by("date").first()
+                for field, value in change.items():
+                    setattr(record, field, value)
+                record.save()
+                self.assertRollupMatchesRebuild()
+
+    def test_delete_row(self):
+        Attendance.objects.filter(employee=self.ann).order_by("date").first().delete()
+        self.assertRollupMatchesRebuild()
+
+    def test_bulk_create_update_conflicts(self):
+        Attendance.objects.bulk_create(
+            [Attendance(employee=self.ann, date=date(2025, 1, 30), status="L"),
+             Attendance(employee=self.ann, date=date(2025, 4, 1), status="P")],
+            update_conflicts=True, unique_fields=["employee", "date"], update_fields=["status"],
+        )
+        self.assertRollupMatchesRebuild()
+
+    def test_bulk_update(self):
+        records = list(Attendance.objects.filter(employee=self.ann))
+        for record in records:
+            record.status = "A"
+        Attendance.objects.bulk_update(records, ["status"])
+        self.assertRollupMatchesRebuild()
+        for record in records:
+            record.date += timedelta(days=40)
+        Attendance.objects.bulk_update(records, ["date"])
+        self.assertRollupMatchesRebuild()
+
+    def test_queryset_update(self):
+        Attendance.objects.filter(date__month=2).update(status="L")
+        self.assertRollupMatchesRebuild()
+        Attendance.objects.filter(employee=self.ben, date=date(2025, 1, 30)).update(employee=self.ann,
+                                                                                   date=date(2025, 5, 1))
+        self.assertRollupMatchesRebuild()
+
+    def test_queryset_delete(self):
+        Attendance.objects.filter(date__month=1).delete()
+        self.assertRollupMatchesRebuild()
+
+    def test_rebuild_command(self):
+        expected = self.summaries()
+        AttendanceMonthlySummary.objects.filter(employee=self.ann).update(present=99)
+        AttendanceMonthlySummary.objects.filter(employee=self.ben).delete()
+        call_command("rebuild_attendance_summary", "--employee", str(self.ann.pk), stdout=io.StringIO())
+        self.assertEqual([row for row in self.summaries() if row[0] == self.ann.pk],
+                         [row for row in expected if row[0] == self.ann.pk])
+        call_command("rebuild_attendance_summary", stdout=io.StringIO())
+        self.assertEqual(self.summaries(), expected)
+
+
+class ScaleSeedTests(TransactionTestCase):
+    """seed_data --scale on its bulk_create fallback (--no-copy). The worker pool closes the connections first."""
+
+    def seed(self, employees, *extra):
+        call_command("seed_data", "--scale", "--no-copy", "--employees", str(employees), "--departments", "3",
+                     "--attendance-per-employee", "40", "--reviews-per-employee", "2", "--workers", "2",
+                     "--chunk-size", "5", *extra, stdout=io.StringIO())
+
+    def assertDerivedDataMatches(self, employees):
+        self.assertEqual(
+            (Department.objects.count(), Employee.objects.count(), Attendance.objects.count(),
+             Performance.objects.count()),
+            (3, employees, employees * 40, employees * 2),
+        )
+        self.assertEqual(sum(Department.objects.values_list("employee_count", flat=True)), employees)
+        expected = sorted(
+            (row["employee_id"], row["month"], row["present"], row["absent"], row["late"])
+            for row in AttendanceMonthlySummary.aggregate_source(Attendance.objects.all())
+        )
+        self.assertEqual(
+            sorted(AttendanceMonthlySummary.objects.values_list("employee_id", "month", "present", "absent", "late")),
+            expected,
+        )
+
+    def test_seed_and_purge_with_archived_attendance(self):
+        self.seed(12)
+        self.assertDerivedDataMatches(12)
+
+        # 40 days back always reach into the previous month
+        call_command("archive_attendance", "--before", f"{timezone.now():%Y-%m}", stdout=io.StringIO())
+        self.assertTrue(AttendanceArchive.objects.exists())
+
+        self.seed(7, "--purge")
+        self.assertFalse(AttendanceArchive.objects.exists())
+        self.assertDerivedDataMatches(7)
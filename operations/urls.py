@@ -5,7 +5,10 @@ urlpatterns = [
     # Attendance
     # URL query samples
     # curl -X GET "http://127.0.0.1:8000/api-operations/attendance/?employee=2&page=1&page_size=20" # Filter by employee
+    # curl -X GET "http://127.0.0.1:8000/api-operations/attendance/?cursor=&page_size=20" # Keyset pagination, follow "next"/"previous"
     path("attendance/", views.attendance_list_and_create, name="attendance-list-and-create"),
+    # curl -X POST "http://127.0.0.1:8000/api-operations/attendance/bulk/" -H "Content-Type: application/x-ndjson" --data-binary @attendance.ndjson
+    path("attendance/bulk/", views.attendance_bulk_upsert, name="attendance-bulk-upsert"),
     path("attendance/<int:pk>/", views.attendance_details_and_modifications, name="attendance-details-and-modifications"),
 
     # Performance
@@ -13,4 +16,11 @@ urlpatterns = [
     # http://127.0.0.1:8000/api-operations/performance/?employee=2&page=1&page_size=20 # Filter by employee
     path("performance/", views.performance_list_and_create, name="performance-list-and-create"),
     path("performance/<int:pk>/", views.performance_details_and_modifications, name="performance-details-and-modifications"),
+
+    # Reports
+    # http://127.0.0.1:8000/api-operations/reports/performance/departments/?month=2025-06&months=12
+    path("reports/performance/departments/", views.department_performance, name="department-performance"),
+    path("reports/performance/departments/chart/", views.department_performance_chart, name="department_performance_chart"),
+    # http://127.0.0.1:8000/api-operations/reports/attendance/matrix/?department=3&month=2025-06&export=csv
+    path("reports/attendance/matrix/", views.attendance_matrix, name="attendance-matrix"),
 ]
@@ -1,12 +1,38 @@
-from rest_framework.decorators import api_view
+import calendar
+import csv
+import json
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import groupby
+
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+
+from structures.models import Department, Employee
+from operations.models import Attendance, AttendanceArchive, AttendanceHistory, Performance
+from operations.serializers import AttendanceSerializer, PerformanceSerializer, AttendanceBulkRowSerializer
+from common.conditional import (
+    check_preconditions,
+    claim_version,
+    instance_validators,
+    paginated_response,
+    read_precondition,
+    with_validators,
+)
+from common.serialization import row_encoder
+from common.helpers import Echo, LargeResultsSetPagination, KeysetPagination, NDJSONParser
 
-from structures.models import Employee
-from operations.models import Attendance, Performance
-from operations.serializers import AttendanceSerializer, PerformanceSerializer
-from common.helpers import SmallResultsSetPagination
+ATTENDANCE_BULK_MAX_ROWS = 50000   # per request
+ATTENDANCE_BULK_BATCH_SIZE = 5000  # rows per INSERT ... ON CONFLICT statement
 
 # Create your views here.
 # -------------------- Attendance --------------------
@@ -14,12 +40,14 @@ from common.helpers import SmallResultsSetPagination
 def attendance_list_and_create(request):
     """
     Query params:
-      - employee:   int   (employee id)
+      - employee:   int   (employee id); the employee's archived months are included (rows with a null id)
       - page, page_size: pagination
+      - count: estimate (default) | exact | none
+      - cursor: keyset pagination over (employee, date) instead of page numbers (send an empty cursor for the first page)
     """
     if request.method == "GET":
         # If employee id not provided, the query might be time consuming for big offsets through pagination
-        # so, this can be kept for admin use only for now.
+        # so, this can be kept for admin use only for now. Use ?cursor= for constant cost deep pages.
         qs = Attendance.objects.order_by("employee", "date")
 
         # Optional filters via query params
@@ -27,13 +55,22 @@ def attendance_list_and_create(request):
         if employee_id:
             qs = qs.filter(employee_id=employee_id)
 
-        paginator = SmallResultsSetPagination()
-        page = paginator.paginate_queryset(qs, request)
-        serializer = AttendanceSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        if KeysetPagination.requested(request):
+            paginator = KeysetPagination(ordering=("employee_id", "date"))  # uniq_attendance_per_employee_per_date
+        else:
+            paginator = LargeResultsSetPagination()
+        encoder = row_encoder(AttendanceSerializer)
+        rows = encoder.values(qs, "updated_at")
+        if employee_id:
+            archives = list(AttendanceArchive.objects.filter(employee_id=employee_id))
+            if archives:
+                rows = AttendanceHistory(rows, archives)  # archived months decoded, merged with the live rows
+        page = paginator.paginate_queryset(rows, request)
+        return paginated_response(request, paginator, encoder, page)  # 304 if the client's ETag still matches
     
     elif request.method == "POST":
-        serializer = AttendanceSerializer(data=request.data)
+        # A JSON array creates all rows with a constant number of queries (BatchedListSerializer)
+        serializer = AttendanceSerializer(data=request.data, many=isinstance(request.data, list))
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -42,21 +79,34 @@ def attendance_list_and_create(request):
 
 @api_view(["GET", "PUT", "PATCH", "DELETE"])
 def attendance_details_and_modifications(request, pk: int):
+    not_modified = read_precondition(request, Attendance, pk)
+    if not_modified is not None:
+        return not_modified
     attd = get_object_or_404(Attendance, pk=pk)
+    validators = instance_validators(Attendance, attd.pk, attd.updated_at)
+    precondition = check_preconditions(request, *validators)
+    if precondition is not None:
+        return precondition
 
     if request.method == "GET":
-        return Response(AttendanceSerializer(attd).data)
+        return with_validators(Response(AttendanceSerializer(attd).data), *validators)
     
     elif request.method in ["PUT", "PATCH"]:
         partial = request.method == "PATCH"
         serializer = AttendanceSerializer(attd, data=request.data, partial=partial)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
+            with transaction.atomic():
+                if not claim_version(request, attd):
+                    return Response(status=status.HTTP_412_PRECONDITION_FAILED)
+                serializer.save()
+            return with_validators(Response(serializer.data), *instance_validators(Attendance, attd.pk, attd.updated_at))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == "DELETE":
-        attd.delete()
+        with transaction.atomic():
+            if not claim_version(request, attd):
+                return Response(status=status.HTTP_412_PRECONDITION_FAILED)
+            attd.delete()
         return Response(
             {"message": "Attendance record has been deleted successfully."},
             status=status.HTTP_200_OK
@@ -66,6 +116,89 @@ def attendance_details_and_modifications(request, pk: int):
     return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(["POST"])
+@parser_classes([JSONParser, NDJSONParser])
+def attendance_bulk_upsert(request):
+    """
+    Body: JSON array or NDJSON of {"employee": id, "date": "YYYY-MM-DD", "status": "P|A|L"}
+    Rows are upserted on uniq_attendance_per_employee_per_date (the status is updated on conflict).
+
+    Query count does not depend on the number of rows:
+    one employee IN lookup, one locking lookup of already existing (employee, date) pairs,
+    one INSERT ... ON CONFLICT per ATTENDANCE_BULK_BATCH_SIZE rows,
+    and the monthly rollup refresh for the touched months (see AttendanceQuerySet.bulk_create).
+    """
+    rows = request.data
+    if not isinstance(rows, list):
+        return Response({"detail": "Expected a JSON array or NDJSON body."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(rows) > ATTENDANCE_BULK_MAX_ROWS:
+        return Response(
+            {"detail": f"Too many rows ({len(rows)}); the limit is {ATTENDANCE_BULK_MAX_ROWS} per request."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    results = [None] * len(rows)
+    valid = {}  # (employee_id, date) -> (index, status); the last row for a key wins
+    for index, row in enumerate(rows):
+        serializer = AttendanceBulkRowSerializer(data=row)
+        if not serializer.is_valid():
+            results[index] = {"index": index, "result": "error", "errors": serializer.errors}
+            continue
+        key = (serializer.validated_data["employee"], serializer.validated_data["date"])
+        if key in valid:
+            earlier = valid[key][0]
+            results[earlier] = {"index": earlier, "result": "skipped", "errors": {"non_field_errors": [
+                f"Superseded by row {index} for the same employee and date."
+            ]}}
+        valid[key] = (index, serializer.validated_data["status"])
+
+    employee_ids = {emp_id for emp_id, _ in valid}
+    known_ids = set(Employee.objects.filter(pk__in=employee_ids).values_list("pk", flat=True))
+    for key in [k for k in valid if k[0] not in known_ids]:
+        index = valid.pop(key)[0]
+        results[index] = {"index": index, "result": "error", "errors": {"employee": [
+            f'Invalid pk "{key[0]}" - object does not exist.'
+        ]}}
+
+    created = updated = 0
+    skipped = sum(1 for result in results if result is not None and result["result"] == "skipped")
+    if valid:
+        records = [Attendance(employee_id=emp_id, date=date, status=st) for (emp_id, date), (_, st) in valid.items()]
+        with transaction.atomic():
+            # Superset of the conflicting pairs (exact when the batch covers a single day, the usual case),
+            # locked until commit so a concurrent upsert of the same rows waits and then sees them as existing.
+            existing = set(Attendance.objects.select_for_update().filter(
+                employee_id__in={k[0] for k in valid}, date__in={k[1] for k in valid},
+            ).values_list("employee_id", "date"))
+            Attendance.objects.bulk_create(
+                records,
+                batch_size=ATTENDANCE_BULK_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=["employee", "date"],
+                update_fields=["status", "updated_at"],
+            )
+
+        for key, (index, _) in valid.items():
+            outcome = "updated" if key in existing else "created"
+            if outcome == "updated":
+                updated += 1
+            else:
+                created += 1
+            results[index] = {"index": index, "result": outcome}
+
+    return Response(
+        {
+            "received": len(rows),
+            "created": created,
+            "updated": updated,
+            "skipped": skipped,
+            "failed": len(rows) - created - updated - skipped,
+            "results": results,
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
 # -------------------- Performance --------------------
 @api_view(["GET", "POST"])
 def performance_list_and_create(request):
@@ -73,10 +206,12 @@ def performance_list_and_create(request):
     Query params:
       - employee:   int   (employee id)
       - page, page_size: pagination
+      - count: estimate (default) | exact | none
+      - cursor: keyset pagination over (employee, review_date, id) instead of page numbers (send an empty cursor for the first page)
     """
     if request.method == "GET":
         # If employee id not provided, the query might be time consuming for big offsets through pagination
-        # so, this can be kept for admin use only for now.
+        # so, this can be kept for admin use only for now. Use ?cursor= for constant cost deep pages.
         qs = Performance.objects.order_by("employee_id")
 
         # Optional filters via query params
@@ -84,13 +219,17 @@ def performance_list_and_create(request):
         if employee_id:
             qs = qs.filter(employee_id=employee_id)
 
-        paginator = SmallResultsSetPagination()
-        page = paginator.paginate_queryset(qs, request)
-        serializer = PerformanceSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        if KeysetPagination.requested(request):
+            paginator = KeysetPagination(ordering=("employee_id", "review_date", "id"))
+        else:
+            paginator = LargeResultsSetPagination()
+        encoder = row_encoder(PerformanceSerializer)
+        page = paginator.paginate_queryset(encoder.values(qs, "updated_at"), request)
+        return paginated_response(request, paginator, encoder, page)  # 304 if the client's ETag still matches
     
     elif request.method == "POST":
-        serializer = PerformanceSerializer(data=request.data)
+        # A JSON array creates all rows with a constant number of queries (BatchedListSerializer)
+        serializer = PerformanceSerializer(data=request.data, many=isinstance(request.data, list))
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -99,21 +238,34 @@ def performance_list_and_create(request):
 
 @api_view(["GET", "PUT", "PATCH", "DELETE"])
 def performance_details_and_modifications(request, pk: int):
+    not_modified = read_precondition(request, Performance, pk)
+    if not_modified is not None:
+        return not_modified
     pfmc = get_object_or_404(Performance, pk=pk)
+    validators = instance_validators(Performance, pfmc.pk, pfmc.updated_at)
+    precondition = check_preconditions(request, *validators)
+    if precondition is not None:
+        return precondition
 
     if request.method == "GET":
-        return Response(PerformanceSerializer(pfmc).data)
+        return with_validators(Response(PerformanceSerializer(pfmc).data), *validators)
     
     elif request.method in ["PUT", "PATCH"]:
         partial = request.method == "PATCH"
         serializer = PerformanceSerializer(pfmc, data=request.data, partial=partial)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
+            with transaction.atomic():
+                if not claim_version(request, pfmc):
+                    return Response(status=status.HTTP_412_PRECONDITION_FAILED)
+                serializer.save()
+            return with_validators(Response(serializer.data), *instance_validators(Performance, pfmc.pk, pfmc.updated_at))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == "DELETE":
-        pfmc.delete()
+        with transaction.atomic():
+            if not claim_version(request, pfmc):
+                return Response(status=status.HTTP_412_PRECONDITION_FAILED)
+            pfmc.delete()
         return Response(
             {"message": "Performance record has been deleted successfully."},
             status=status.HTTP_200_OK
@@ -121,3 +273,277 @@ def performance_details_and_modifications(request, pk: int):
         # return Response(status=status.HTTP_204_NO_CONTENT)
     
     return Response(status=status.HTTP_400_BAD_REQUEST)
+
+
+# -------------------- Reports --------------------
+PERFORMANCE_RATINGS = range(1, 6)      # performance_rating_between_1_and_5
+PERFORMANCE_PERCENTILES = (25, 50, 75, 90)
+PERFORMANCE_REPORT_MONTHS = 12         # default report window
+PERFORMANCE_REPORT_MAX_MONTHS = 36
+PERFORMANCE_ROLLING_MONTHS = 12        # trailing window of the rolling average
+
+
+def _shift_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _percentile_cont(histogram, fraction):
+    """
+    percentile_cont(fraction) of the ratings counted in {rating: reviews}, interpolating linearly like PostgreSQL's.
+    Ratings are 1-5, so the per rating counts describe the distribution exactly: no need to sort the reviews.
+    """
+    position = fraction * (sum(histogram.values()) - 1)
+    lower, upper = math.floor(position), math.ceil(position)
+    found = {}
+    seen = 0
+    for rating in sorted(histogram):
+        for index in (lower, upper):
+            if seen <= index < seen + histogram[rating]:
+                found[index] = rating
+        seen += histogram[rating]
+    return found[lower] + (found[upper] - found[lower]) * (position - lower)
+
+
+def performance_report_window(end_month, months=PERFORMANCE_REPORT_MONTHS):
+    """
+    (first, start, end) months of the report of the `months` months ending with end_month: it counts reviews
+    in [start, end), and the rolling average of its first month reaches back to first.
+    Raises ValueError when one of them is outside the date range (years 1-9999).
+    """
+    start = _shift_months(end_month, 1 - months)
+    return _shift_months(start, 1 - PERFORMANCE_ROLLING_MONTHS), start, _shift_months(end_month, 1)
+
+
+def department_performance_report(window, department_id=None):
+    """
+    Rating distribution (average, median, percentiles, histogram) per department over the months of the
+    window (performance_report_window), and the monthly / rolling 12-month average trend, from a single
+    grouped query.
+    """
+    first, start, end = window
+    months = (end.year - start.year) * 12 + end.month - start.month
+    qs = Performance.objects.department_rating_counts(first, end)
+    if department_id:
+        qs = qs.filter(employee__department_id=department_id)
+
+    departments = {}
+    for row in qs:
+        dept = departments.setdefault(row["department_id"], {
+            "name": row["department_name"],
+            "histogram": defaultdict(int),
+            "monthly": defaultdict(lambda: [0, 0]),  # month -> [rating sum, reviews]
+        })
+        totals = dept["monthly"][row["month"]]
+        totals[0] += row["rating"] * row["reviews"]
+        totals[1] += row["reviews"]
+        if row["month"] >= start:
+            dept["histogram"][row["rating"]] += row["reviews"]
+
+    report_months = [_shift_months(start, i) for i in range(months)]
+    results = []
+    for dept_id, dept in sorted(departments.items(), key=lambda item: item[1]["name"]):
+        histogram, monthly = dept["histogram"], dept["monthly"]
+        reviews = sum(histogram.values())
+        trend = []
+        for month in report_months:
+            rating_sum, count = monthly.get(month, (0, 0))
+            window = [monthly.get(_shift_months(month, -i), (0, 0)) for i in range(PERFORMANCE_ROLLING_MONTHS)]
+            window_sum, window_count = sum(w[0] for w in window), sum(w[1] for w in window)
+            trend.append({
+                "month": month.strftime("%Y-%m"),
+                "reviews": count,
+                "average": round(rating_sum / count, 2) if count else None,
+                "rolling_average": round(window_sum / window_count, 2) if window_count else None,
+            })
+        results.append({
+            "id": dept_id,
+            "name": dept["name"],
+            "reviews": reviews,
+            "average": round(sum(r * c for r, c in histogram.items()) / reviews, 2) if reviews else None,
+            "median": _percentile_cont(histogram, 0.5) if reviews else None,
+            "percentiles": {
+                f"p{pct}": round(_percentile_cont(histogram, pct / 100), 2) if reviews else None
+                for pct in PERFORMANCE_PERCENTILES
+            },
+            "histogram": {str(rating): histogram.get(rating, 0) for rating in PERFORMANCE_RATINGS},
+            "trend": trend,
+        })
+
+    return {
+        "from": start,
+        "to": end - timedelta(days=1),
+        "rolling_months": PERFORMANCE_ROLLING_MONTHS,
+        "departments": results,
+    }
+
+
+def _performance_report_params(request):
+    """(report window, department id) from the query params, or raises ValueError with a message."""
+    end_month = timezone.localdate().replace(day=1)
+    if request.query_params.get("month"):
+        try:
+            year, month = request.query_params["month"].split("-")
+            end_month = date(int(year), int(month), 1)
+        except ValueError:
+            raise ValueError("Invalid 'month' (use YYYY-MM).")
+    try:
+        months = int(request.query_params.get("months", PERFORMANCE_REPORT_MONTHS))
+        department_id = int(request.query_params.get("department") or 0) or None
+    except ValueError:
+        raise ValueError("'months' and 'department' must be integers.")
+    if not 1 <= months <= PERFORMANCE_REPORT_MAX_MONTHS:
+        raise ValueError(f"'months' must be between 1 and {PERFORMANCE_REPORT_MAX_MONTHS}.")
+    try:
+        window = performance_report_window(end_month, months)
+    except ValueError:
+        raise ValueError("'month' is out of range for a report of that many months.")
+    return window, department_id
+
+
+@api_view(["GET"])
+def department_performance(request):
+    """
+    Department performance report: rating average, median, percentiles and histogram, plus the monthly and
+    rolling 12-month average trend. One grouped query whatever the number of employees or reviews.
+
+    Query params:
+      - month:        YYYY-MM, last month of the report (default current month)
+      - months:       int, report length in months (default 12, max 36)
+      - department:   int   (department id, default all departments)
+    """
+    try:
+        params = _performance_report_params(request)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(department_performance_report(*params))
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def department_performance_chart(request):
+    """
+    Charts of the department performance report (same query params).
+    """
+    try:
+        params = _performance_report_params(request)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    report = department_performance_report(*params)
+    departments = report["departments"]
+
+    return render(
+        request,
+        "reports/department_performance.html",
+        {
+            "report": report,
+            "labels": [d["name"] for d in departments],
+            "average": [d["average"] for d in departments],
+            "median": [d["median"] for d in departments],
+            "p90": [d["percentiles"]["p90"] for d in departments],
+            "months": [t["month"] for t in departments[0]["trend"]] if departments else [],
+            "trend": [{"label": d["name"], "data": [t["rolling_average"] for t in d["trend"]]} for d in departments],
+        },
+    )
+
+
+ATTENDANCE_MATRIX_CHUNK_SIZE = 5000  # rows fetched per server-side cursor round trip
+ATTENDANCE_MATRIX_NO_RECORD = "-"
+
+
+def attendance_matrix_rows(department_id, month, end):
+    """
+    Yields (employee id, name, cells) for every employee of the department, by name: cells holds one status
+    character per day of the month [month, end) ("-" for no record), archived days included.
+
+    One query: the employees (department, name) LEFT JOIN their attendance of the month, looked up on the
+    (employee, date) index, and their archive row of the month. Rows are streamed from a server-side cursor
+    and grouped per employee, so memory does not depend on the department size.
+    """
+    rows = Employee.objects.filter(department_id=department_id).annotate(
+        live=FilteredRelation("attendance_records", condition=Q(
+            attendance_records__date__gte=month, attendance_records__date__lt=end,
+        )),
+        archived=FilteredRelation("attendance_archives", condition=Q(attendance_archives__month=month)),
+    ).order_by("name", "id").values_list(
+        "id", "name", "archived__days", "live__date", "live__status",
+    ).iterator(chunk_size=ATTENDANCE_MATRIX_CHUNK_SIZE)
+
+    days_in_month = calendar.monthrange(month.year, month.month)[1]
+    for (employee_id, name), group in groupby(rows, key=lambda row: row[:2]):
+        cells = [ATTENDANCE_MATRIX_NO_RECORD] * days_in_month
+        for index, (_, _, archived_days, day, live_status) in enumerate(group):
+            if index == 0 and archived_days:
+                for archived_day, archived_status in AttendanceArchive.unpack(archived_days):
+                    cells[archived_day - 1] = archived_status
+            if day is not None:
+                cells[day.day - 1] = live_status  # a live row overrides its archived day
+        yield employee_id, name, cells
+
+
+@api_view(["GET"])
+def attendance_matrix(request):
+    """
+    Attendance of a whole department for one month: employees as rows, days as columns, one status
+    character per cell (P, A, L, or - for no record). Streamed, from a single query.
+
+    Query params:
+      - department:   int   (department id, required)
+      - month:        YYYY-MM (default current month)
+      - export:       csv (one column per day instead of the JSON document)
+
+    JSON: {"department": {...}, "month": "YYYY-MM", "days": n, "legend": {...},
+           "employees": [{"id": 1, "name": "...", "days": "PPAL-..."}, ...]}
+    """
+    month = timezone.localdate().replace(day=1)
+    try:
+        if request.query_params.get("month"):
+            year, month_number = request.query_params["month"].split("-")
+            month = date(int(year), int(month_number), 1)
+        end = _shift_months(month, 1)  # here, not in the stream: once it started, an error truncates a 200
+    except ValueError:
+        return Response({"detail": "Invalid 'month' (use YYYY-MM)."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        department_id = int(request.query_params["department"])
+    except (KeyError, ValueError):
+        return Response({"detail": "'department' (a department id) is required."}, status=status.HTTP_400_BAD_REQUEST)
+    export_format = request.query_params.get("export")
+    if export_format not in (None, "csv"):
+        return Response({"detail": "Invalid 'export' (use csv)."}, status=status.HTTP_400_BAD_REQUEST)
+
+    department = get_object_or_404(Department.objects.only("id", "name"), pk=department_id)
+    rows = attendance_matrix_rows(department.pk, month, end)
+    days_in_month = calendar.monthrange(month.year, month.month)[1]
+
+    if export_format == "csv":
+        writer = csv.writer(Echo())
+
+        def stream():
+            yield writer.writerow(["id", "name", *range(1, days_in_month + 1)])
+            for employee_id, name, cells in rows:
+                yield writer.writerow([employee_id, name, *cells])
+
+        content_type = "text/csv"
+    else:
+        def stream():
+            header = {
+                "department": {"id": department.pk, "name": department.name},
+                "month": month.strftime("%Y-%m"),
+                "days": days_in_month,
+                "legend": {**dict(Attendance.STATUS_CHOICES), ATTENDANCE_MATRIX_NO_RECORD: "No record"},
+            }
+            yield json.dumps(header)[:-1] + ', "employees": ['
+            separator = ""
+            for employee_id, name, cells in rows:
+                yield separator + json.dumps({"id": employee_id, "name": name, "days": "".join(cells)})
+                separator = ", "
+            yield "]}"
+
+        content_type = "application/json"
+
+    response = StreamingHttpResponse(stream(), content_type=content_type)
+    if export_format:
+        response["Content-Disposition"] = (
+            f'attachment; filename="attendance-{department.pk}-{month:%Y-%m}.{export_format}"'
+        )
+    return response
@@ -0,0 +1,390 @@
+'''
+# Benchmark every API route against the data already in the database (table on stdout)
+python manage.py bench_api --requests 50 --output bench/current.json
+
+# On a scratch database: replace everything with a reproducible dataset first (asks for confirmation)
+python manage.py bench_api --seed --purge --employees 2000 --attendance-per-employee 60
+
+# Compare against a stored baseline; exits with an error on regressions (for CI)
+python manage.py bench_api --baseline bench/v1.2.json --max-regression 20
+
+# Also time the response cache hits of the cached GET routes (reported as <endpoint>-warm)
+python manage.py bench_api --warm
+'''
+
+import base64
+import io
+import json
+import logging
+import platform
+import statistics
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+import django
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from common.instrumentation import collect_queries
+from common.response_cache import bump_generation
+from structures.models import Department, Employee
+from operations.models import Attendance, Performance
+
+
+# The write endpoints only touch rows the command creates (a department, an employee and their records),
+# dated from here on, far from any real attendance or review; they are deleted when the run ends.
+BENCH_FIRST_DATE = date(2200, 1, 1)
+BENCH_IMPORT_ROWS = 100  # CSV lines per import request
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def cursor_at(key):
+    """Keyset cursor positioned after key (same encoding as common.helpers.KeysetPagination)."""
+    raw = json.dumps({"k": key}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+class Command(BaseCommand):
+    help = "Benchmark every structures/operations API route through the test client (latency, throughput, queries)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", action="store_true",
+                            help="Add a seed_data --scale dataset before benchmarking (default: use the current data)")
+        parser.add_argument("--purge", action="store_true",
+                            help="With --seed: delete ALL departments, employees and records first (asks to confirm)")
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive",
+                            help="Do not ask for confirmation of --purge")
+        parser.add_argument("--departments", type=int, default=10)
+        parser.add_argument("--employees", type=int, default=2000)
+        parser.add_argument("--attendance-per-employee", type=int, default=60)
+        parser.add_argument("--reviews-per-employee", type=int, default=4)
+        parser.add_argument("--random-seed", type=int, default=0,
+                            help="Seed passed to seed_data for a reproducible dataset")
+        parser.add_argument("--requests", type=int, default=30, help="Timed requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per endpoint")
+        parser.add_argument("--warm", action="store_true",
+                            help="Also time the cached GET routes with the response cache kept (<endpoint>-warm); "
+                                 "by default every request misses it")
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--only", action="append", help="Only run endpoints whose name contains this (repeatable)")
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+        parser.add_argument("--baseline", help="Compare against a JSON file written by --output")
+        parser.add_argument("--max-regression", type=float, default=20.0,
+                            help="Allowed p50/p95 slowdown in percent before --baseline fails")
+
+    def handle(self, *args, **opts):
+        if opts["purge"] and not opts["seed"]:
+            raise CommandError("--purge only applies with --seed.")
+        if opts["purge"] and opts["interactive"]:
+            answer = input(
+                "--purge deletes every department, employee, attendance and performance record in the "
+                f"'{connection.settings_dict['NAME']}' database. Type 'yes' to continue: "
+            )
+            if answer != "yes":
+                raise CommandError("Benchmark cancelled.")
+        if opts["seed"]:
+            self.stdout.write("Seeding benchmark dataset...")
+            call_command(
+                "seed_data", scale=True, purge=opts["purge"], seed=opts["random_seed"],
+                departments=opts["departments"], employees=opts["employees"],
+                attendance_per_employee=opts["attendance_per_employee"],
+                reviews_per_employee=opts["reviews_per_employee"],
+                stdout=self.stdout if opts["verbosity"] > 1 else io.StringIO(),
+            )
+        if not Employee.objects.exists():
+            raise CommandError("No employees in the database; run with --seed.")
+
+        # One JSON log line per request would dominate the measurement
+        request_logger = logging.getLogger("ems.requests")
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.WARNING)
+        try:
+            results = self.run_endpoints(opts)
+        finally:
+            request_logger.setLevel(previous_level)
+
+        report = {
+            "meta": {
+                "timestamp": timezone.now().isoformat(),
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "requests_per_endpoint": opts["requests"],
+                "page_size": opts["page_size"],
+                "warm": opts["warm"],
+                "dataset": {
+                    "departments": Department.objects.count(),
+                    "employees": Employee.objects.count(),
+                    "attendance": Attendance.objects.count(),
+                    "performance": Performance.objects.count(),
+                },
+            },
+            "endpoints": results,
+        }
+        self.print_table(results)
+
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Results written to {opts['output']}")
+
+        if opts["baseline"]:
+            with open(opts["baseline"]) as fh:
+                baseline = json.load(fh)
+            regressions = self.compare(baseline["endpoints"], results, opts["max_regression"])
+            if regressions:
+                raise CommandError(f"{len(regressions)} endpoint(s) regressed: {', '.join(regressions)}")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    # -------------------- endpoints --------------------
+    def endpoints(self, opts, fixture):
+        """
+        (name, method, url, body factory or None) for every route, including shallow and deep pages.
+        Reads use the existing rows; writes only the fixture department and employee and new bench rows.
+        A body factory returns the JSON document, or the text of a CSV file for the imports.
+        """
+        page_size = opts["page_size"]
+        bench_department, bench_employee = fixture
+        dept = Department.objects.order_by("id").first()
+        emp = Employee.objects.order_by("id").first()
+        attd = Attendance.objects.order_by("id").first()
+        pfmc = Performance.objects.order_by("id").first()
+
+        def last_page(count):
+            return max(1, -(-count // page_size))
+
+        def deep_key(qs, fields):
+            offset = max(0, qs.count() - page_size - 1)
+            rows = list(qs.order_by(*fields).values_list(*fields)[offset:offset + 1])
+            return list(rows[0]) if rows else None
+
+        emp_count = Employee.objects.count()
+        attd_count = Attendance.objects.count()
+        perf_count = Performance.objects.count()
+        dept_count = Department.objects.count()
+        today = timezone.now().date()
+        counter = iter(range(10 ** 9))
+
+        def departments_csv():
+            batch = next(counter)
+            return "name\n" + "".join(f"{bench_department.name} import {batch}-{i}\n" for i in range(BENCH_IMPORT_ROWS))
+
+        def employees_csv():
+            batch = next(counter)
+            return "name,email,date_of_joining,department\n" + "".join(
+                f"Bench Import,import{batch}-{i}.{bench_employee.email},{today},{bench_department.name}\n"
+                for i in range(BENCH_IMPORT_ROWS)
+            )
+
+        endpoints = [
+            ("departments-list", "get", f"{reverse('department-list-and-create')}?page_size={page_size}", None),
+            ("departments-list-deep", "get",
+             f"{reverse('department-list-and-create')}?page_size={page_size}&page={last_page(dept_count)}", None),
+            ("departments-detail", "get", reverse("department-details-and-modifications", args=[dept.pk]), None),
+            ("departments-create", "post", reverse("department-list-and-create"),
+             lambda: {"name": f"{bench_department.name} {next(counter)}"}),
+            ("departments-import", "post", reverse("department-import"), departments_csv),
+            ("report-employees-per-department", "get", reverse("employees_per_department_pie"), None),
+            ("report-employees-per-department-async", "get", reverse("employees_per_department_pie_async"), None),
+            ("report-dashboard", "get", reverse("reports-dashboard"), None),
+            ("employees-list", "get", f"{reverse('employee-list-and-create')}?page_size={page_size}", None),
+            ("employees-list-deep", "get",
+             f"{reverse('employee-list-and-create')}?page_size={page_size}&page={last_page(emp_count)}", None),
+            ("employees-list-by-department", "get",
+             f"{reverse('employee-list-and-create')}?page_size={page_size}&department={dept.pk}", None),
+            ("employees-detail", "get", reverse("employee-details-and-modifications", args=[emp.pk]), None),
+            ("employees-update", "patch", reverse("employee-details-and-modifications", args=[bench_employee.pk]),
+             lambda: {"phone_number": f"555-{next(counter) % 10000:04d}"}),
+            ("employees-create", "post", reverse("employee-list-and-create"), lambda: {
+                "name": "Bench Employee", "email": f"{next(counter)}.{bench_employee.email}",
+                "date_of_joining": str(today), "department": bench_department.pk,
+            }),
+            ("employees-import", "post", reverse("employee-import"), employees_csv),
+            ("employees-bulk-update", "patch", reverse("employee-bulk-update"), lambda: [
+                {"id": bench_employee.pk, "fields": {"address": f"{next(counter)} Bench Street"}},
+            ]),
+            ("employees-bulk-update-filter", "patch", reverse("employee-bulk-update"), lambda: {
+                "filter": {"department": bench_department.pk}, "fields": {"address": f"{next(counter)} Bench Street"},
+            }),
+            ("employees-filters", "get",
+             f"{reverse('employees-query-filters')}?page_size={page_size}&department={dept.pk}"
+             f"&joined_from={today - timedelta(days=3 * 365)}", None),
+            ("employees-filters-deep", "get",
+             f"{reverse('employees-query-filters')}?page_size={page_size}&page={last_page(emp_count)}", None),
+            ("employees-search", "get",
+             f"{reverse('employee-search')}?{urlencode({'q': emp.email[:4], 'page_size': page_size})}", None),
+            ("report-monthly-attendance", "get", reverse("employee_monthly_attendance", args=[emp.pk]), None),
+            ("report-monthly-attendance-async", "get",
+             reverse("employee_monthly_attendance_async", args=[emp.pk]), None),
+            ("attendance-list", "get", f"{reverse('attendance-list-and-create')}?page_size={page_size}", None),
+            ("attendance-list-deep", "get",
+             f"{reverse('attendance-list-and-create')}?page_size={page_size}&page={last_page(attd_count)}", None),
+            ("attendance-list-by-employee", "get",
+             f"{reverse('attendance-list-and-create')}?page_size={page_size}&employee={emp.pk}", None),
+            ("attendance-detail", "get", reverse("attendance-details-and-modifications", args=[attd.pk]), None),
+            ("attendance-create", "post", reverse("attendance-list-and-create"), lambda: {
+                "employee": bench_employee.pk, "date": str(BENCH_FIRST_DATE + timedelta(days=1000 + next(counter))),
+                "status": "P",
+            }),
+            ("attendance-bulk-100", "post", reverse("attendance-bulk-upsert"), lambda: [
+                {"employee": bench_employee.pk, "date": str(BENCH_FIRST_DATE + timedelta(days=d)), "status": "L"}
+                for d in range(100)
+            ]),
+            ("attendance-matrix", "get", f"{reverse('attendance-matrix')}?department={dept.pk}&month={today:%Y-%m}",
+             None),
+            ("attendance-matrix-csv", "get",
+             f"{reverse('attendance-matrix')}?department={dept.pk}&month={today:%Y-%m}&export=csv", None),
+            ("performance-list", "get", f"{reverse('performance-list-and-create')}?page_size={page_size}", None),
+            ("performance-list-deep", "get",
+             f"{reverse('performance-list-and-create')}?page_size={page_size}&page={last_page(perf_count)}", None),
+            ("performance-detail", "get", reverse("performance-details-and-modifications", args=[pfmc.pk]), None),
+            ("report-department-performance", "get", reverse("department-performance"), None),
+            ("report-department-performance-chart", "get", reverse("department_performance_chart"), None),
+            ("performance-create", "post", reverse("performance-list-and-create"), lambda: {
+                "employee": bench_employee.pk, "rating": 3, "review_date": str(BENCH_FIRST_DATE),
+            }),
+        ]
+
+        attd_key = deep_key(Attendance.objects.all(), ("employee_id", "date"))
+        if attd_key:
+            endpoints.append(("attendance-list-cursor-deep", "get",
+                              f"{reverse('attendance-list-and-create')}?page_size={page_size}"
+                              f"&cursor={cursor_at(attd_key)}", None))
+        perf_key = deep_key(Performance.objects.all(), ("employee_id", "review_date", "id"))
+        if perf_key:
+            endpoints.append(("performance-list-cursor-deep", "get",
+                              f"{reverse('performance-list-and-create')}?page_size={page_size}"
+                              f"&cursor={cursor_at(perf_key)}", None))
+
+        if opts["only"]:
+            endpoints = [e for e in endpoints if any(part in e[0] for part in opts["only"])]
+        return endpoints
+
+    def run_endpoints(self, opts):
+        client = Client(HTTP_HOST="localhost")
+        created = {Department: [], Employee: [], Attendance: [], Performance: []}
+        model_for = {"departments": Department, "employees": Employee, "attendance": Attendance,
+                     "performance": Performance}
+        results = {}
+
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        bench_department = Department.objects.create(name=f"bench_api {stamp}")
+        created[Department].append(bench_department.pk)
+        try:
+            bench_employee = Employee.objects.create(
+                name="Bench Fixture", email=f"bench.{stamp}@example.com", date_of_joining=timezone.now().date(),
+                department=bench_department,
+            )
+            created[Employee].append(bench_employee.pk)
+
+            for name, method, url, body in self.endpoints(opts, (bench_department, bench_employee)):
+                results[name], cached = self.run_endpoint(client, opts, name, method, url, body, created, model_for)
+                if opts["warm"] and cached:
+                    results[f"{name}-warm"], _ = self.run_endpoint(
+                        client, opts, name, method, url, body, created, model_for, cold=False,
+                    )
+        finally:
+            # The CSV imports report counts, not ids: their rows are found by the run's stamp
+            created[Employee].extend(Employee.objects.filter(email__endswith=f".bench.{stamp}@example.com")
+                                     .values_list("pk", flat=True))
+            created[Department].extend(Department.objects.filter(name__startswith=f"bench_api {stamp} import ")
+                                       .values_list("pk", flat=True))
+            # Only the recorded rows: the fixture employee's records (bulk upserts, creates) cascade with it.
+            # Children first, Employee is PROTECTed by Department.
+            for model in (Attendance, Performance, Employee, Department):
+                model.objects.filter(pk__in=created[model]).delete()
+        return results
+
+    def run_endpoint(self, client, opts, name, method, url, body, created, model_for, cold=True):
+        """
+        Times one endpoint; returns (result, whether its responses came through the response cache).
+        cold: every request misses the response cache (a new generation of every model before it, not timed),
+        otherwise the warmup requests fill it and the timed ones are hits.
+        """
+        call = getattr(client, method)
+        labels = [model._meta.label_lower for label in ("structures", "operations")
+                  for model in apps.get_app_config(label).get_models()]
+        durations, queries, cached = [], [], False
+        for i in range(opts["warmup"] + opts["requests"]):
+            payload = body() if body else None
+            if isinstance(payload, str):
+                kwargs = {"data": payload, "content_type": "text/csv"}
+            else:
+                kwargs = {"data": json.dumps(payload), "content_type": "application/json"} if body else {}
+            if cold:
+                bump_generation(*labels)
+            reset_queries()
+            with collect_queries() as stats:
+                start = time.perf_counter()
+                response = call(url, **kwargs)
+                if response.streaming:  # the rows are only queried as the body is read
+                    b"".join(response.streaming_content)
+                elapsed = (time.perf_counter() - start) * 1000
+            if method == "post" and name.endswith("-create") and response.status_code == 201:
+                created[model_for[name.split("-")[0]]].append(response.json()["id"])
+            if response.status_code >= 400:
+                raise CommandError(f"{name}: {method.upper()} {url} returned {response.status_code}")
+            cached = cached or response.has_header("X-Cache")
+            if i >= opts["warmup"]:
+                durations.append(elapsed)
+                queries.append(stats.count)
+
+        ordered = sorted(durations)
+        result = {
+            "method": method.upper(),
+            "url": url,
+            "requests": len(durations),
+            "throughput_rps": round(len(durations) / (sum(durations) / 1000), 1),
+            "mean_ms": round(statistics.fmean(durations), 3),
+            "p50_ms": round(percentile(ordered, 50), 3),
+            "p95_ms": round(percentile(ordered, 95), 3),
+            "p99_ms": round(percentile(ordered, 99), 3),
+            "max_ms": round(ordered[-1], 3),
+            "queries": max(queries),
+        }
+        if opts["verbosity"] > 1:
+            self.stdout.write(f"  {name}{'' if cold else '-warm'}: p50 {result['p50_ms']}ms")
+        return result, cached
+
+    # -------------------- reporting --------------------
+    def print_table(self, results):
+        header = f"{'endpoint':<40}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<40}{r['throughput_rps']:>9}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['queries']:>9}"
+            )
+
+    def compare(self, baseline, results, max_regression):
+        """Print the per endpoint deltas; return the names that got slower than allowed or run more queries."""
+        regressions = []
+        self.stdout.write("")
+        self.stdout.write(f"{'endpoint':<40}{'p50 delta':>11}{'p95 delta':>11}{'queries':>12}")
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                self.stdout.write(f"{name:<40}{'(new)':>11}")
+                continue
+            deltas = [
+                (current[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+                for key in ("p50_ms", "p95_ms")
+            ]
+            regressed = any(d > max_regression for d in deltas) or current["queries"] > previous["queries"]
+            line = (f"{name:<40}{deltas[0]:>+10.1f}%{deltas[1]:>+10.1f}%"
+                    f"{previous['queries']:>6} -> {current['queries']:<3}")
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+            if regressed:
+                regressions.append(name)
+        return regressions
@@ -0,0 +1,141 @@
+'''
+# Seed 1M employees and benchmark the search endpoint against an unindexed icontains scan
+python manage.py bench_search --employees 1000000 --workers 8
+
+# Reuse the current data
+python manage.py bench_search --no-seed --queries 500
+'''
+
+import io
+import logging
+import operator
+import random
+import statistics
+import time
+from functools import reduce
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.test import Client
+from django.urls import reverse
+
+from structures.models import EMPLOYEE_SEARCH_FIELDS, EMPLOYEE_TRIGRAM_INDEXES, Employee, employee_search_index
+
+
+def percentile(ordered, pct):
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Benchmark /employees/search/ (trigram / n-gram index) against an unindexed icontains scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--no-seed", action="store_true", help="Benchmark the employees already in the database")
+        parser.add_argument("--employees", type=int, default=1_000_000)
+        parser.add_argument("--departments", type=int, default=28)
+        parser.add_argument("--workers", type=int, default=4, help="seed_data generator processes")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the dataset and the sampled queries")
+        parser.add_argument("--queries", type=int, default=200, help="Timed queries per method")
+        parser.add_argument("--scan-queries", type=int, default=20,
+                            help="Timed queries for the (slow) unindexed scan baseline")
+        parser.add_argument("--page-size", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        if not opts["no_seed"]:
+            self.stdout.write(f"Seeding {opts['employees']:,} employees...")
+            call_command(
+                "seed_data", scale=True, purge=True, seed=opts["seed"], workers=opts["workers"],
+                departments=opts["departments"], employees=opts["employees"],
+                attendance_per_employee=0, reviews_per_employee=0,
+                stdout=self.stdout if opts["verbosity"] > 1 else io.StringIO(),
+            )
+        total = Employee.objects.count()
+        if not total:
+            raise CommandError("No employees in the database; run without --no-seed.")
+
+        self.prepare_index()
+        terms = self.sample_terms(opts["queries"], random.Random(opts["seed"]))
+        self.stdout.write(f"{total:,} employees, {len(terms)} sampled queries, page size {opts['page_size']}")
+
+        request_logger = logging.getLogger("ems.requests")
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.WARNING)
+        try:
+            indexed, hits = self.time_endpoint(terms, opts["page_size"])
+            scan = self.time_scan(terms[:opts["scan_queries"]], opts["page_size"])
+        finally:
+            request_logger.setLevel(previous_level)
+
+        self.stdout.write(f"{'method':<28}{'queries':>9}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        for name, durations in (("search endpoint (indexed)", indexed), ("icontains scan", scan)):
+            ordered = sorted(durations)
+            self.stdout.write(f"{name:<28}{len(ordered):>9}{percentile(ordered, 50):>10.2f}"
+                              f"{percentile(ordered, 95):>10.2f}{ordered[-1]:>10.2f}")
+        self.stdout.write(f"Queries with at least one hit: {hits}/{len(terms)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"p50 speedup over the scan: {statistics.median(scan) / statistics.median(indexed):,.1f}x"
+        ))
+
+    def prepare_index(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT indexname FROM pg_indexes WHERE tablename = %s", [Employee._meta.db_table]
+                )
+                present = {row[0] for row in cursor.fetchall()}
+            missing = set(EMPLOYEE_TRIGRAM_INDEXES.values()) - present
+            if missing:
+                raise CommandError(f"Missing trigram indexes {sorted(missing)}; run python manage.py migrate.")
+            return
+        # The in-process index is built on the first search; report that cost separately
+        started = time.perf_counter()
+        employee_search_index.invalidate()
+        employee_search_index.build()
+        self.stdout.write(f"In-process n-gram index built in {time.perf_counter() - started:.1f}s")
+
+    def sample_terms(self, count, rng):
+        """Substrings of existing names, emails and phone numbers (3-8 chars), plus a few misses."""
+        max_id = Employee.objects.order_by("-id").values_list("id", flat=True).first()
+        terms = []
+        while len(terms) < count:
+            if rng.random() < 0.1:
+                terms.append("".join(rng.choice("qxzj") for _ in range(5)))
+                continue
+            row = Employee.objects.filter(id__gte=rng.randint(1, max_id)).order_by("id").values_list(
+                *EMPLOYEE_SEARCH_FIELDS).first()
+            value = rng.choice([v for v in row if v and len(v) >= 3])
+            length = rng.randint(3, min(8, len(value)))
+            start = rng.randint(0, len(value) - length)
+            term = value[start:start + length].strip()
+            if len(term) >= 3:
+                terms.append(term)
+        return terms
+
+    def time_endpoint(self, terms, page_size):
+        client = Client(HTTP_HOST="localhost")
+        url = reverse("employee-search")
+        durations, hits = [], 0
+        for term in terms:
+            start = time.perf_counter()
+            response = client.get(url, {"q": term, "page_size": page_size})
+            durations.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"search {term!r} returned {response.status_code}")
+            hits += bool(response.json()["results"])
+        return durations, hits
+
+    def time_scan(self, terms, page_size):
+        """What the endpoint would cost with a plain icontains filter: COUNT + first page, both full scans."""
+        durations = []
+        for term in terms:
+            qs = Employee.objects.filter(
+                reduce(operator.or_, (Q(**{f"{field}__icontains": term}) for field in EMPLOYEE_SEARCH_FIELDS))
+            )
+            start = time.perf_counter()
+            qs.count()
+            list(qs.order_by("id").values_list("id", *EMPLOYEE_SEARCH_FIELDS)[:page_size])
+            durations.append((time.perf_counter() - start) * 1000)
+        return durations
@@ -0,0 +1,147 @@
+'''
+# Compare the development server with the production serving mode (same database, both started beforehand)
+DB_CONN_MAX_AGE=0 python manage.py runserver 127.0.0.1:8001 --noreload
+WEB_ALLOW_LOCAL_CACHES=1 gunicorn employee_mgmt.wsgi:application --bind 127.0.0.1:8000  # read-only: local caches do
+python manage.py load_test --target runserver=http://127.0.0.1:8001 --target gunicorn=http://127.0.0.1:8000
+
+# One server, more clients, longer run, only some paths
+python manage.py load_test --target http://127.0.0.1:8000 --concurrency 64 --duration 30 --path /api-structures/departments/
+'''
+
+import http.client
+import random
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from structures.models import Department, Employee
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "HTTP load test of running servers: concurrent keep-alive clients replay a mix of read requests "
+        "for a fixed time and report throughput and latency per target."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", required=True,
+                            help="[label=]base URL of a running server (repeatable, compared in order)")
+        parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client connections")
+        parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per target")
+        parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each measurement")
+        parser.add_argument("--path", action="append", dest="paths",
+                            help="Request path (repeatable). Default: a mix of list, detail and filter requests "
+                                 "built from the current data")
+        parser.add_argument("--timeout", type=float, default=10.0, help="Seconds before a request counts as failed")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        targets = []
+        for target in opts["target"]:
+            label, _, url = target.partition("=") if "=" in target.split("://")[0] else ("", "", target)
+            parsed = urlsplit(url)
+            if parsed.scheme != "http" or not parsed.hostname:
+                raise CommandError(f"Unsupported target {target!r}; use [label=]http://host:port")
+            targets.append((label or parsed.netloc, parsed))
+        paths = opts["paths"] or self.default_paths(random.Random(opts["seed"]))
+
+        self.stdout.write(f"{len(paths)} paths, {opts['concurrency']} connections, "
+                          f"{opts['warmup']:g}s warm-up + {opts['duration']:g}s per target")
+        results = []
+        for label, parsed in targets:
+            self.stdout.write(f"Loading {label}...")
+            results.append((label, self.run(parsed, paths, opts)))
+
+        self.stdout.write(f"{'target':<20}{'requests':>10}{'errors':>8}{'req/s':>10}"
+                          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for label, (latencies, errors, elapsed) in results:
+            ordered = sorted(latencies)
+            p50, p95, p99 = (percentile(ordered, pct) for pct in (50, 95, 99))
+            self.stdout.write(
+                f"{label:<20}{len(ordered):>10}{errors:>8}{len(ordered) / elapsed:>10.1f}"
+                + "".join(f"{'-' if p is None else f'{p * 1000:.1f}':>9}" for p in (p50, p95, p99))
+            )
+        if len(results) > 1 and results[0][1][0]:
+            base = len(results[0][1][0]) / results[0][1][2]
+            for label, (latencies, errors, elapsed) in results[1:]:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{label}: {len(latencies) / elapsed / base:.2f}x the throughput of {results[0][0]}"
+                ))
+
+    def default_paths(self, rng):
+        employee_ids = list(Employee.objects.order_by("?").values_list("id", flat=True)[:50])
+        if not employee_ids:
+            raise CommandError("No employees in the database; seed some data (seed_data) or pass --path.")
+        department_ids = list(Department.objects.values_list("id", flat=True)[:50])
+        paths = []
+        for employee_id in employee_ids:
+            paths += [
+                reverse("employee-details-and-modifications", args=[employee_id]),
+                reverse("attendance-list-and-create") + "?" + urlencode({"employee": employee_id, "page_size": 20}),
+                reverse("employee-list-and-create") + "?" + urlencode({"page": rng.randint(1, 20), "page_size": 20}),
+            ]
+        paths += [reverse("department-details-and-modifications", args=[pk]) for pk in department_ids]
+        paths.append(reverse("department-list-and-create") + "?page_size=20")
+        rng.shuffle(paths)
+        return paths
+
+    def run(self, target, paths, opts):
+        """Returns ([latency of each successful measured request], failed requests, measured seconds)."""
+        start = time.perf_counter() + opts["warmup"]
+        stop = start + opts["duration"]
+        outcomes = []
+        threads = [
+            threading.Thread(target=self.client, args=(target, paths[i::opts["concurrency"]] or paths, start, stop,
+                                                       opts["timeout"], outcomes))
+            for i in range(opts["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latencies = [latency for thread_latencies, _ in outcomes for latency in thread_latencies]
+        return latencies, sum(errors for _, errors in outcomes), opts["duration"]
+
+    @staticmethod
+    def client(target, paths, start, stop, timeout, outcomes):
+        """One keep-alive connection sending requests back to back; reconnects when the server closes it."""
+        connection, latencies, errors, index = None, [], 0, 0
+        while True:
+            began = time.perf_counter()
+            if began >= stop:
+                break
+            path = target.path.rstrip("/") + paths[index % len(paths)]
+            index += 1
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=timeout)
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+                if response.will_close:
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException):
+                ok = False
+                if connection is not None:
+                    connection.close()
+                connection = None
+            if began >= start:
+                if ok:
+                    latencies.append(time.perf_counter() - began)
+                else:
+                    errors += 1
+        if connection is not None:
+            connection.close()
+        outcomes.append((latencies, errors))
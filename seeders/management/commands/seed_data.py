@@ -11,20 +11,34 @@ python manage.py seed_data --attendance-days-back 120
 # Start fresh each time
 python manage.py seed_data --purge
 
+# Scale mode: chunked, parallel, COPY-loaded (Postgres), reproducible
+python manage.py seed_data --scale --purge --departments 28 --employees 100000 --attendance-per-employee 365 --workers 8 --seed 42
+
 '''
 
+import csv
+import io
+import os
 import random
+import re
+import time
+from collections import deque
 from datetime import timedelta
+from multiprocessing import get_context
 
+from django.core.cache import cache
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
 from django.utils import timezone
 
 from faker import Faker
 from faker.providers import DynamicProvider
 
-from structures.models import Department, Employee
-from operations.models import Attendance, Performance
+from structures.models import Department, Employee, DEPARTMENT_CHART_CACHE_KEY, employee_search_index
+from common.response_cache import bump_generation
+from operations.models import Attendance, AttendanceArchive, AttendanceMonthlySummary, Performance
 
 '''
 DEPT_CHOICES = ["Sales", "Finance", "Marketing", "Engineering", "Human Resources"]
@@ -53,6 +67,58 @@ department_provider = DynamicProvider(
 )
 fake.add_provider(department_provider)
 
+STATUS_CHOICES = ["P", "A", "L"]
+# Skew realistic distribution (mostly Present)
+STATUS_WEIGHTS = [0.85, 0.10, 0.05]
+
+# -------------------- Scale mode --------------------
+# Columns written per table (attnames == db column names for these models)
+EMPLOYEE_COLUMNS = ["id", "name", "email", "phone_number", "address", "date_of_joining", "department_id"]
+ATTENDANCE_COLUMNS = ["employee_id", "date", "status"]
+PERFORMANCE_COLUMNS = ["employee_id", "rating", "review_date"]
+FAKER_POOL_SIZE = 200  # Faker values generated per chunk, then sampled (Faker per row is the main cost)
+
+
+def generate_chunk(task):
+    """
+    Build one chunk of employees with their attendance and reviews, in a worker process (no DB access).
+    Seeded per chunk, so the output for a given --seed is the same whatever the number of workers.
+    Returns row counts and, per table, either a CSV string (for COPY) or a list of tuples (for bulk_create).
+    """
+    chunk_index, first_id, count, dept_ids, attd_per_emp, perf_per_emp, seed, today, as_csv = task
+    rng = random.Random(f"{seed}:{chunk_index}")
+    chunk_fake = Faker()
+    chunk_fake.seed_instance(f"{seed}:{chunk_index}")
+    first_names = [chunk_fake.first_name() for _ in range(FAKER_POOL_SIZE)]
+    last_names = [chunk_fake.last_name() for _ in range(FAKER_POOL_SIZE)]
+    addresses = [chunk_fake.address().replace("\n", ", ") for _ in range(FAKER_POOL_SIZE)]
+
+    attendance_days = [today - timedelta(days=d) for d in range(attd_per_emp, 0, -1)]
+    employees, attendance, performance = [], [], []
+    for emp_id in range(first_id, first_id + count):
+        first, last = rng.choice(first_names), rng.choice(last_names)
+        # The id keeps emails unique across chunks and workers without a shared Faker.unique
+        email = f"{re.sub(r'[^a-z0-9]', '', first.lower())}.{re.sub(r'[^a-z0-9]', '', last.lower())}.{emp_id}@example.com"
+        phone = f"{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}"
+        doj = today - timedelta(days=rng.randint(0, 5 * 365))
+        employees.append((emp_id, f"{first} {last}", email, phone, rng.choice(addresses), doj, rng.choice(dept_ids)))
+
+        statuses = rng.choices(STATUS_CHOICES, weights=STATUS_WEIGHTS, k=attd_per_emp)
+        attendance.extend(zip([emp_id] * attd_per_emp, attendance_days, statuses))
+        for _ in range(perf_per_emp):
+            performance.append((emp_id, rng.randint(1, 5), today - timedelta(days=rng.randint(0, 2 * 365))))
+
+    counts = (len(employees), len(attendance), len(performance))
+    tables = (employees, attendance, performance)
+    if as_csv:
+        encoded = []
+        for rows in tables:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            encoded.append(buffer.getvalue())
+        tables = tuple(encoded)
+    return chunk_index, counts, tables
+
 
 class Command(BaseCommand):
     help = "Seed Departments, Employees, Attendance, and Performance with Faker data."
@@ -67,9 +133,24 @@ class Command(BaseCommand):
                             help="Performance reviews per employee")
         parser.add_argument("--purge", action="store_true",
                             help="Delete existing rows before seeding")
+        parser.add_argument("--scale", action="store_true",
+                            help="Scale mode: chunked parallel generation, COPY/bulk load, TRUNCATE purge")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Scale mode: generator processes")
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Scale mode: employees per chunk (one chunk is loaded and committed at a time)")
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Scale mode: seed for reproducible data")
+        parser.add_argument("--no-copy", action="store_true",
+                            help="Scale mode: use chunked bulk_create even on PostgreSQL")
 
-    @transaction.atomic
     def handle(self, *args, **opts):
+        if opts["scale"]:
+            return self.handle_scale(**opts)
+        return self.handle_small(**opts)
+
+    @transaction.atomic
+    def handle_small(self, **opts):
         fake = Faker()
         num_depts = opts["departments"]
         num_emps = opts["employees"]
@@ -170,14 +251,10 @@ class Command(BaseCommand):
         today = timezone.now().date()
         attendance_rows = []
 
-        STATUS_CHOICES = ["P", "A", "L"]
-        # Skew realistic distribution (mostly Present)
-        weights = [0.85, 0.10, 0.05]
-
         for emp in employees:
             for d in range(attd_per_emp, 0, -1):
                 att_date = today - timedelta(days=d)
-                status = random.choices(STATUS_CHOICES, weights=weights, k=1)[0]
+                status = random.choices(STATUS_CHOICES, weights=STATUS_WEIGHTS, k=1)[0]
                 attendance_rows.append(Attendance(
                     employee=emp,
                     date=att_date,
@@ -209,3 +286,116 @@ class Command(BaseCommand):
         self.stdout.write(f"Employees:   {Employee.objects.count()}")
         self.stdout.write(f"Attendance:  {Attendance.objects.count()}")
         self.stdout.write(f"Performance: {Performance.objects.count()}")
+
+    # -------------------- Scale mode --------------------
+    def handle_scale(self, **opts):
+        num_emps = opts["employees"]
+        chunk_size = max(1, opts["chunk_size"])
+        workers = max(1, opts["workers"])
+        seed = opts["seed"]
+        use_copy = connection.vendor == "postgresql" and not opts["no_copy"]
+        started = time.perf_counter()
+
+        if opts["purge"]:
+            self.stdout.write(self.style.WARNING("Purging existing data (TRUNCATE)..."))
+            self._fast_purge()
+
+        # Departments: small, done with the ORM
+        names = random.Random(seed if opts.get("dept_seed") is None else opts["dept_seed"]).sample(
+            DEPARTMENT_POOL, k=min(opts["departments"], len(DEPARTMENT_POOL))
+        )
+        Department.objects.bulk_create([Department(name=n) for n in names], ignore_conflicts=True)
+        dept_ids = list(Department.objects.filter(name__in=names).order_by("name").values_list("id", flat=True))
+        if not dept_ids:
+            self.stdout.write(self.style.ERROR("No departments available; aborting."))
+            return
+
+        # Explicit employee ids so attendance/performance rows can reference them without a round trip
+        first_id = (Employee.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+        today = timezone.now().date()
+        tasks = [
+            (index, first_id + start, min(chunk_size, num_emps - start), dept_ids,
+             opts["attendance_per_employee"], opts["reviews_per_employee"], seed, today, use_copy)
+            for index, start in enumerate(range(0, num_emps, chunk_size))
+        ]
+        self.stdout.write(
+            f"Generating {num_emps} employees in {len(tasks)} chunk(s) with {workers} worker(s), "
+            f"loading via {'COPY' if use_copy else 'bulk_create'}..."
+        )
+
+        totals = [0, 0, 0]
+        for chunk_index, counts, tables in self._generate(tasks, workers):
+            with transaction.atomic():
+                self._load(Employee, EMPLOYEE_COLUMNS, tables[0], use_copy)
+                self._load(Attendance, ATTENDANCE_COLUMNS, tables[1], use_copy)
+                self._load(Performance, PERFORMANCE_COLUMNS, tables[2], use_copy)
+            totals = [t + c for t, c in zip(totals, counts)]
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  chunk {chunk_index + 1}/{len(tasks)}: {sum(totals)} rows, {sum(totals) / elapsed:,.0f} rows/sec"
+            )
+        load_elapsed = time.perf_counter() - started
+
+        self.stdout.write("Resetting sequences and rebuilding derived data...")
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Employee]):
+                cursor.execute(sql)
+            if connection.vendor == "postgresql":
+                cursor.execute("ANALYZE")
+        # COPY and _base_manager.bulk_create bypass the incremental hooks
+        Department.objects.all().refresh_employee_counts()
+        AttendanceMonthlySummary.rebuild()
+        cache.delete(DEPARTMENT_CHART_CACHE_KEY)
+        employee_search_index.invalidate()
+        bump_generation(Department._meta.label_lower, Employee._meta.label_lower)
+
+        total_elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS("Seeding complete!"))
+        self.stdout.write(f"Departments: {len(dept_ids)}")
+        self.stdout.write(f"Employees:   {totals[0]}")
+        self.stdout.write(f"Attendance:  {totals[1]}")
+        self.stdout.write(f"Performance: {totals[2]}")
+        self.stdout.write(
+            f"Total: {sum(totals)} rows in {total_elapsed:.1f}s "
+            f"(load {load_elapsed:.1f}s, {sum(totals) / load_elapsed:,.0f} rows/sec)"
+        )
+
+    def _generate(self, tasks, workers):
+        """Yield generated chunks in order, keeping at most 2 * workers chunks in memory."""
+        if workers == 1:
+            yield from map(generate_chunk, tasks)
+            return
+        connections.close_all()  # never share the parent's DB connection with forked workers
+        with get_context("fork").Pool(workers) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.apply_async(generate_chunk, (task,)))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+
+    def _load(self, model, columns, payload, use_copy):
+        if use_copy:
+            table = connection.ops.quote_name(model._meta.db_table)
+            cols = ", ".join(connection.ops.quote_name(model._meta.get_field(c).column) for c in columns)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv)", io.StringIO(payload))
+        else:
+            # _base_manager skips the per batch rollup/headcount refresh; handle_scale rebuilds them once at the end
+            model._base_manager.bulk_create(
+                [model(**dict(zip(columns, row))) for row in payload], batch_size=5000,
+            )
+
+    def _fast_purge(self):
+        # Children first for the DELETE fallback: every model with a foreign key to Employee before it
+        purge_models = [AttendanceMonthlySummary, AttendanceArchive, Attendance, Performance, Employee, Department]
+        tables = [connection.ops.quote_name(m._meta.db_table) for m in purge_models]
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+            else:
+                for table in tables:
+                    cursor.execute(f"DELETE FROM {table}")
+        cache.delete(DEPARTMENT_CHART_CACHE_KEY)
+        bump_generation(*(m._meta.label_lower for m in purge_models))
@@ -1,3 +1,36 @@
+import operator
+from functools import reduce
+
 from django.contrib import admin
+from django.db import connections
+from django.db.models import F, Q
+
+from common.admin import LargeTableAdmin
+from common.search import ILikeContains
+from structures.models import EMPLOYEE_SEARCH_FIELDS, Department, Employee
+
+
+@admin.register(Department)
+class DepartmentAdmin(LargeTableAdmin):
+    list_display = ("id", "name", "employee_count", "updated_at")
+    search_fields = ("name",)  # also serves the department autocomplete of EmployeeAdmin
+    sortable_by = ("id", "name")
+    ordering = ("name",)
+
+
+@admin.register(Employee)
+class EmployeeAdmin(LargeTableAdmin):
+    list_display = ("id", "name", "email", "department", "date_of_joining")
+    list_select_related = ("department",)  # Employee.__str__ shows the department name
+    list_filter = ("department",)  # (department, name) index
+    autocomplete_fields = ("department",)
+    search_fields = EMPLOYEE_SEARCH_FIELDS
+    ordering = ("-id",)
 
-# Register your models here.
+    def get_search_results(self, request, queryset, search_term):
+        if search_term and connections[queryset.db].vendor == "postgresql":
+            # ILIKE '%term%' is served by the pg_trgm indexes; the admin's icontains (UPPER(...) LIKE) is not
+            return queryset.filter(
+                reduce(operator.or_, (Q(ILikeContains(F(field), search_term)) for field in EMPLOYEE_SEARCH_FIELDS))
+            ), False
+        return super().get_search_results(request, queryset, search_term)
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def create_search_indexes(sender, using, **kwargs):
+    from django.db import connections
+
+    from common.search import create_trigram_indexes
+    from structures.models import EMPLOYEE_TRIGRAM_INDEXES, Employee
+
+    create_trigram_indexes(connections[using], Employee._meta.db_table, EMPLOYEE_TRIGRAM_INDEXES)
 
 
 class StructuresConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'structures'
+
+    def ready(self):
+        # pg_trgm indexes for the employee search; not expressible in Meta.indexes on every backend
+        post_migrate.connect(create_search_indexes, sender=self)
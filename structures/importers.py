@@ -0,0 +1,226 @@
+import codecs
+import contextlib
+import csv
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils.text import capfirst
+
+from structures.models import Department, Employee
+
+# Streaming CSV import of departments and employees (structures.views *_import, manage.py import_csv).
+#
+# The file is read one line at a time and written in chunks of batch_size rows. Per chunk: one lookup of
+# the department names not resolved yet (the missing ones are bulk created), one lookup of the chunk's
+# emails, one INSERT. Rows with errors are reported by line and skipped; the rest are imported. Memory
+# depends on batch_size and on the number of departments, not on the size of the file.
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000  # error lines kept in a report; the rest are only counted
+
+EMPLOYEE_CSV_COLUMNS = ("name", "email", "phone_number", "address", "date_of_joining", "department")
+DEPARTMENT_CSV_COLUMNS = ("name",)
+
+
+class CsvImportError(ValueError):
+    """The file cannot be imported at all (e.g. a missing column); nothing was written."""
+
+
+class ImportReport:
+    """Counts of an import and its error lines: [{"line": n, "errors": {column: [message]}}]."""
+
+    def __init__(self, dry_run=False, max_errors=MAX_REPORTED_ERRORS, on_error=None):
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.on_error = on_error  # called with (line, errors) for every error line, e.g. to print it
+        self.rows = self.created = self.departments_created = self.error_count = 0
+        self.errors = []
+        self.aborted = False
+
+    def error(self, line, errors):
+        self.error_count += 1
+        if self.on_error is not None:
+            self.on_error(line, errors)
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "created": self.created,
+            "departments_created": self.departments_created,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+            "aborted": self.aborted,
+        }
+
+
+def decode_lines(source, encoding="utf-8-sig"):
+    """Text lines of a binary line iterable (an uploaded file, a request body, a file opened in "rb")."""
+    return codecs.iterdecode(source, encoding)
+
+
+def _read_rows(lines, columns, required, report):
+    """Yields (line number, {column: stripped value}); stops, with an error line, at a broken line."""
+    reader = csv.reader(lines)
+    try:
+        header = [name.strip().lower() for name in next(reader, [])]
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise CsvImportError(f"Unreadable header: {exc}")
+    missing = [name for name in required if name not in header]
+    if missing:
+        raise CsvImportError(f"Missing column(s): {', '.join(missing)}. Expected: {', '.join(columns)}.")
+    positions = [(name, header.index(name)) for name in columns if name in header]
+
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except (csv.Error, UnicodeDecodeError) as exc:
+            report.error(reader.line_num + 1, {"file": [f"Unreadable line, import stopped: {exc}"]})
+            report.aborted = True
+            return
+        if not any(value.strip() for value in values):
+            continue  # blank line
+        yield reader.line_num, {name: values[i].strip() if i < len(values) else "" for name, i in positions}
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _clean(model, row, columns):
+    """(values, errors) of the row, validated by the model fields themselves (uniqueness aside)."""
+    values, errors = {}, {}
+    for column in columns:
+        try:
+            values[column] = model._meta.get_field(column).clean(row.get(column, ""), None)
+        except ValidationError as exc:
+            errors[column] = exc.messages
+    return values, errors
+
+
+def _unique_message(model, field_name):
+    field = model._meta.get_field(field_name)
+    return field.error_messages["unique"] % {
+        "model_name": capfirst(model._meta.verbose_name),
+        "field_label": field.verbose_name,
+    }
+
+
+@contextlib.contextmanager
+def _import_transaction(dry_run):
+    """A dry run imports for real inside a transaction it rolls back, so its report is the real one."""
+    if not dry_run:
+        yield
+        return
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def resolve_departments(names, departments, report):
+    """Add {name: id} of the names not in departments yet, bulk creating the missing departments."""
+    missing = set(names) - departments.keys()
+    if not missing:
+        return
+    departments.update(Department.objects.filter(name__in=missing).values_list("name", "id"))
+    new = missing - departments.keys()
+    if new:
+        # ignore_conflicts: a concurrent import may create the same names
+        Department.objects.bulk_create([Department(name=name) for name in sorted(new)], ignore_conflicts=True)
+        departments.update(Department.objects.filter(name__in=new).values_list("name", "id"))
+        report.departments_created += len(new)
+
+
+def import_employees(lines, dry_run=False, batch_size=IMPORT_BATCH_SIZE, report=None):
+    """
+    Import employees from CSV text lines with the EMPLOYEE_CSV_COLUMNS header (any order, phone_number and
+    address optional). "department" is a department name; missing departments are created. Rows whose email
+    is already taken, in the database or earlier in the file, are reported and skipped.
+    """
+    report = report or ImportReport(dry_run)
+    fields = [name for name in EMPLOYEE_CSV_COLUMNS if name != "department"]
+    departments = {}  # {name: id} resolved so far
+    rows = _read_rows(lines, EMPLOYEE_CSV_COLUMNS, ("name", "email", "date_of_joining", "department"), report)
+
+    with _import_transaction(dry_run):
+        for chunk in _chunks(rows, batch_size):
+            valid = []
+            for line, row in chunk:
+                report.rows += 1
+                values, errors = _clean(Employee, row, fields)
+                try:
+                    department = Department._meta.get_field("name").clean(row["department"], None)
+                except ValidationError as exc:
+                    errors["department"] = exc.messages
+                if errors:
+                    report.error(line, errors)
+                else:
+                    valid.append((line, values, department))
+
+            resolve_departments({department for _, _, department in valid}, departments, report)
+            report.created += _create_employees(valid, departments, report)
+    return report
+
+
+def _create_employees(valid, departments, report):
+    duplicate = {"email": [_unique_message(Employee, "email")]}
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                taken = set(Employee.objects.filter(email__in={values["email"] for _, values, _ in valid})
+                            .values_list("email", flat=True))
+                employees, skipped = [], []
+                for line, values, department in valid:
+                    if values["email"] in taken:
+                        skipped.append(line)
+                    else:
+                        taken.add(values["email"])
+                        employees.append(Employee(**values, department_id=departments[department]))
+                Employee.objects.bulk_create(employees)
+        except IntegrityError:
+            if attempt:
+                raise
+            continue  # an email was inserted concurrently: check the chunk again
+        for line in skipped:
+            report.error(line, duplicate)
+        return len(employees)
+
+
+def import_departments(lines, dry_run=False, batch_size=IMPORT_BATCH_SIZE, report=None):
+    """Import departments from CSV text lines with a "name" column; existing names are reported and skipped."""
+    report = report or ImportReport(dry_run)
+    duplicate = {"name": [_unique_message(Department, "name")]}
+    rows = _read_rows(lines, DEPARTMENT_CSV_COLUMNS, DEPARTMENT_CSV_COLUMNS, report)
+
+    with _import_transaction(dry_run):
+        for chunk in _chunks(rows, batch_size):
+            valid = {}
+            for line, row in chunk:
+                report.rows += 1
+                values, errors = _clean(Department, row, DEPARTMENT_CSV_COLUMNS)
+                if errors:
+                    report.error(line, errors)
+                elif values["name"] in valid:
+                    report.error(line, duplicate)
+                else:
+                    valid[values["name"]] = line
+
+            with transaction.atomic():
+                taken = set(Department.objects.filter(name__in=valid).values_list("name", flat=True))
+                for name in sorted(taken, key=valid.get):
+                    report.error(valid.pop(name), duplicate)
+                Department.objects.bulk_create([Department(name=name) for name in valid], ignore_conflicts=True)
+            report.created += len(valid)
+    return report
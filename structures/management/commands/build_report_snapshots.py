@@ -0,0 +1,42 @@
+'''
+# Prebuild every report (e.g. hourly from cron, within REPORT_SNAPSHOT_MAX_AGE), one worker process per CPU
+python manage.py build_report_snapshots
+
+# Only the employees per department chart, in this process
+python manage.py build_report_snapshots employees-per-department --workers 1
+'''
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.snapshots import snapshot_root
+from structures.snapshots import REPORT_BUILDERS, SNAPSHOT_CHUNK_SIZE, build_report_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the report pages and their chart datasets into gzip compressed, content hashed files under "
+        "REPORT_SNAPSHOT_ROOT and publish them in its manifest.json. The report views serve them while fresh."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("reports", nargs="*", help=f"Reports to build: {', '.join(REPORT_BUILDERS)} (default: all)")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+        parser.add_argument("--chunk-size", type=int, default=SNAPSHOT_CHUNK_SIZE,
+                            help="Employees per worker task")
+
+    def handle(self, *args, **opts):
+        if opts["workers"] < 1 or opts["chunk_size"] < 1:
+            raise CommandError("--workers and --chunk-size must be positive.")
+        unknown = [report for report in opts["reports"] if report not in REPORT_BUILDERS]
+        if unknown:
+            raise CommandError(f"Unknown report(s): {', '.join(unknown)}. Choose from {', '.join(REPORT_BUILDERS)}.")
+
+        started = time.perf_counter()
+        built = build_report_snapshots(opts["reports"], workers=opts["workers"], chunk_size=opts["chunk_size"])
+        elapsed = time.perf_counter() - started
+        for report, count in built.items():
+            self.stdout.write(f"{report}: {count} snapshots")
+        self.stdout.write(self.style.SUCCESS(f"Published to {snapshot_root()} in {elapsed:.1f}s."))
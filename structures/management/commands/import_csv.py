@@ -0,0 +1,65 @@
+'''
+# Load a subsidiary: departments first (optional, employee imports create missing departments), then employees
+python manage.py import_csv departments departments.csv
+python manage.py import_csv employees employees.csv
+
+# Only validate and report, write nothing; read from stdin
+python manage.py import_csv employees - --dry-run < employees.csv
+'''
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from structures.importers import (
+    IMPORT_BATCH_SIZE,
+    CsvImportError,
+    ImportReport,
+    decode_lines,
+    import_departments,
+    import_employees,
+)
+
+IMPORTERS = {"departments": import_departments, "employees": import_employees}
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV file of departments (name) or employees (name, email, date_of_joining, department name, "
+        "phone_number, address) into the database in chunks. Invalid lines are printed and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path", help="CSV file (UTF-8 with a header line), or - for stdin")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Rows written per INSERT")
+        parser.add_argument("--dry-run", action="store_true", help="Validate and report, write nothing")
+
+    def handle(self, *args, **opts):
+        if opts["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        def print_error(line, errors):
+            self.stderr.write(f"line {line}: {json.dumps(errors, ensure_ascii=False)}")
+
+        report = ImportReport(opts["dry_run"], max_errors=0, on_error=print_error)  # printed, not kept
+        try:
+            source = sys.stdin.buffer if opts["path"] == "-" else open(opts["path"], "rb")
+        except OSError as exc:
+            raise CommandError(exc)
+        try:
+            with source:
+                IMPORTERS[opts["kind"]](decode_lines(source), dry_run=opts["dry_run"],
+                                        batch_size=opts["batch_size"], report=report)
+        except CsvImportError as exc:
+            raise CommandError(exc)
+
+        verb = "Would create" if opts["dry_run"] else "Created"
+        summary = f"{verb} {report.created} of {report.rows} {opts['kind']}"
+        if opts["kind"] == "employees":
+            summary += f" ({report.departments_created} new departments)"
+        summary += f"; {report.error_count} lines with errors."
+        if report.aborted:
+            raise CommandError(f"{summary} Stopped at an unreadable line.")
+        self.stdout.write(self.style.SUCCESS(summary) if not report.error_count else self.style.WARNING(summary))
@@ -0,0 +1,16 @@
+'''
+# Backfill / repair Department.employee_count (e.g. after adding the column to an existing database)
+python manage.py rebuild_department_headcount
+'''
+
+from django.core.management.base import BaseCommand
+
+from structures.models import Department
+
+
+class Command(BaseCommand):
+    help = "Recount Department.employee_count from the Employee table."
+
+    def handle(self, *args, **opts):
+        updated = Department.objects.all().refresh_employee_counts()
+        self.stdout.write(self.style.SUCCESS(f"Department headcounts recomputed: {updated}"))
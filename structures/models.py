@@ -1,8 +1,78 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
 
-class Department(models.Model):
+from common.response_cache import GenerationModel, GenerationQuerySet
+from common.search import NgramIndex
+from common.snapshots import mark_stale
+
+# Rendered payload of the employees per department chart, invalidated on any headcount/department change.
+DEPARTMENT_CHART_CACHE_KEY = "reports:employees_per_department"
+DEPARTMENT_CHART_CACHE_TIMEOUT = 60 * 60 * 24  # safety net only; writes invalidate explicitly
+# Report snapshots (structures.snapshots), marked stale by the writes to their source rows
+DEPARTMENT_CHART_SNAPSHOT = "employees-per-department"
+MONTHLY_ATTENDANCE_SNAPSHOT = "employee-monthly-attendance"  # per employee; shows the name
+
+
+def invalidate_department_chart():
+    # After commit, so a concurrent reader cannot re-cache the pre-write headcounts.
+    transaction.on_commit(lambda: cache.delete(DEPARTMENT_CHART_CACHE_KEY))
+    mark_stale(DEPARTMENT_CHART_SNAPSHOT)
+
+
+def touch_for_bulk_update(objs, fields):
+    """bulk_update() skips auto_now; stamp updated_at so ETags/Last-Modified change."""
+    now = timezone.now()
+    for obj in objs:
+        obj.updated_at = now
+    return [*fields, "updated_at"] if "updated_at" not in fields else fields
+
+
+class DepartmentQuerySet(GenerationQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        invalidate_department_chart()
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        rows = super().bulk_update(objs, touch_for_bulk_update(objs, fields), *args, **kwargs)
+        invalidate_department_chart()
+        return rows
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())  # QuerySet.update() skips auto_now
+        rows = super().update(**kwargs)
+        invalidate_department_chart()
+        return rows
+
+    def delete(self):
+        result = super().delete()
+        invalidate_department_chart()
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def refresh_employee_counts(self):
+        """Recount employee_count for the departments in this queryset with a single UPDATE ... SET = (SELECT COUNT)."""
+        headcount = Employee._base_manager.filter(department=OuterRef("pk")).order_by().values("department").annotate(
+            c=Count("id")
+        ).values("c")
+        return self.update(employee_count=Coalesce(Subquery(headcount), Value(0)))
+
+
+class Department(GenerationModel):
     id = models.BigAutoField(primary_key=True)  # explicit PK
     name = models.CharField("Department Name", max_length=100, unique=True)
+    # Denormalized COUNT(employees), maintained by Employee.save()/delete() and EmployeeQuerySet.
+    employee_count = models.PositiveIntegerField(default=0, editable=False)
+    # Version for conditional requests (ETag/Last-Modified); db_default covers raw inserts such as COPY.
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+    objects = DepartmentQuerySet.as_manager()
 
     class Meta:
         ordering = ["name"]
@@ -13,8 +83,111 @@ class Department(models.Model):
     def __str__(self) -> str:
         return f"id: {self.id}, name: {self.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_department_chart()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_department_chart()
+        return result
+
+
+# Employee search (structures.views.employee_search): substring match on these fields.
+EMPLOYEE_SEARCH_FIELDS = ("name", "email", "phone_number")
+# PostgreSQL trigram GIN indexes, created after migrate (structures.apps)
+EMPLOYEE_TRIGRAM_INDEXES = {
+    "name": "emp_name_trgm_idx",
+    "email": "emp_email_trgm_idx",
+    "phone_number": "emp_phone_trgm_idx",
+}
 
-class Employee(models.Model):
+
+def _employee_search_rows():
+    return Employee._base_manager.values_list("id", *EMPLOYEE_SEARCH_FIELDS).iterator(chunk_size=10000)
+
+
+# In-process fallback for databases without pg_trgm (SQLite); unused, and never built, on PostgreSQL.
+employee_search_index = NgramIndex(_employee_search_rows)
+
+
+class EmployeeQuerySet(GenerationQuerySet):
+    """
+    Keeps Department.employee_count correct on the bulk paths, which bypass Employee.save()/delete().
+    The affected departments are recounted from the table (so ignore_conflicts inserts are handled too).
+    """
+
+    def _department_ids(self):
+        return set(self.order_by().values_list("department_id", flat=True).distinct())
+
+    def _invalidate_search_index(self):
+        # After commit, as Employee.save(): a rolled back write must not reach the index
+        transaction.on_commit(employee_search_index.invalidate, using=self.db)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            Department.objects.filter(pk__in={obj.department_id for obj in objs}).refresh_employee_counts()
+        self._invalidate_search_index()
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if "name" in fields:
+            mark_stale(MONTHLY_ATTENDANCE_SNAPSHOT, [obj.pk for obj in objs])
+        if "department" not in fields and "department_id" not in fields:
+            rows = super().bulk_update(objs, touch_for_bulk_update(objs, fields), *args, **kwargs)
+        else:
+            with transaction.atomic(using=self.db):
+                affected = Employee._base_manager.using(self.db).filter(pk__in=[obj.pk for obj in objs]).values_list(
+                    "department_id", flat=True
+                )
+                affected = set(affected) | {obj.department_id for obj in objs}
+                rows = super().bulk_update(objs, touch_for_bulk_update(objs, fields), *args, **kwargs)
+                Department.objects.filter(pk__in=affected).refresh_employee_counts()
+        if set(fields) & set(EMPLOYEE_SEARCH_FIELDS):
+            self._invalidate_search_index()
+        return rows
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        if "name" in kwargs:
+            mark_stale(MONTHLY_ATTENDANCE_SNAPSHOT)
+        if "department" not in kwargs and "department_id" not in kwargs:
+            rows = super().update(**kwargs)
+        else:
+            with transaction.atomic(using=self.db):
+                affected = self._department_ids()
+                new_department = kwargs.get("department", kwargs.get("department_id"))
+                if hasattr(new_department, "resolve_expression"):
+                    # Per row values (e.g. Case/When): the new departments are read back after the UPDATE
+                    pks = list(self.values_list("pk", flat=True))
+                    rows = super().update(**kwargs)
+                    affected.update(Employee._base_manager.using(self.db).filter(pk__in=pks)
+                                    .values_list("department_id", flat=True).distinct())
+                else:
+                    affected.add(getattr(new_department, "pk", new_department))
+                    rows = super().update(**kwargs)
+                Department.objects.filter(pk__in=affected).refresh_employee_counts()
+        if set(kwargs) & set(EMPLOYEE_SEARCH_FIELDS):
+            self._invalidate_search_index()
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            affected = self._department_ids()
+            result = super().delete()
+            Department.objects.filter(pk__in=affected).refresh_employee_counts()
+        self._invalidate_search_index()
+        mark_stale(MONTHLY_ATTENDANCE_SNAPSHOT)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class Employee(GenerationModel):
     id = models.BigAutoField(primary_key=True)
     name = models.CharField(max_length=120)
     email = models.EmailField(unique=True)
@@ -26,6 +199,9 @@ class Employee(models.Model):
         on_delete=models.PROTECT,
         related_name="employees",
     )
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+    objects = EmployeeQuerySet.as_manager()
 
     class Meta:
         # ordering = ["name"]
@@ -36,3 +212,42 @@ class Employee(models.Model):
     def __str__(self) -> str:
         return f"id: {self.id}, name: {self.name}, department: ({self.department.name})"
 
+    # -------------------- department headcount maintenance --------------------
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _stored_department_id(self):
+        if self._state.adding:
+            return None
+        loaded = getattr(self, "_loaded_values", {}).get("department_id", models.DEFERRED)
+        if loaded is not models.DEFERRED:
+            return loaded
+        return Employee._base_manager.filter(pk=self.pk).values_list("department_id", flat=True).first()
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            previous = self._stored_department_id()
+            super().save(*args, **kwargs)
+            if previous != self.department_id:
+                if previous is not None:
+                    Department.objects.filter(pk=previous).update(employee_count=F("employee_count") - 1)
+                Department.objects.filter(pk=self.department_id).update(employee_count=F("employee_count") + 1)
+        self._loaded_values = {"department_id": self.department_id}
+        # After commit, as invalidate_department_chart(): a rolled back save must not reach the index
+        pk, values = self.pk, [getattr(self, f) for f in EMPLOYEE_SEARCH_FIELDS]
+        transaction.on_commit(lambda: employee_search_index.upsert(pk, values))
+        mark_stale(MONTHLY_ATTENDANCE_SNAPSHOT, [self.pk])
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk  # delete() sets it to None
+        with transaction.atomic(using=kwargs.get("using")):
+            previous = self._stored_department_id()
+            result = super().delete(*args, **kwargs)
+            if previous is not None:
+                Department.objects.filter(pk=previous).update(employee_count=F("employee_count") - 1)
+        transaction.on_commit(lambda: employee_search_index.remove(pk))
+        mark_stale(MONTHLY_ATTENDANCE_SNAPSHOT, [pk])
+        return result
@@ -1,15 +1,16 @@
 from rest_framework import serializers
+from common.serialization import BatchPrimaryKeyRelatedField, BatchedListSerializer
 from structures.models import Department, Employee
 
 class DepartmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Department
-        fields = '__all__'
+        exclude = ["updated_at"]  # exposed as the ETag/Last-Modified headers
 
 
 class EmployeeSerializer(serializers.ModelSerializer):
     # Use PK for write operations; swap to a nested serializer if you want read-nested (see below).
-    department = serializers.PrimaryKeyRelatedField(queryset=Department.objects.all())
+    department = BatchPrimaryKeyRelatedField(queryset=Department.objects.all())
 
     class Meta:
         model = Employee
@@ -22,3 +23,4 @@ class EmployeeSerializer(serializers.ModelSerializer):
             "date_of_joining",
             "department",
         ]
+        list_serializer_class = BatchedListSerializer  # many=True: one IN query per relation/unique check
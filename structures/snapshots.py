@@ -0,0 +1,127 @@
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+from django.template.loader import render_to_string
+
+from common.snapshots import snapshot_manifest, snapshot_root, write_manifest, write_snapshot
+from operations.models import AttendanceMonthlySummary
+from structures.models import (
+    DEPARTMENT_CHART_SNAPSHOT,
+    MONTHLY_ATTENDANCE_SNAPSHOT,
+    Department,
+    Employee,
+)
+
+# Report snapshots (common/snapshots.py) of the two HTML reports, built by manage.py build_report_snapshots:
+#   employees-per-department       one key, "all"
+#   employee-monthly-attendance    one key per employee id
+# The employees are split into chunks built in parallel worker processes: per chunk one query of the
+# employees, one of their monthly rollups, then one template render per employee.
+
+SNAPSHOT_CHUNK_SIZE = 500  # employees per worker task
+DEPARTMENT_CHART_TEMPLATE = "reports/employees_per_dept_chart.html"
+MONTHLY_ATTENDANCE_TEMPLATE = "reports/employee_monthly_attendance.html"
+
+
+def department_chart_payload():
+    """Chart data of the employees per department report, from the denormalized Department.employee_count."""
+    labels = []
+    data = []
+    for name, emp_count in Department.objects.order_by("name").values_list("name", "employee_count"):
+        labels.append(name)
+        data.append(emp_count)
+    return {"labels": labels, "data": data}
+
+
+def monthly_attendance_context(employee, rows):
+    labels = []
+    present = []
+    absent = []
+    late = []
+    for row in rows:
+        labels.append(row["month"].strftime("%b %Y"))
+        present.append(row["present"])
+        absent.append(row["absent"])
+        late.append(row["late"])
+
+    return {
+        "employee": employee,
+        "labels": labels,
+        "present": present,
+        "absent": absent,
+        "late": late,
+    }
+
+
+def _build_department_chart(root, keys):
+    payload = department_chart_payload()
+    html = render_to_string(DEPARTMENT_CHART_TEMPLATE, payload)
+    return {"all": write_snapshot(root, DEPARTMENT_CHART_SNAPSHOT, "all", html, payload)}
+
+
+def _build_monthly_attendance(root, employee_ids):
+    rows = defaultdict(list)
+    for row in AttendanceMonthlySummary.objects.filter(employee_id__in=employee_ids).values(
+            "employee_id", "month", "present", "absent", "late").order_by("employee_id", "month"):
+        rows[row["employee_id"]].append(row)
+
+    items = {}
+    for pk, name in Employee.objects.filter(pk__in=employee_ids).values_list("id", "name"):
+        context = monthly_attendance_context({"id": pk, "name": name}, rows.pop(pk, ()))
+        html = render_to_string(MONTHLY_ATTENDANCE_TEMPLATE, context)
+        items[str(pk)] = write_snapshot(root, MONTHLY_ATTENDANCE_SNAPSHOT, pk, html, context)
+    return items
+
+
+# report: (keys to build, builder(root, chunk of keys) -> {key: manifest entry})
+REPORT_BUILDERS = {
+    DEPARTMENT_CHART_SNAPSHOT: (lambda: ["all"], _build_department_chart),
+    MONTHLY_ATTENDANCE_SNAPSHOT: (
+        lambda: list(Employee.objects.order_by("id").values_list("id", flat=True)),
+        _build_monthly_attendance,
+    ),
+}
+
+
+def _build_chunk(report, root, keys):
+    return report, REPORT_BUILDERS[report][1](root, keys)
+
+
+def build_report_snapshots(reports=None, workers=1, chunk_size=SNAPSHOT_CHUNK_SIZE):
+    """
+    Build the snapshots of the given reports (default: all) and publish them in a new manifest; the other
+    reports keep their current snapshots. workers > 1 builds the chunks in that many processes.
+    Returns {report: number of snapshots}.
+    """
+    reports = reports or list(REPORT_BUILDERS)
+    root = str(snapshot_root())
+    # Before any read, so a write committed while building makes the snapshots stale (common.snapshots)
+    built_at = time.time()
+
+    tasks = []
+    for report in reports:
+        keys = REPORT_BUILDERS[report][0]()
+        tasks += [(report, root, keys[i:i + chunk_size]) for i in range(0, len(keys), chunk_size)]
+
+    items = {report: {} for report in reports}
+    if workers > 1 and len(tasks) > 1:
+        connections.close_all()  # forked workers must open their own connections, not share these
+        with ProcessPoolExecutor(min(workers, len(tasks)), initializer=django.setup) as pool:
+            results = pool.map(_build_chunk, *zip(*tasks))
+            for report, built in results:
+                items[report].update(built)
+    else:
+        for task in tasks:
+            report, built = _build_chunk(*task)
+            items[report].update(built)
+
+    manifest = snapshot_manifest.load()
+    manifest = {"reports": {
+        **{report: built for report, built in manifest["reports"].items() if report in REPORT_BUILDERS},
+        **{report: {"built_at": built_at, "items": items[report]} for report in reports},
+    }}
+    write_manifest(root, manifest)
+    return {report: len(items[report]) for report in reports}
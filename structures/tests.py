@@ -1,3 +1,872 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common.authentication import user_cache
+from common.conditional import claim_version
+from common.instrumentation import collect_queries, query_budget
+from common.response_cache import response_cache, response_cache_metrics
+from common.serialization import row_encoder
+from structures.models import Department, Employee
+from structures.serializers import DepartmentSerializer, EmployeeSerializer
+
+
+class StructuresQueryBudgetTests(TestCase):
+    """List and report views must run a fixed number of queries whatever the page size (no N+1)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        departments = Department.objects.bulk_create([Department(name=f"Dept {i}") for i in range(3)])
+        Employee.objects.bulk_create([
+            Employee(
+                name=f"Employee {i}",
+                email=f"employee{i}@example.com",
+                date_of_joining=date(2024, 1, 1 + i % 28),
+                department=departments[i % 3],
+            )
+            for i in range(40)
+        ])
+
+    def setUp(self):
+        response_cache().clear()  # generations survive the rollback of the previous test
+
+    def test_list_views_query_budget(self):
+        for url in [reverse("department-list-and-create"), reverse("employee-list-and-create"),
+                    reverse("employees-query-filters")]:
+            for page_size in (5, 40):
+                with self.subTest(url=url, page_size=page_size), query_budget(2):  # COUNT + page
+                    response = self.client.get(url, {"page_size": page_size})
+                    self.assertEqual(response.status_code, 200)
+
+    def test_department_chart_is_served_from_cache(self):
+        url = reverse("employees_per_department_pie")
+        cache.clear()  # on_commit invalidation never fires inside TestCase
+        self.client.get(url)
+        with query_budget(0):
+            response = self.client.get(url)
+        self.assertEqual(sum(response.context["data"]), 40)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("department-list-and-create"))
+        self.assertIn('db;dur=', response["Server-Timing"])
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+
+class DepartmentHeadcountTests(TestCase):
+    """Department.employee_count follows every employee write path."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sales, cls.support = Department.objects.bulk_create([Department(name="Sales"), Department(name="Support")])
+        Employee.objects.bulk_create([
+            Employee(name=f"E{i}", email=f"e{i}@example.com", date_of_joining=date(2024, 1, 1),
+                     department=cls.sales if i < 3 else cls.support)
+            for i in range(5)
+        ])
+
+    def counts(self):
+        return list(Department.objects.order_by("name").values_list("employee_count", flat=True))
+
+    def assertCounts(self, sales, support):
+        self.assertEqual(self.counts(), [sales, support])
+        call_command("rebuild_department_headcount", stdout=io.StringIO())
+        self.assertEqual(self.counts(), [sales, support])  # what a recount from scratch gives
+
+    def test_save_move_and_delete(self):
+        self.assertCounts(3, 2)
+        employee = Employee.objects.create(name="New", email="new@example.com", date_of_joining=date(2024, 1, 1),
+                                           department=self.sales)
+        self.assertCounts(4, 2)
+        employee.name = "Renamed"
+        employee.save()
+        self.assertCounts(4, 2)
+        employee.department = self.support
+        employee.save()
+        self.assertCounts(3, 3)
+        Employee.objects.get(pk=employee.pk).delete()
+        self.assertCounts(3, 2)
+
+    def test_queryset_update_and_delete(self):
+        Employee.objects.filter(name__in=["E0", "E1"]).update(department=self.support)
+        self.assertCounts(1, 4)
+        Employee.objects.filter(department=self.support).update(department_id=self.sales.pk)
+        self.assertCounts(5, 0)
+        Employee.objects.filter(name="E4").delete()
+        self.assertCounts(4, 0)
+
+    def test_rebuild_command_repairs_counts(self):
+        Department.objects.update(employee_count=0)
+        call_command("rebuild_department_headcount", stdout=io.StringIO())
+        self.assertEqual(self.counts(), [3, 2])
+
+
+class RowEncoderParityTests(TestCase):
+    """The list fast path must render byte-identical JSON to the serializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        engineering = Department.objects.create(name="Engineering")
+        research = Department.objects.create(name="Recherche & Développement")
+        Employee.objects.create(name="Zoë Ñúñez", email="zoe@example.com", phone_number="+49 30 1234",
+                                address="Straße 1, Berlin", date_of_joining=date(2020, 2, 29), department=research)
+        Employee.objects.create(name="Blank Fields", email="blank@example.com", date_of_joining=date(1999, 12, 31),
+                                department=engineering)
+        Employee.objects.create(name='Quote "O\'Brien"', email="quote@example.com", address="Line\nbreak",
+                                date_of_joining=date(2024, 1, 1), department=engineering)
+
+    def setUp(self):
+        response_cache().clear()  # generations survive the rollback of the previous test
+
+    def assert_parity(self, serializer_class, queryset):
+        encoder = row_encoder(serializer_class)
+        fast = JSONRenderer().render(encoder.encode(encoder.values(queryset)))
+        slow = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        self.assertEqual(fast, slow)
+
+    def test_department_serializer_parity(self):
+        self.assert_parity(DepartmentSerializer, Department.objects.order_by("id"))
+
+    def test_employee_serializer_parity(self):
+        self.assert_parity(EmployeeSerializer, Employee.objects.order_by("id"))
+
+    def test_list_views_match_serializer_output(self):
+        response = self.client.get(reverse("employees-query-filters"))
+        ids = [row["id"] for row in response.json()["results"]]
+        employees = sorted(Employee.objects.filter(pk__in=ids), key=lambda e: ids.index(e.pk))
+        self.assertEqual(response.json()["results"], EmployeeSerializer(employees, many=True).data)
+
+
+class EmployeeExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.sales, cls.support = Department.objects.bulk_create([Department(name="Sales"), Department(name="Support")])
+        cls.ada, cls.bob, cls.cy = Employee.objects.bulk_create([
+            Employee(name="Ada", email="ada@example.com", phone_number="555-1", address="1 Main St, Springfield",
+                     date_of_joining=date(2024, 1, 10), department=cls.sales),
+            Employee(name="Bob", email="bob@example.com", date_of_joining=date(2024, 2, 10), department=cls.sales),
+            Employee(name="Cy", email="cy@example.com", date_of_joining=date(2024, 3, 10), department=cls.support),
+        ])
+
+    def setUp(self):
+        response_cache().clear()
+
+    def export(self, export_format, **params):
+        response = self.client.get(reverse("employees-query-filters"), {"export": export_format, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode("utf-8")
+
+    def test_csv(self):
+        response, body = self.export("csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="employees.csv"')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ["id", "name", "email", "phone_number", "address", "date_of_joining",
+                                   "department", "department_name"])
+        self.assertEqual(rows[1], [str(self.ada.pk), "Ada", "ada@example.com", "555-1", "1 Main St, Springfield",
+                                   "2024-01-10", str(self.sales.pk), "Sales"])
+        self.assertEqual([row[1] for row in rows[1:]], ["Ada", "Bob", "Cy"])
+
+    def test_ndjson(self):
+        response, body = self.export("ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(rows[2], {"id": self.cy.pk, "name": "Cy", "email": "cy@example.com", "phone_number": "",
+                                   "address": "", "date_of_joining": "2024-03-10", "department": self.support.pk,
+                                   "department_name": "Support"})
+        self.assertEqual(len(rows), 3)
+
+    def test_filters_apply_to_the_export(self):
+        _, body = self.export("ndjson", department=self.sales.pk, joined_from="2024-02-01")
+        self.assertEqual([json.loads(line)["name"] for line in body.splitlines()], ["Bob"])
+        _, body = self.export("csv", joined_on="2024-03-10")
+        self.assertEqual([row[1] for row in csv.reader(io.StringIO(body))][1:], ["Cy"])
+        response = self.client.get(reverse("employees-query-filters"), {"export": "csv", "joined_to": "bad"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_export_format(self):
+        response = self.client.get(reverse("employees-query-filters"), {"export": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_exports_bypass_the_response_cache(self):
+        for _ in range(2):
+            response, _ = self.export("csv")
+            self.assertNotIn("X-Cache", response)
+        # A write that does not go through the ORM bumps no generation, yet the next export sees it
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {Employee._meta.db_table} SET name = %s WHERE id = %s", ["Ada L.", self.ada.pk])
+        _, body = self.export("csv")
+        self.assertIn("Ada L.", body)
+
+
+class ConditionalRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Engineering")
+        cls.employee = Employee.objects.create(name="Ada", email="ada@example.com", date_of_joining=date(2024, 1, 1),
+                                               department=cls.department)
+
+    def setUp(self):
+        response_cache().clear()  # generations survive the rollback of the previous test
+
+    def test_detail_not_modified_with_one_query(self):
+        url = reverse("employee-details-and-modifications", args=[self.employee.pk])
+        response = self.client.get(url)
+        self.assertIn("Last-Modified", response)
+        with query_budget(1):
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        self.client.patch(url, json.dumps({"name": "Ada L."}), content_type="application/json")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_stale_if_match_is_rejected(self):
+        url = reverse("employee-details-and-modifications", args=[self.employee.pk])
+        etag = self.client.get(url)["ETag"]
+        fresh = self.client.patch(url, json.dumps({"name": "First"}), content_type="application/json", HTTP_IF_MATCH=etag)
+        self.assertEqual(fresh.status_code, 200)
+        stale = self.client.patch(url, json.dumps({"name": "Second"}), content_type="application/json", HTTP_IF_MATCH=etag)
+        self.assertEqual(stale.status_code, 412)
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).name, "First")
+
+    def test_unconditional_detail_loads_the_row_once(self):
+        url = reverse("employee-details-and-modifications", args=[self.employee.pk])
+        with query_budget(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+
+    def test_stale_if_match_delete_is_rejected(self):
+        url = reverse("employee-details-and-modifications", args=[self.employee.pk])
+        etag = self.client.get(url)["ETag"]
+        self.client.patch(url, json.dumps({"name": "Changed"}), content_type="application/json")
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertTrue(Employee.objects.filter(pk=self.employee.pk).exists())
+
+    def test_if_match_write_loses_to_a_concurrent_write(self):
+        loaded = Employee.objects.get(pk=self.employee.pk)
+        conditional = RequestFactory().patch("/", HTTP_IF_MATCH='"any"')
+        # Committed after the view checked If-Match against the loaded row, before its write
+        Employee.objects.filter(pk=loaded.pk).update(name="Concurrent")
+        self.assertFalse(claim_version(conditional, loaded))
+        self.assertTrue(claim_version(RequestFactory().patch("/"), loaded))
+        self.assertTrue(claim_version(conditional, Employee.objects.get(pk=loaded.pk)))
+
+    def test_list_etag_changes_on_create_and_delete(self):
+        url = reverse("employee-list-and-create")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        other = Employee.objects.create(name="Bob", email="bob@example.com", date_of_joining=date(2024, 1, 1),
+                                        department=self.department)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = self.client.get(url)["ETag"]
+        other.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class BatchedValidationTests(TestCase):
+    def test_employee_list_create_checks_emails_and_departments_in_batch(self):
+        department = Department.objects.create(name="Engineering")
+        Employee.objects.create(name="Taken", email="taken@example.com", date_of_joining=date(2024, 1, 1),
+                                department=department)
+        rows = [{"name": f"E{i}", "email": f"e{i}@example.com", "date_of_joining": "2024-01-01",
+                 "department": department.pk} for i in range(30)]
+        with query_budget(8):
+            response = self.client.post(reverse("employee-list-and-create"), json.dumps(rows),
+                                        content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Department.objects.get(pk=department.pk).employee_count, 31)
+
+        rows = [{"name": "Dup", "email": "taken@example.com", "date_of_joining": "2024-01-01",
+                 "department": department.pk}]
+        response = self.client.post(reverse("employee-list-and-create"), json.dumps(rows),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.json()[0])
+
+
+class AsyncReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from operations.models import Attendance, Performance
+
+        cls.department = Department.objects.create(name="Engineering")
+        Department.objects.create(name="Empty")
+        cls.employee = Employee.objects.create(name="Alice", email="alice@example.com",
+                                               date_of_joining=date(2024, 3, 10), department=cls.department)
+        Attendance.objects.bulk_create([
+            Attendance(employee=cls.employee, date=date(2024, 3, 11), status="P"),
+            Attendance(employee=cls.employee, date=date(2024, 3, 12), status="L"),
+        ])
+        Performance.objects.create(employee=cls.employee, rating=4, review_date=date(2024, 3, 1))
+
+    def test_async_reports_match_sync_ones(self):
+        cache.clear()
+        for sync_name, async_name, args in [
+            ("employees_per_department_pie", "employees_per_department_pie_async", []),
+            ("employee_monthly_attendance", "employee_monthly_attendance_async", [self.employee.pk]),
+        ]:
+            with self.subTest(async_name):
+                expected = self.client.get(reverse(sync_name, args=args))
+                response = self.client.get(reverse(async_name, args=args))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+
+    async def test_async_views_are_instrumented_without_a_thread(self):
+        with self.assertLogs("ems.requests", "DEBUG") as logs:
+            response = await self.async_client.get(reverse("reports-dashboard"), {"date": "2024-03-12"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="6 queries"', response["Server-Timing"])
+        self.assertEqual(json.loads(logs.records[0].getMessage())["view"], "reports-dashboard")
+
+    def test_dashboard(self):
+        with query_budget(6):  # one query per aggregate
+            response = self.client.get(reverse("reports-dashboard"), {"date": "2024-03-12"})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["departments"], body["employees"]), (2, 1))
+        self.assertEqual(body["top_departments"][0]["name"], "Engineering")
+        self.assertEqual(body["new_hires"]["count"], 1)
+        self.assertEqual(body["attendance_on_date"], {"Present": 0, "Absent": 0, "Late": 1})
+        self.assertEqual(body["attendance_month"], {"present": 1, "absent": 0, "late": 1})
+        self.assertEqual(body["performance"]["average_rating"], 4)
+        earlier = self.client.get(reverse("reports-dashboard"), {"date": "2024-03-01"}).json()
+        self.assertEqual(earlier["attendance_month"], body["attendance_month"])  # the whole month
+        for bad in ("bad", "2025-13-01"):
+            self.assertEqual(self.client.get(reverse("reports-dashboard"), {"date": bad}).status_code, 400)
+
+
+class EmployeeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Engineering")
+        cls.people = {
+            name: Employee.objects.create(name=name, email=email, phone_number=phone,
+                                          date_of_joining=date(2024, 1, 1), department=department)
+            for name, email, phone in [
+                ("Jon Snow", "jon@example.com", "555-0100"),
+                ("Jonathan Byers", "jbyers@example.com", "555-0101"),
+                ("Ann Jones", "ann.jones@example.com", "555-0102"),
+                ("Maria Lopez", "mlopez@example.com", "777-1234"),
+            ]
+        }
+
+    def setUp(self):
+        from structures.models import employee_search_index
+
+        employee_search_index.invalidate()  # built from this test's data on the first search
+
+    def search(self, q, **params):
+        return self.client.get(reverse("employee-search"), {"q": q, **params})
+
+    def test_partial_match_ranked_by_relevance(self):
+        response = self.search("JON")
+        self.assertEqual(response.status_code, 200)
+        names = [row["name"] for row in response.json()["results"]]
+        # word start before inside a word, shorter values first
+        self.assertEqual(names, ["Jon Snow", "Jonathan Byers", "Ann Jones"])
+        self.assertEqual(response.json()["count"], 3)
+
+    def test_email_and_phone(self):
+        self.assertEqual([r["name"] for r in self.search("mlopez@").json()["results"]], ["Maria Lopez"])
+        self.assertEqual([r["name"] for r in self.search("7-12").json()["results"]], ["Maria Lopez"])
+        self.assertEqual(self.search("zzz").json()["results"], [])
+
+    def test_index_follows_writes(self):
+        from structures.models import employee_search_index
+
+        self.search("jon")  # build
+        with self.captureOnCommitCallbacks(execute=True):
+            self.people["Maria Lopez"].name = "Maria Jonsdottir"
+            self.people["Maria Lopez"].save()
+            self.people["Jon Snow"].delete()
+        names = [row["name"] for row in self.search("jon").json()["results"]]
+        self.assertEqual(names, ["Jonathan Byers", "Ann Jones", "Maria Jonsdottir"])
+        built = employee_search_index.built  # never built on PostgreSQL
+        with self.captureOnCommitCallbacks() as callbacks:
+            Employee.objects.filter(name="Ann Jones").update(name="Ann Smith")
+        self.assertEqual(employee_search_index.built, built)  # dropped after the commit, not before the UPDATE
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.search("ann j").json()["count"], 0)
+
+    def test_rolled_back_writes_do_not_reach_the_index(self):
+        self.search("jon")  # build
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                self.people["Maria Lopez"].name = "Maria Jonsdottir"
+                self.people["Maria Lopez"].save()
+                self.people["Jon Snow"].delete()
+                Employee.objects.create(name="Dup", email="ann.jones@example.com", date_of_joining=date(2024, 1, 1),
+                                        department=self.people["Jon Snow"].department)
+        names = [row["name"] for row in self.search("jon").json()["results"]]
+        self.assertEqual(names, ["Jon Snow", "Jonathan Byers", "Ann Jones"])
+
+    def test_pagination_and_validation(self):
+        page = self.search("example.com", page_size=2, page=2).json()
+        self.assertEqual((page["count"], len(page["results"])), (4, 2))
+        with query_budget(1):  # the page's rows; no COUNT, no scan
+            self.search("example.com", page_size=2)
+        self.assertEqual(self.search("jo").status_code, 400)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("admin", password="old-password", is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.url = reverse("request-metrics")  # admin only, runs no query of its own
+
+    def get(self, token):
+        return self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_hot_user_costs_no_query(self):
+        token = AccessToken.for_user(self.user)
+        with collect_queries() as first:
+            self.assertEqual(self.get(token).status_code, 200)
+        self.assertEqual(first.count, 1)
+        with query_budget(0):
+            self.assertEqual(self.get(token).status_code, 200)
+
+    def test_deactivation_and_deletion_revoke_access(self):
+        token = AccessToken.for_user(self.user)
+        self.assertEqual(self.get(token).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.get(token).status_code, 401)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = True
+            self.user.save()
+        self.assertEqual(self.get(token).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.get(token).status_code, 401)
+
+    def test_other_processes_drop_the_user_through_the_shared_version(self):
+        token = AccessToken.for_user(self.user)
+        self.assertEqual(self.get(token).status_code, 200)
+        cache.set(user_cache.version_key(self.user.pk), "written elsewhere")
+        with collect_queries() as stats:
+            self.assertEqual(self.get(token).status_code, 200)
+        self.assertEqual(stats.count, 1)
+
+    def test_password_change_drops_the_cached_user(self):
+        # With SIMPLE_JWT["CHECK_REVOKE_TOKEN"] the reloaded user then rejects the tokens issued before
+        token = AccessToken.for_user(self.user)
+        self.assertEqual(self.get(token).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("new-password")
+            self.user.save()
+        self.assertIsNone(user_cache.get(str(self.user.pk)))
+        with collect_queries() as stats:
+            self.assertEqual(self.get(token).status_code, 200)
+        self.assertEqual(stats.count, 1)
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Engineering")
+        cls.employee = Employee.objects.create(name="Ada", email="ada@example.com", date_of_joining=date(2024, 1, 1),
+                                               department=cls.department)
+        cls.admin = get_user_model().objects.create_user("admin", password="secret", is_staff=True)
+
+    def setUp(self):
+        response_cache().clear()
+        response_cache_metrics.reset()
+
+    def test_hit_costs_no_query_and_params_are_normalized(self):
+        url = reverse("employee-list-and-create")
+        first = self.client.get(url, {"page_size": 5, "page": 1})
+        self.assertEqual(first["X-Cache"], "miss")
+        with query_budget(0):
+            again = self.client.get(url, {"page": 1, "page_size": 5})
+        self.assertEqual((again["X-Cache"], again.content), ("hit", first.content))
+        self.assertEqual(self.client.get(url, {"page_size": 6})["X-Cache"], "miss")
+        with query_budget(0):
+            self.assertEqual(self.client.get(url, {"page_size": 5, "page": 1}, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+    def test_writes_bump_only_their_models(self):
+        from operations.models import Attendance
+
+        departments, employees = reverse("department-list-and-create"), reverse("employee-list-and-create")
+        self.client.get(departments)
+        self.client.get(employees)
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(employee=self.employee, date=date(2024, 3, 1), status="P")
+        self.assertEqual(self.client.get(departments)["X-Cache"], "hit")
+        self.assertEqual(self.client.get(employees)["X-Cache"], "hit")
+
+        # bulk_create changes the department's employee_count, renames do not touch departments
+        for write, departments_cache in [
+            (lambda: Employee.objects.bulk_create([Employee(name="Bob", email="bob@example.com",
+                                                            date_of_joining=date(2024, 1, 1),
+                                                            department=self.department)]), "miss"),
+            (lambda: Employee.objects.bulk_update([Employee(pk=self.employee.pk, name="Ada L.")], ["name"]), "hit"),
+            (lambda: Employee.objects.filter(pk=self.employee.pk).update(name="Ada Lovelace"), "hit"),
+        ]:
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            response = self.client.get(employees)
+            self.assertEqual(response["X-Cache"], "miss")
+            self.assertEqual(self.client.get(departments)["X-Cache"], departments_cache)
+        self.assertIn("Ada Lovelace", [row["name"] for row in response.json()["results"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Department.objects.create(name="Research")
+        self.assertEqual(self.client.get(departments)["X-Cache"], "miss")
+
+    def test_users_do_not_share_entries(self):
+        url = reverse("department-list-and-create")
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.admin)}"}
+        self.client.get(url)
+        self.assertEqual(self.client.get(url, **auth)["X-Cache"], "miss")
+        self.assertEqual(self.client.get(url, **auth)["X-Cache"], "hit")
+
+        metrics = self.client.get(reverse("response-cache-metrics"), **auth).json()
+        self.assertEqual(metrics["department-list-and-create"], {"hits": 1, "misses": 2, "hit_ratio": 0.3333})
+
+
+class CsvImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.engineering = Department.objects.create(name="Engineering")
+        Employee.objects.create(name="Taken", email="taken@example.com", date_of_joining=date(2024, 1, 1),
+                                department=cls.engineering)
+
+    @staticmethod
+    def employees_csv(rows):
+        lines = ["email,name,date_of_joining,department,phone_number"]
+        lines += [",".join(row) for row in rows]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def post(self, body, **params):
+        url = reverse("employee-import")
+        if params:
+            url += "?" + "&".join(f"{key}={value}" for key, value in params.items())
+        return self.client.post(url, body, content_type="text/csv")
+
+    def test_employees_are_imported_with_a_report_per_line(self):
+        body = self.employees_csv([
+            ("a@example.com", "Ann", "2024-02-01", "Engineering", "555"),
+            ("b@example.com", "Bob", "2024-02-30", "Research", ""),         # line 3: bad date
+            ("not-an-email", "", "2024-02-01", "Research", ""),              # line 4: bad email and name
+            ("taken@example.com", "Tim", "2024-02-01", "Research", ""),      # line 5: taken in the database
+            ("c@example.com", "Cy", "2024-02-01", "Research", ""),
+            ("a@example.com", "Ann again", "2024-02-01", "Sales", ""),       # line 7: taken earlier in the file
+        ])
+        response = self.post(body, batch_size=2)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report["rows"], report["created"], report["error_count"]), (6, 2, 4))
+        self.assertEqual([error["line"] for error in report["errors"]], [3, 4, 5, 7])
+        self.assertEqual(set(report["errors"][1]["errors"]), {"email", "name"})
+        self.assertEqual(report["departments_created"], 2)  # Research, Sales
+        self.assertEqual(Employee.objects.get(email="c@example.com").department.name, "Research")
+        self.assertEqual(Department.objects.get(pk=self.engineering.pk).employee_count, 2)
+
+    def test_dry_run_writes_nothing(self):
+        body = self.employees_csv([("a@example.com", "Ann", "2024-02-01", "Research", ""),
+                                   ("a@example.com", "Ann", "2024-02-01", "Research", "")])
+        report = self.post(body, dry_run="true", batch_size=1).json()
+        self.assertEqual((report["created"], report["error_count"], report["departments_created"]), (1, 1, 1))
+        self.assertFalse(Department.objects.filter(name="Research").exists())
+        self.assertFalse(Employee.objects.filter(email="a@example.com").exists())
+
+    def test_queries_per_chunk_do_not_grow_with_rows(self):
+        def queries(rows):
+            body = self.employees_csv([(f"{rows}-{i}@example.com", f"E{i}", "2024-02-01", "Engineering", "")
+                                       for i in range(rows)])
+            with collect_queries() as stats:
+                self.assertEqual(self.post(body).json()["created"], rows)
+            return stats.count
+
+        self.assertEqual(queries(5), queries(100))  # below the parameter limit of SQLite INSERTs
+
+    def test_departments_upload_and_bad_files(self):
+        upload = SimpleUploadedFile("departments.csv", "\ufeffname\nResearch\nEngineering\n\nResearch\n".encode())
+        report = self.client.post(reverse("department-import"), {"file": upload}).json()
+        self.assertEqual((report["created"], report["error_count"]), (1, 2))
+        self.assertEqual(self.post(b"name,email\nAnn,a@example.com\n").status_code, 400)  # missing columns
+        self.assertEqual(self.post(b"", batch_size=0).status_code, 400)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile(suffix=".csv") as f:
+            f.write(self.employees_csv([("a@example.com", "Ann", "2024-02-01", "Research", ""),
+                                        ("taken@example.com", "Tim", "2024-02-01", "Research", "")]))
+            f.flush()
+            out, err = io.StringIO(), io.StringIO()
+            call_command("import_csv", "employees", f.name, stdout=out, stderr=err)
+        self.assertIn("Created 1 of 2 employees", out.getvalue())
+        self.assertIn("line 3:", err.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("import_csv", "employees", "/nonexistent.csv", stdout=io.StringIO())
+
+
+class EmployeeBulkUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.sales, cls.support, cls.research = Department.objects.bulk_create(
+            [Department(name="Sales"), Department(name="Support"), Department(name="Research")]
+        )
+        Employee.objects.bulk_create([
+            Employee(name=f"E{i}", email=f"e{i}@example.com", date_of_joining=date(2024, 1, 1 + i % 28),
+                     department=cls.sales if i < 20 else cls.support)
+            for i in range(30)
+        ])
+        cls.ids = list(Employee.objects.order_by("id").values_list("id", flat=True))
+
+    def patch(self, body):
+        return self.client.patch(reverse("employee-bulk-update"), json.dumps(body), content_type="application/json")
+
+    def headcounts(self):
+        return list(Department.objects.order_by("name").values_list("name", "employee_count"))
+
+    def test_per_employee_updates_run_a_constant_number_of_queries(self):
+        def moved(ids):
+            with collect_queries() as stats:
+                response = self.patch([{"id": pk, "fields": {"department": self.research.pk}} for pk in ids])
+            self.assertEqual(response.json()["updated"], len(ids))
+            return stats.count
+
+        self.assertEqual(moved(self.ids[:2]), moved(self.ids[2:20]))
+        self.assertEqual(self.headcounts(), [("Research", 20), ("Sales", 0), ("Support", 10)])
+
+    def test_mixed_fields_and_missing_ids(self):
+        response = self.patch([
+            {"id": self.ids[0], "fields": {"name": "Renamed", "email": "renamed@example.com"}},
+            {"id": self.ids[25], "fields": {"department": self.sales.pk, "date_of_joining": "2023-05-01"}},
+            {"id": 999999, "fields": {"name": "Nobody"}},
+        ])
+        self.assertEqual(response.json(), {"updated": 2, "missing": [999999]})
+        first, moved = Employee.objects.get(pk=self.ids[0]), Employee.objects.get(pk=self.ids[25])
+        self.assertEqual((first.name, first.email, first.department_id), ("Renamed", "renamed@example.com", self.sales.pk))
+        self.assertEqual((moved.name, moved.date_of_joining, moved.department_id), ("E25", date(2023, 5, 1), self.sales.pk))
+        self.assertEqual(self.headcounts(), [("Research", 0), ("Sales", 21), ("Support", 9)])
+
+    def test_invalid_items_reject_the_whole_request(self):
+        response = self.patch([
+            {"id": self.ids[0], "fields": {"email": "e1@example.com"}},       # another employee's
+            {"id": self.ids[2], "fields": {"department": 999999}},
+            {"id": self.ids[3], "fields": {"date_of_joining": "soon", "id": 5}},
+            {"id": self.ids[3], "fields": {"name": "Twice"}},
+            {"id": self.ids[4], "fields": {"name": "Fine"}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual([sorted(error) for error in errors],
+                         [["email"], ["department"], ["date_of_joining", "id"], ["id"], []])
+        self.assertFalse(Employee.objects.filter(name="Fine").exists())
+
+    def test_unhashable_ids_are_invalid(self):
+        response = self.patch([{"id": [self.ids[0]], "fields": {"name": "x"}}, {"id": {"pk": 1}, "fields": {"name": "y"}}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([sorted(error) for error in response.json()], [["id"], ["id"]])
+
+    def test_filter_moves_a_whole_department(self):
+        with query_budget(6):
+            response = self.patch({"filter": {"department": self.sales.pk, "joined_from": "2024-01-11"},
+                                   "fields": {"department": self.research.pk}})
+        self.assertEqual(response.json(), {"updated": 10, "missing": []})
+        self.assertEqual(self.headcounts(), [("Research", 10), ("Sales", 10), ("Support", 10)])
+
+        for body in [{"filter": {}, "fields": {"name": "x"}},
+                     {"filter": {"department": self.sales.pk}, "fields": {"email": "same@example.com"}},
+                     {"filter": {"joined_on": "2024-13-01"}, "fields": {"name": "x"}},
+                     {"fields": {"name": "x"}}]:
+            with self.subTest(body=body):
+                self.assertEqual(self.patch(body).status_code, 400)
+
+
+class ReportSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from operations.models import Attendance
+
+        department = Department.objects.create(name="Engineering")
+        cls.alice, cls.bob = Employee.objects.bulk_create([
+            Employee(name=name, email=f"{name.lower()}@example.com", date_of_joining=date(2024, 1, 1),
+                     department=department)
+            for name in ("Alice", "Bob")
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(employee=cls.alice, date=date(2024, 3, 11), status="P"),
+            Attendance(employee=cls.alice, date=date(2024, 4, 2), status="L"),
+        ])
+        cls.urls = [reverse("employees_per_department_pie"),
+                    reverse("employee_monthly_attendance", args=[cls.alice.pk]),
+                    reverse("employee_monthly_attendance", args=[cls.bob.pk])]
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        # Stale marks need a cache that every process sees: files, here
+        shared_cache = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                        "LOCATION": os.path.join(self.root, ".cache")}
+        settings_override = self.settings(REPORT_SNAPSHOT_ROOT=self.root, REPORT_SNAPSHOT_MAX_AGE=3600,
+                                          CACHES={**settings.CACHES, "default": shared_cache})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def build(self, *reports):
+        call_command("build_report_snapshots", *reports, "--workers", "1", stdout=io.StringIO())
+
+    def test_snapshots_match_the_live_pages(self):
+        live = [self.client.get(url) for url in self.urls]
+        self.assertTrue(all("X-Snapshot" not in response for response in live))
+        self.build()
+
+        for url, expected in zip(self.urls, live):
+            with self.subTest(url), query_budget(0):
+                response = self.client.get(url)
+                compressed = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+            self.assertIn("X-Snapshot", response)
+            self.assertEqual(response.content, expected.content)
+            self.assertEqual(compressed["Content-Encoding"], "gzip")
+            self.assertEqual(gzip.decompress(compressed.content), expected.content)
+            self.assertNotEqual(compressed["ETag"], response["ETag"])
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=compressed["ETag"],
+                                             HTTP_ACCEPT_ENCODING="gzip").status_code, 304)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=compressed["ETag"]).status_code, 200)
+
+        with open(os.path.join(self.root, "manifest.json")) as file:
+            entry = json.load(file)["reports"]["employee-monthly-attendance"]["items"][str(self.alice.pk)]
+        path = os.path.join(self.root, "employee-monthly-attendance", f"{self.alice.pk}.{entry['json']}.json.gz")
+        with gzip.open(path) as file:
+            self.assertEqual(json.load(file), {"employee": {"id": self.alice.pk, "name": "Alice"},
+                                               "labels": ["Mar 2024", "Apr 2024"], "present": [1, 0],
+                                               "absent": [0, 0], "late": [0, 1]})
+
+    def test_writes_make_only_their_snapshots_stale(self):
+        from operations.models import Attendance
+
+        self.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(employee=self.alice, date=date(2024, 4, 3), status="A")
+        chart, alice, bob = [self.client.get(url) for url in self.urls]
+        self.assertNotIn("X-Snapshot", alice)
+        self.assertIn("X-Snapshot", bob)
+        self.assertIn("X-Snapshot", chart)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Department.objects.create(name="Sales")
+        self.assertNotIn("X-Snapshot", self.client.get(self.urls[0]))
+        self.build()
+        self.assertTrue(all("X-Snapshot" in self.client.get(url) for url in self.urls))
+
+    def test_async_views_serve_the_same_snapshots(self):
+        self.build()
+        for sync_url, async_name, args in [(self.urls[0], "employees_per_department_pie_async", []),
+                                           (self.urls[1], "employee_monthly_attendance_async", [self.alice.pk])]:
+            with self.subTest(async_name):
+                response = self.client.get(reverse(async_name, args=args))
+                self.assertIn("X-Snapshot", response)
+                self.assertEqual(response.content, self.client.get(sync_url).content)
+
+    def test_old_snapshots_are_not_served(self):
+        self.build()
+        with self.settings(REPORT_SNAPSHOT_MAX_AGE=0):
+            self.assertNotIn("X-Snapshot", self.client.get(self.urls[1]))
+
+    def test_no_snapshots_without_a_shared_cache(self):
+        self.build()
+        local = {**settings.CACHES, "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with self.settings(CACHES=local):
+            self.assertTrue(all("X-Snapshot" not in self.client.get(url) for url in self.urls))
+
+    def test_rebuilding_one_report_keeps_the_others(self):
+        self.build()
+        Employee.objects.filter(pk=self.bob.pk).update(name="Robert")
+        self.build("employee-monthly-attendance")
+
+        files = os.listdir(os.path.join(self.root, "employee-monthly-attendance"))
+        self.assertEqual(len(files), 4)  # the previous page and dataset of Bob were deleted
+        self.assertIn("X-Snapshot", self.client.get(self.urls[0]))
+        self.assertIn(b"Robert", self.client.get(self.urls[2]).content)
+        with self.assertRaises(CommandError):
+            self.build("unknown")
+
+
+@skipIf(connection.vendor == "sqlite" and connection.is_in_memory_db(),
+        "the worker processes open the test database again: it must not be in memory")
+class ReportSnapshotWorkerTests(TransactionTestCase):
+    """build_report_snapshots() in worker processes: they see only committed rows, hence TransactionTestCase."""
+
+    def setUp(self):
+        from operations.models import Attendance
+
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = self.settings(REPORT_SNAPSHOT_ROOT=root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        department = Department.objects.create(name="Engineering")
+        employees = Employee.objects.bulk_create([
+            Employee(name=f"E{i}", email=f"e{i}@example.com", date_of_joining=date(2024, 1, 1), department=department)
+            for i in range(5)
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(employee=employee, date=date(2024, 3, 1 + i), status="PAL"[i % 3])
+            for i, employee in enumerate(employees)
+        ])
+
+    def manifest_items(self):
+        with open(os.path.join(settings.REPORT_SNAPSHOT_ROOT, "manifest.json")) as file:
+            return {report: built["items"] for report, built in json.load(file)["reports"].items()}
+
+    def test_worker_processes_build_the_same_snapshots(self):
+        from structures.snapshots import build_report_snapshots
+
+        with mock.patch("structures.snapshots.ProcessPoolExecutor", wraps=ProcessPoolExecutor) as pool:
+            built = build_report_snapshots(workers=2, chunk_size=2)
+        pool.assert_called_once()
+        self.assertEqual(built, {"employees-per-department": 1, "employee-monthly-attendance": 5})
+        in_workers = self.manifest_items()
+
+        build_report_snapshots(workers=1)
+        self.assertEqual(self.manifest_items(), in_workers)  # named by content: the same pages and datasets
+
+
+class GatherQueriesTests(TransactionTestCase):
+    def test_executor_threads_do_not_keep_their_connections(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("in-memory SQLite connections are never closed")
+        from asgiref.sync import async_to_sync
+        from common.concurrency import gather_queries
+
+        used = []
+
+        def query():
+            used.append(connections["default"])  # the executor thread's own wrapper, not the proxy
+            return Department.objects.count()
+
+        with mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=600):
+            self.assertEqual(async_to_sync(gather_queries)(query, query), [0, 0])
+        self.assertEqual(len(used), 2)
+        self.assertTrue(all(conn.connection is None for conn in used))
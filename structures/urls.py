@@ -8,11 +8,24 @@ urlpatterns = [
     # http://127.0.0.1:8000/api-structures/departments/?page=1&page_size=2 
     path("departments/", views.department_list_and_create, name="department-list-and-create"),
     path("departments/<int:pk>/", views.department_details_and_modifications, name="department-details-and-modifications"),
+    # curl -F file=@departments.csv "http://127.0.0.1:8000/api-structures/departments/import/?dry_run=true"
+    path("departments/import/", views.department_import, name="department-import"),
     path("reports/employees-per-department/", views.employees_per_department_chart, name="employees_per_department_pie"),
 
     # Employee
     path("employees/", views.employee_list_and_create, name="employee-list-and-create"),
     path("employees/<int:pk>/", views.employee_details_and_modifications, name="employee-details-and-modifications"),
+    # PATCH [{"id": 1, "fields": {"department": 7}}, ...]  or  {"filter": {"department": 3}, "fields": {"department": 7}}
+    path("employees/bulk/", views.employee_bulk_update, name="employee-bulk-update"),
     path("employees/filters/", views.employees_query_filters, name="employees-query-filters"),
+    # curl -H "Content-Type: text/csv" --data-binary @employees.csv http://127.0.0.1:8000/api-structures/employees/import/
+    path("employees/import/", views.employee_import, name="employee-import"),
+    # http://127.0.0.1:8000/api-structures/employees/search/?q=smith&page_size=20
+    path("employees/search/", views.employee_search, name="employee-search"),
     path("reports/attendance/monthly/<int:employee_id>/", views.employee_monthly_attendance, name="employee_monthly_attendance"),
+
+    # Async reports (serve with an ASGI server, e.g. uvicorn employee_mgmt.asgi:application)
+    path("reports/async/employees-per-department/", views.employees_per_department_chart_async, name="employees_per_department_pie_async"),
+    path("reports/async/attendance/monthly/<int:employee_id>/", views.employee_monthly_attendance_async, name="employee_monthly_attendance_async"),
+    path("reports/dashboard/", views.reports_dashboard, name="reports-dashboard"),
 ]
@@ -1,32 +1,80 @@
+import csv
+import json
+import operator
+from datetime import timedelta
+from functools import reduce
+
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404, render
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny # IsAuthenticated
+from django.utils import timezone
 from django.utils.dateparse import parse_date
-from django.db.models import Count, Q
-from django.db.models.functions import TruncMonth
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Avg, Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import require_GET
 
-from structures.models import Department, Employee
+from structures.models import (
+    Department,
+    Employee,
+    DEPARTMENT_CHART_CACHE_KEY,
+    DEPARTMENT_CHART_CACHE_TIMEOUT,
+    DEPARTMENT_CHART_SNAPSHOT,
+    EMPLOYEE_SEARCH_FIELDS,
+    MONTHLY_ATTENDANCE_SNAPSHOT,
+    employee_search_index,
+)
+from structures.importers import (
+    IMPORT_BATCH_SIZE,
+    CsvImportError,
+    decode_lines,
+    import_departments,
+    import_employees,
+)
 from structures.serializers import DepartmentSerializer, EmployeeSerializer
-from common.helpers import SmallResultsSetPagination
-from operations.models import Attendance
+from structures.snapshots import department_chart_payload, monthly_attendance_context
+from common.conditional import (
+    check_preconditions,
+    claim_version,
+    instance_validators,
+    paginated_response,
+    read_precondition,
+    with_validators,
+)
+from common.concurrency import gather_queries
+from common.response_cache import cached_response
+from common.serialization import row_encoder
+from common.snapshots import snapshot_response
+from common.helpers import Echo, SmallResultsSetPagination
+from common.search import ILikeContains, NgramIndex
+from operations.models import Attendance, AttendanceMonthlySummary, Performance
 
 # -------------------- Department --------------------
 @api_view(["GET", "POST"])
 # @permission_classes([AllowAny]) # Default is restricted set up in settings.py. For explicit restriction, use: @permission_classes([AllowAny])
+@cached_response(Department)  # GET pages, until the next department write
 def department_list_and_create(request):
     """
     Query params:
       - page, page_size: pagination
+      - count: exact (default) | estimate | none
     """
     if request.method == "GET":
         qs = Department.objects.all().order_by("id")  # stable order for pagination
         paginator = SmallResultsSetPagination()
-        page = paginator.paginate_queryset(qs, request)
-        serializer = DepartmentSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        encoder = row_encoder(DepartmentSerializer)
+        page = paginator.paginate_queryset(encoder.values(qs, "updated_at"), request)
+        return paginated_response(request, paginator, encoder, page)  # 304 if the client's ETag still matches
     
     elif request.method == "POST":
         serializer = DepartmentSerializer(data=request.data)
@@ -38,22 +86,36 @@ def department_list_and_create(request):
 
 
 @api_view(["GET", "PUT", "PATCH", "DELETE"])
+@cached_response(Department, validate_last_modified=True)
 def department_details_and_modifications(request, pk: int):
+    not_modified = read_precondition(request, Department, pk)
+    if not_modified is not None:
+        return not_modified
     dept = get_object_or_404(Department, pk=pk)
+    validators = instance_validators(Department, dept.pk, dept.updated_at)
+    precondition = check_preconditions(request, *validators)
+    if precondition is not None:
+        return precondition
 
     if request.method == "GET":
-        return Response(DepartmentSerializer(dept).data)
+        return with_validators(Response(DepartmentSerializer(dept).data), *validators)
 
     elif request.method in ["PUT", "PATCH"]:
         partial = request.method == "PATCH"
         serializer = DepartmentSerializer(dept, data=request.data, partial=partial)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
+            with transaction.atomic():
+                if not claim_version(request, dept):
+                    return Response(status=status.HTTP_412_PRECONDITION_FAILED)
+                serializer.save()
+            return with_validators(Response(serializer.data), *instance_validators(Department, dept.pk, dept.updated_at))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == "DELETE":
-        dept.delete()
+        with transaction.atomic():
+            if not claim_version(request, dept):
+                return Response(status=status.HTTP_412_PRECONDITION_FAILED)
+            dept.delete()
         return Response(
             {"message": "Department has been deleted successfully."},
             status=status.HTTP_200_OK
@@ -65,28 +127,32 @@ def department_details_and_modifications(request, pk: int):
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def employees_per_department_chart(request):
-    qs = Department.objects.annotate(emp_count=Count("employees")).order_by("name")
-    
-    labels = []
-    data = []
-
-    for d in qs:
-        labels.append(d.name)
-        data.append(d.emp_count)
+    # The prebuilt page while it is fresh (manage.py build_report_snapshots), no render at all.
+    snapshot = snapshot_response(request, DEPARTMENT_CHART_SNAPSHOT, "all")
+    if snapshot is not None:
+        return snapshot
+    # Zero queries in steady state: the payload is cached until a headcount/department write invalidates it,
+    # and a rebuild reads the denormalized Department.employee_count instead of a COUNT over employees.
+    payload = cache.get(DEPARTMENT_CHART_CACHE_KEY)
+    if payload is None:
+        payload = department_chart_payload()
+        cache.set(DEPARTMENT_CHART_CACHE_KEY, payload, DEPARTMENT_CHART_CACHE_TIMEOUT)
 
     return render(
         request,
         "reports/employees_per_dept_chart.html",
-        {"labels": labels, "data": data},
+        payload,
     )
 
 # -------------------- Employee --------------------
 @api_view(["GET", "POST"])
+@cached_response(Employee)
 def employee_list_and_create(request):
     """
     Query params:
       - department:   int   (department id)
       - page, page_size: pagination
+      - count: exact (default) | estimate | none
     """
     if request.method == "GET":
         # print(list(Employee.objects.select_related("department").all()))
@@ -98,12 +164,13 @@ def employee_list_and_create(request):
             qs = qs.filter(department_id=dept_id)
 
         paginator = SmallResultsSetPagination()
-        page = paginator.paginate_queryset(qs, request)
-        serializer = EmployeeSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        encoder = row_encoder(EmployeeSerializer)
+        page = paginator.paginate_queryset(encoder.values(qs, "updated_at"), request)
+        return paginated_response(request, paginator, encoder, page)  # 304 if the client's ETag still matches
     
     elif request.method == "POST":
-        serializer = EmployeeSerializer(data=request.data)
+        # A JSON array creates all rows with a constant number of queries (BatchedListSerializer)
+        serializer = EmployeeSerializer(data=request.data, many=isinstance(request.data, list))
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -112,22 +179,36 @@ def employee_list_and_create(request):
 
 
 @api_view(["GET", "PUT", "PATCH", "DELETE"])
+@cached_response(Employee, validate_last_modified=True)
 def employee_details_and_modifications(request, pk: int):
+    not_modified = read_precondition(request, Employee, pk)
+    if not_modified is not None:
+        return not_modified
     emp = get_object_or_404(Employee, pk=pk)
+    validators = instance_validators(Employee, emp.pk, emp.updated_at)
+    precondition = check_preconditions(request, *validators)
+    if precondition is not None:
+        return precondition
 
     if request.method == "GET":
-        return Response(EmployeeSerializer(emp).data)
+        return with_validators(Response(EmployeeSerializer(emp).data), *validators)
     
     elif request.method in ["PUT", "PATCH"]:
         partial = request.method == "PATCH"
         serializer = EmployeeSerializer(emp, data=request.data, partial=partial)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
+            with transaction.atomic():
+                if not claim_version(request, emp):
+                    return Response(status=status.HTTP_412_PRECONDITION_FAILED)
+                serializer.save()
+            return with_validators(Response(serializer.data), *instance_validators(Employee, emp.pk, emp.updated_at))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == "DELETE":
-        emp.delete()
+        with transaction.atomic():
+            if not claim_version(request, emp):
+                return Response(status=status.HTTP_412_PRECONDITION_FAILED)
+            emp.delete()
         return Response(
             {"message": "Employee has been deleted successfully."},
             status=status.HTTP_200_OK
@@ -136,8 +217,196 @@ def employee_details_and_modifications(request, pk: int):
     
     return Response(status=status.HTTP_400_BAD_REQUEST)
 
+# Fields a bulk PATCH may set; department is an id
+EMPLOYEE_BULK_FIELDS = ("name", "email", "phone_number", "address", "date_of_joining", "department")
+EMPLOYEE_BULK_FILTERS = {  # filter key -> lookup, as in employees_query_filters
+    "department": "department_id",
+    "joined_on": "date_of_joining",
+    "joined_from": "date_of_joining__gte",
+    "joined_to": "date_of_joining__lte",
+}
+EMPLOYEE_BULK_MAX_ROWS = 1000
+EMPLOYEE_EMAIL_TAKEN = "employee with this email already exists."  # EmployeeSerializer's message
+
+
+def _clean_employee_fields(fields):
+    """({column: value}, errors) of a bulk update's field set, validated by the Employee model fields."""
+    if not isinstance(fields, dict) or not fields:
+        return {}, {"fields": ["Expected a non-empty object of field values."]}
+    values, errors = {}, {}
+    for name, value in fields.items():
+        if name not in EMPLOYEE_BULK_FIELDS:
+            errors[name] = ["This field cannot be bulk updated."]
+            continue
+        field = Employee._meta.get_field(name)
+        try:
+            if name == "department":
+                values["department_id"] = field.target_field.clean(value, None)  # existence: checked in batch
+            else:
+                values[name] = field.clean(value, None)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+    return values, errors
+
+
+def _unknown_departments(values_list):
+    """The department ids set by values_list that do not exist (one query)."""
+    wanted = {values["department_id"] for values in values_list if "department_id" in values}
+    if not wanted:
+        return set()
+    return wanted - set(Department.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+
+
+@api_view(["PATCH"])
+def employee_bulk_update(request):
+    """
+    Update many employees at once: a constant number of set-based UPDATEs in one transaction, however many rows.
+
+    Body, either:
+      - [{"id": 1, "fields": {"department": 7, "name": "..."}}, ...]   per employee values (up to 1000 ids)
+      - {"filter": {"department": 3}, "fields": {"department": 7}}      the same values for every match
+        filter keys: department, joined_on, joined_from, joined_to (at least one)
+    Fields: name, email (per employee only), phone_number, address, date_of_joining, department (id)
+    Response: {"updated": <rows updated>, "missing": [ids that do not exist]}
+    """
+    if isinstance(request.data, list):
+        return _bulk_update_by_id(request.data)
+    if isinstance(request.data, dict) and "filter" in request.data:
+        return _bulk_update_by_filter(request.data.get("filter"), request.data.get("fields"))
+    return Response({"detail": "Send a list of {id, fields} or an object with 'filter' and 'fields'."},
+                    status=status.HTTP_400_BAD_REQUEST)
+
+
+def _bulk_update_by_id(items):
+    if not 1 <= len(items) <= EMPLOYEE_BULK_MAX_ROWS:
+        return Response({"detail": f"Send 1 to {EMPLOYEE_BULK_MAX_ROWS} updates."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Validation: the field values one by one, then the departments and emails of every item in one query each
+    errors, valid, ids = [], [], set()
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        pk = item.get("id")
+        values, item_errors = _clean_employee_fields(item.get("fields"))
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            item_errors["id"] = ["A valid integer is required."]
+        elif pk in ids:
+            item_errors["id"] = ["Duplicate id."]
+        else:
+            ids.add(pk)
+        errors.append(item_errors)
+        if not item_errors:
+            valid.append((item_errors, pk, values))
+
+    unknown = _unknown_departments([values for _, _, values in valid])
+    emails = [values["email"] for _, _, values in valid if "email" in values]
+    owners = dict(Employee.objects.filter(email__in=emails).values_list("email", "pk")) if emails else {}
+    for item_errors, pk, values in valid:
+        if values.get("department_id") in unknown:
+            item_errors["department"] = [f'Invalid pk "{values["department_id"]}" - object does not exist.']
+        if "email" in values and owners.setdefault(values["email"], pk) != pk:  # another employee's, or set twice
+            item_errors["email"] = [EMPLOYEE_EMAIL_TAKEN]
+    if any(errors):
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+    updates = {pk: values for _, pk, values in valid}
+
+    with transaction.atomic():
+        existing = set(Employee.objects.filter(pk__in=updates).select_for_update().values_list("pk", flat=True))
+        # One UPDATE ... SET column = CASE id WHEN ... END per request, each column defaulting to its current value
+        columns = {}
+        for pk, values in updates.items():
+            if pk in existing:
+                for column, value in values.items():
+                    columns.setdefault(column, []).append(When(pk=pk, then=Value(value)))
+        set_values = {
+            column: Case(*whens, default=F(column), output_field=_bulk_output_field(column))
+            for column, whens in columns.items()
+        }
+        try:
+            with transaction.atomic():
+                updated = Employee.objects.filter(pk__in=existing).update(**set_values) if existing else 0
+        except IntegrityError:  # e.g. two employees swapping their emails
+            return Response({"detail": "The update conflicts with a unique email; update those employees one by one."},
+                            status=status.HTTP_409_CONFLICT)
+    return Response({"updated": updated, "missing": sorted(set(updates) - existing)})
+
+
+def _bulk_output_field(column):
+    field = Employee._meta.get_field("department" if column == "department_id" else column)
+    return field.target_field if field.is_relation else field
+
+
+def _bulk_update_by_filter(filters, fields):
+    errors = {}
+    lookups = {}
+    if not isinstance(filters, dict) or not filters:
+        errors["filter"] = [f"Expected at least one of: {', '.join(EMPLOYEE_BULK_FILTERS)}."]
+    else:
+        for key, value in filters.items():
+            if key not in EMPLOYEE_BULK_FILTERS:
+                errors.setdefault("filter", []).append(f"Unknown filter '{key}'.")
+            elif key == "department":
+                if not isinstance(value, int) or isinstance(value, bool):
+                    errors.setdefault("filter", []).append("'department' must be a department id.")
+                lookups[EMPLOYEE_BULK_FILTERS[key]] = value
+            else:
+                try:
+                    day = parse_date(value) if isinstance(value, str) else None
+                except ValueError:  # well formed but not a date, e.g. month 13
+                    day = None
+                if day is None:
+                    errors.setdefault("filter", []).append(f"Invalid '{key}' (use YYYY-MM-DD).")
+                lookups[EMPLOYEE_BULK_FILTERS[key]] = day
+
+    values, field_errors = _clean_employee_fields(fields)
+    if "email" in values:
+        field_errors["email"] = ["Emails are unique; update them per employee (list body)."]
+    if not field_errors and _unknown_departments([values]):
+        field_errors["department"] = [f'Invalid pk "{values["department_id"]}" - object does not exist.']
+    if field_errors:
+        errors["fields"] = field_errors
+    if errors:
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    # One UPDATE (EmployeeQuerySet.update recounts the departments it moves employees between, same transaction)
+    updated = Employee.objects.filter(**lookups).update(**values)
+    return Response({"updated": updated, "missing": []})
+
+
+EMPLOYEE_EXPORT_FIELDS = ["id", "name", "email", "phone_number", "address", "date_of_joining", "department", "department_name"]
+EXPORT_CHUNK_SIZE = 2000  # rows fetched per server-side cursor round trip
+
+
+def _export_employees(qs, export_format):
+    """Stream the whole queryset as CSV or NDJSON with constant memory (server-side cursor, no pagination/COUNT)."""
+    # department__name comes from the same department join that select_related("department") uses.
+    rows = qs.values_list(
+        "id", "name", "email", "phone_number", "address", "date_of_joining", "department_id", "department__name",
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    if export_format == "csv":
+        writer = csv.writer(Echo())
+
+        def stream():
+            yield writer.writerow(EMPLOYEE_EXPORT_FIELDS)
+            for row in rows:
+                yield writer.writerow(row)
+
+        content_type = "text/csv"
+    else:
+        def stream():
+            for row in rows:
+                yield json.dumps(dict(zip(EMPLOYEE_EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + "\n"
+
+        content_type = "application/x-ndjson"
+
+    response = StreamingHttpResponse(stream(), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="employees.{export_format}"'
+    return response
+
+
 @api_view(["GET"])
 # @permission_classes([AllowAny])
+@cached_response(Employee)  # JSON pages only; exports stream and are never cached
 def employees_query_filters(request):
     """
     Query params:
@@ -146,7 +415,14 @@ def employees_query_filters(request):
       - joined_from:  YYYY-MM-DD (inclusive lower bound)
       - joined_to:    YYYY-MM-DD (inclusive upper bound)
       - page, page_size: pagination
+      - count: exact (default) | estimate | none
+      - export:       csv | ndjson (stream every matching employee instead of one page)
+        ("format" is reserved by DRF for renderer selection, hence "export")
     """
+    export_format = request.query_params.get("export")
+    if export_format and export_format not in ("csv", "ndjson"):
+        return Response({"detail": "Invalid 'export' (use csv or ndjson)."}, status=status.HTTP_400_BAD_REQUEST)
+
     qs = Employee.objects.select_related("department")
 
     # filter by department (id)
@@ -179,10 +455,52 @@ def employees_query_filters(request):
     # indexed ordering
     qs = qs.order_by("department_id", "name", "id")
 
+    if export_format:
+        return _export_employees(qs, export_format)
+
+    paginator = SmallResultsSetPagination()
+    encoder = row_encoder(EmployeeSerializer)
+    page = paginator.paginate_queryset(encoder.values(qs, "updated_at"), request)
+    return paginated_response(request, paginator, encoder, page)  # 304 if the client's ETag still matches
+
+EMPLOYEE_SEARCH_MIN_LENGTH = NgramIndex.min_length  # shorter strings have no trigram to look up
+
+
+@api_view(["GET"])
+def employee_search(request):
+    """
+    Case-insensitive partial match on name, email or phone number, best matches first.
+
+    Query params:
+      - q:            search text (at least 3 characters)
+      - page, page_size: pagination
+      - count: exact (default) | estimate | none
+    """
+    q = request.query_params.get("q", "").strip()
+    if len(q) < EMPLOYEE_SEARCH_MIN_LENGTH:
+        return Response({"detail": f"'q' needs at least {EMPLOYEE_SEARCH_MIN_LENGTH} characters."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
     paginator = SmallResultsSetPagination()
-    page = paginator.paginate_queryset(qs, request)
-    serializer = EmployeeSerializer(page, many=True)
-    return paginator.get_paginated_response(serializer.data)
+    encoder = row_encoder(EmployeeSerializer)
+    qs = Employee.objects.all()
+
+    if connections[qs.db].vendor == "postgresql":
+        # ILIKE '%q%' is served by the pg_trgm GIN indexes (structures.apps); rank by trigram word similarity
+        qs = qs.filter(
+            reduce(operator.or_, (Q(ILikeContains(F(field), q)) for field in EMPLOYEE_SEARCH_FIELDS))
+        ).annotate(
+            rank=Greatest(*(TrigramWordSimilarity(q, field) for field in EMPLOYEE_SEARCH_FIELDS))
+        ).order_by("-rank", "id")
+        page = paginator.paginate_queryset(encoder.values(qs, "updated_at"), request)
+    else:
+        # No trigram index in the database: rank ids with the in-process n-gram index, then load one page
+        ranked = [pk for pk, _ in employee_search_index.search(q)]
+        page_ids = paginator.paginate_queryset(ranked, request)
+        rows = {row["id"]: row for row in encoder.values(qs.filter(pk__in=page_ids), "updated_at")}
+        page = [rows[pk] for pk in page_ids if pk in rows]
+
+    return paginated_response(request, paginator, encoder, page)  # 304 if the client's ETag still matches
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
@@ -190,32 +508,165 @@ def employee_monthly_attendance(request, employee_id: int):
     """
     Bar chart of monthly attendance (Present/Absent/Late) for one employee.
     """
+    snapshot = snapshot_response(request, MONTHLY_ATTENDANCE_SNAPSHOT, employee_id)
+    if snapshot is not None:
+        return snapshot
     employee = get_object_or_404(Employee, pk=employee_id)
 
-    qs = Attendance.objects.filter(employee_id=employee_id).annotate(month=TruncMonth("date")).values("month").annotate(
-            present=Count("id", filter=Q(status="P")),
-            absent=Count("id", filter=Q(status="A")),
-            late=Count("id", filter=Q(status="L")),
+    # Read from the incrementally maintained rollup instead of aggregating the employee's whole attendance history.
+    qs = AttendanceMonthlySummary.objects.filter(employee_id=employee_id).values(
+            "month", "present", "absent", "late",
         ).order_by("month")
 
-    labels = []
-    present = []
-    absent = []
-    late = []
-    for row in qs:
-        labels.append(row["month"].strftime("%b %Y"))
-        present.append(row["present"])
-        absent.append(row["absent"])
-        late.append(row["late"])
-
     return render(
         request,
         "reports/employee_monthly_attendance.html",
-        {
-            "employee": employee,
-            "labels": labels,
-            "present": present,
-            "absent": absent,
-            "late": late,
+        monthly_attendance_context(employee, qs),
+    )
+
+
+# -------------------- CSV import --------------------
+def _csv_import(request, importer):
+    if request.content_type.startswith("text/csv"):
+        source = request._request  # the raw body, read line by line
+    else:
+        source = request.FILES.get("file")  # uploads above FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to disk
+        if source is None:
+            return Response({"detail": "Send the CSV as the 'file' field of a multipart form or as a text/csv body."},
+                            status=status.HTTP_400_BAD_REQUEST)
+    dry_run = request.query_params.get("dry_run", "false").lower() in ("1", "true", "yes")
+    try:
+        batch_size = int(request.query_params.get("batch_size", IMPORT_BATCH_SIZE))
+    except ValueError:
+        batch_size = 0
+    if not 1 <= batch_size <= 10000:
+        return Response({"detail": "'batch_size' must be between 1 and 10000."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        report = importer(decode_lines(source), dry_run=dry_run, batch_size=batch_size)
+    except CsvImportError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report.as_dict(), status=status.HTTP_200_OK)
+
+
+@api_view(["POST"])
+def department_import(request):
+    """
+    Create departments from a CSV file with a "name" column. Existing names are reported and skipped.
+
+    Body: the CSV file, as the "file" field of a multipart form or as a text/csv body.
+    Query params:
+      - dry_run:      true | false (default); validate and report, write nothing
+      - batch_size:   rows written per INSERT (default 1000)
+    """
+    return _csv_import(request, import_departments)
+
+
+@api_view(["POST"])
+def employee_import(request):
+    """
+    Create employees from a CSV file with the columns name, email, date_of_joining, department (a name;
+    missing departments are created) and optionally phone_number, address. Lines with invalid values or
+    an email that is already taken are reported by line number and skipped.
+
+    Body: the CSV file, as the "file" field of a multipart form or as a text/csv body.
+    Query params:
+      - dry_run:      true | false (default); validate and report, write nothing
+      - batch_size:   rows written per INSERT (default 1000)
+    """
+    return _csv_import(request, import_employees)
+
+# -------------------- Async reports (ASGI) --------------------
+# Plain Django async views (DRF's @api_view is sync only). Under an ASGI server they wait on the database
+# without holding a worker thread; under WSGI Django runs them in an event loop per request.
+
+@require_GET
+async def employees_per_department_chart_async(request):
+    """Async version of employees_per_department_chart (same snapshot, cache entry, payload and template)."""
+    snapshot = await sync_to_async(snapshot_response)(request, DEPARTMENT_CHART_SNAPSHOT, "all")
+    if snapshot is not None:
+        return snapshot
+    payload = await cache.aget(DEPARTMENT_CHART_CACHE_KEY)
+    if payload is None:
+        payload = await sync_to_async(department_chart_payload)()
+        await cache.aset(DEPARTMENT_CHART_CACHE_KEY, payload, DEPARTMENT_CHART_CACHE_TIMEOUT)
+
+    return render(request, "reports/employees_per_dept_chart.html", payload)
+
+
+@require_GET
+async def employee_monthly_attendance_async(request, employee_id: int):
+    """Async version of employee_monthly_attendance (same snapshot and template)."""
+    snapshot = await sync_to_async(snapshot_response)(request, MONTHLY_ATTENDANCE_SNAPSHOT, employee_id)
+    if snapshot is not None:
+        return snapshot
+    employee = await aget_object_or_404(Employee, pk=employee_id)
+    rows = [
+        row async for row in AttendanceMonthlySummary.objects.filter(employee_id=employee_id).values(
+            "month", "present", "absent", "late",
+        ).order_by("month")
+    ]
+    return render(request, "reports/employee_monthly_attendance.html", monthly_attendance_context(employee, rows))
+
+
+DASHBOARD_TOP_DEPARTMENTS = 5
+DASHBOARD_NEW_HIRE_DAYS = 30
+DASHBOARD_PERFORMANCE_DAYS = 365
+
+
+@require_GET
+async def reports_dashboard(request):
+    """
+    Headcount, attendance and performance overview in one JSON document.
+    The aggregates are independent, so they run concurrently on separate connections (gather_queries):
+    the response takes as long as the slowest one, not the sum.
+
+    Query params:
+      - date: YYYY-MM-DD (default today), the day of the attendance breakdown and the end of the windows
+
+    attendance_month counts the whole calendar month of that date, days after it included: it is read from
+    the monthly rollup (AttendanceMonthlySummary), one row per employee, not from the attendance rows.
+    """
+    day = timezone.localdate()
+    if request.GET.get("date"):
+        try:
+            day = parse_date(request.GET["date"])
+        except ValueError:  # well formed but not a date, e.g. month 13
+            day = None
+        if not day:
+            return JsonResponse({"detail": "Invalid 'date' (use YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
+    month = day.replace(day=1)
+
+    headcount, top_departments, new_hires, attendance_day, attendance_month, performance = await gather_queries(
+        lambda: Department.objects.aggregate(departments=Count("id"), employees=Sum("employee_count")),
+        lambda: list(
+            Department.objects.order_by("-employee_count", "name")
+            .values("id", "name", "employee_count")[:DASHBOARD_TOP_DEPARTMENTS]
+        ),
+        lambda: Employee.objects.filter(
+            date_of_joining__gt=day - timedelta(days=DASHBOARD_NEW_HIRE_DAYS), date_of_joining__lte=day,
+        ).count(),
+        lambda: dict(Attendance.objects.filter(date=day).values_list("status").annotate(n=Count("id")).order_by()),
+        lambda: AttendanceMonthlySummary.objects.filter(month=month).aggregate(
+            present=Sum("present"), absent=Sum("absent"), late=Sum("late"),
+        ),
+        lambda: Performance.objects.filter(
+            review_date__gt=day - timedelta(days=DASHBOARD_PERFORMANCE_DAYS), review_date__lte=day,
+        ).aggregate(average_rating=Avg("rating"), reviews=Count("id")),
+    )
+
+    average = performance["average_rating"]
+    return JsonResponse({
+        "date": day.isoformat(),
+        "departments": headcount["departments"],
+        "employees": headcount["employees"] or 0,
+        "top_departments": top_departments,
+        "new_hires": {"days": DASHBOARD_NEW_HIRE_DAYS, "count": new_hires},
+        "attendance_on_date": {label: attendance_day.get(code, 0) for code, label in Attendance.STATUS_CHOICES},
+        "attendance_month": {key: value or 0 for key, value in attendance_month.items()},
+        "performance": {
+            "days": DASHBOARD_PERFORMANCE_DAYS,
+            "average_rating": round(average, 2) if average is not None else None,
+            "reviews": performance["reviews"],
         },
-    )
\ No newline at end of file
+    })